@@ -34,7 +34,125 @@ class Config:
     
     # Rasa configuration
     RASA_API_URL = os.getenv("RASA_API_URL", "http://localhost:5005")
-    
+    RASA_CONNECT_TIMEOUT = float(os.getenv("RASA_CONNECT_TIMEOUT", 2))
+    RASA_READ_TIMEOUT = float(os.getenv("RASA_READ_TIMEOUT", 10))
+    RASA_POOL_SIZE = int(os.getenv("RASA_POOL_SIZE", 10))
+    RASA_MAX_RETRIES = int(os.getenv("RASA_MAX_RETRIES", 2))
+    RASA_RETRY_BACKOFF = float(os.getenv("RASA_RETRY_BACKOFF", 0.2))
+    RASA_BREAKER_THRESHOLD = int(os.getenv("RASA_BREAKER_THRESHOLD", 5))
+    RASA_BREAKER_RESET_SECONDS = float(os.getenv("RASA_BREAKER_RESET_SECONDS", 30))
+
+    # Cache des réponses Rasa (intents sans état uniquement)
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", 5000))
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+    RESPONSE_CACHE_FINGERPRINT_CHECK_SECONDS = float(os.getenv("RESPONSE_CACHE_FINGERPRINT_CHECK_SECONDS", 60))
+    RESPONSE_CACHE_MIN_CONFIDENCE = float(os.getenv("RESPONSE_CACHE_MIN_CONFIDENCE", 0.8))
+    RESPONSE_CACHE_INTENTS = [i.strip() for i in os.getenv(
+        "RESPONSE_CACHE_INTENTS",
+        "greet,goodbye,thank,ask_exams,ask_programs,ask_professors,ask_procedures,ask_orientation,ask_general_info"
+    ).split(",") if i.strip()]
+
+    # Réponse directe depuis les FAQ avant d'appeler Rasa
+    FAQ_FASTPATH_ENABLED = os.getenv("FAQ_FASTPATH_ENABLED", "true").lower() == "true"
+    FAQ_FASTPATH_THRESHOLD = float(os.getenv("FAQ_FASTPATH_THRESHOLD", 0.8))
+    # "lexical" (cosinus TF-IDF sur les mots) ou "semantic" (vecteurs denses des FAQ)
+    FAQ_FASTPATH_MODE = os.getenv("FAQ_FASTPATH_MODE", "lexical")
+    FAQ_SEMANTIC_THRESHOLD = float(os.getenv("FAQ_SEMANTIC_THRESHOLD", 0.5))
+
+    # Écriture de l'historique : "sync" ou "write_behind" (tampon + insert_many)
+    CHAT_WRITE_MODE = os.getenv("CHAT_WRITE_MODE", "sync")
+    # "immediate" : réponse dès la mise en tampon ; "flush" : réponse après écriture du lot
+    CHAT_WRITE_DURABILITY = os.getenv("CHAT_WRITE_DURABILITY", "immediate")
+    CHAT_WRITE_BUFFER_SIZE = int(os.getenv("CHAT_WRITE_BUFFER_SIZE", 10000))
+    CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", 200))
+    CHAT_WRITE_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL_MS", 200))
+    CHAT_WRITE_ENQUEUE_TIMEOUT_MS = float(os.getenv("CHAT_WRITE_ENQUEUE_TIMEOUT_MS", 50))
+
+    # Modèle de stockage : "message" (un document par message) ou "bucket" (par session)
+    CHAT_STORAGE_MODEL = os.getenv("CHAT_STORAGE_MODEL", "message")
+    CHAT_BUCKET_COLLECTION = os.getenv("CHAT_BUCKET_COLLECTION", "chat_buckets")
+    CHAT_BUCKET_SIZE = int(os.getenv("CHAT_BUCKET_SIZE", 100))
+    CHAT_SESSIONS_COLLECTION = os.getenv("CHAT_SESSIONS_COLLECTION", "chat_sessions")
+
+    # Pagination par curseur de l'historique
+    CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", 50))
+    CHAT_PAGE_SIZE_MAX = int(os.getenv("CHAT_PAGE_SIZE_MAX", 200))
+
+    # Histogrammes de latence (rasa_ms, db_ms, total_ms) fusionnés dans Mongo
+    LATENCY_COLLECTION = os.getenv("LATENCY_COLLECTION", "latency_histograms")
+    LATENCY_FLUSH_INTERVAL_SECONDS = float(os.getenv("LATENCY_FLUSH_INTERVAL_SECONDS", 10))
+    # Erreur relative maximale sur les percentiles
+    LATENCY_HISTOGRAM_PRECISION = float(os.getenv("LATENCY_HISTOGRAM_PRECISION", 0.01))
+
+    # Statistiques d'administration
+    # Agrégats journaliers du tableau de bord et clés des valeurs distinctes par jour
+    STATS_DAILY_COLLECTION = os.getenv("STATS_DAILY_COLLECTION", "stats_daily")
+    STATS_DAILY_KEYS_COLLECTION = os.getenv("STATS_DAILY_KEYS_COLLECTION", "stats_daily_keys")
+    # Sketches HyperLogLog des utilisateurs et sessions distincts (par jour, par rôle, au total)
+    STATS_SKETCH_COLLECTION = os.getenv("STATS_SKETCH_COLLECTION", "stats_sketches")
+    # Erreur type des comptes estimés (0.02 : sketches de 4 Ko)
+    STATS_HLL_ERROR = float(os.getenv("STATS_HLL_ERROR", 0.02))
+    STATS_SKETCH_FLUSH_INTERVAL_SECONDS = float(os.getenv("STATS_SKETCH_FLUSH_INTERVAL_SECONDS", 10))
+    # Plages jusqu'à ce nombre de jours comptées exactement sur stats_daily_keys
+    STATS_EXACT_MAX_DAYS = int(os.getenv("STATS_EXACT_MAX_DAYS", 7))
+    # Rétention des clés de stats_daily_keys (index TTL) : au-delà, comptes distincts estimés
+    STATS_DAILY_KEYS_RETENTION_DAYS = int(os.getenv("STATS_DAILY_KEYS_RETENTION_DAYS", 35))
+    # Cache des statistiques d'administration : servies périmées après le TTL souple
+    # (recalcul en arrière-plan), recalculées avant réponse après le TTL dur
+    STATS_CACHE_ENABLED = os.getenv("STATS_CACHE_ENABLED", "true").lower() == "true"
+    STATS_CACHE_SOFT_TTL_SECONDS = float(os.getenv("STATS_CACHE_SOFT_TTL_SECONDS", 60))
+    STATS_CACHE_HARD_TTL_SECONDS = float(os.getenv("STATS_CACHE_HARD_TTL_SECONDS", 3600))
+    # Sous-requêtes des statistiques exécutées en parallèle : taille du pool, échéance par requête
+    STATS_QUERY_WORKERS = int(os.getenv("STATS_QUERY_WORKERS", 8))
+    STATS_QUERY_DEADLINE_SECONDS = float(os.getenv("STATS_QUERY_DEADLINE_SECONDS", 5))
+
+    # Rôle des utilisateurs dénormalisé sur l'historique : durée du cache par worker,
+    # taille des lots et pause entre lots du backfill après un changement de rôle
+    USER_ROLE_CACHE_SECONDS = float(os.getenv("USER_ROLE_CACHE_SECONDS", 300))
+    USER_ROLE_BACKFILL_BATCH_SIZE = int(os.getenv("USER_ROLE_BACKFILL_BATCH_SIZE", 1000))
+    USER_ROLE_BACKFILL_PAUSE_MS = float(os.getenv("USER_ROLE_BACKFILL_PAUSE_MS", 50))
+
+    # Versions des collections (invalidation des caches entre workers)
+    COLLECTION_VERSIONS = os.getenv("COLLECTION_VERSIONS", "collection_versions")
+    COLLECTION_VERSION_POLL_SECONDS = float(os.getenv("COLLECTION_VERSION_POLL_SECONDS", 1))
+    # Délai max avant qu'un worker voie une modification des FAQ faite ailleurs
+    FAQ_CACHE_POLL_SECONDS = float(os.getenv("FAQ_CACHE_POLL_SECONDS", 1))
+
+    # Recherche FAQ : "bm25" (index en mémoire), "semantic" (vecteurs) ou "text" (index $text de Mongo)
+    FAQ_SEARCH_MODE = os.getenv("FAQ_SEARCH_MODE", "bm25")
+    FAQ_SEARCH_LIMIT = int(os.getenv("FAQ_SEARCH_LIMIT", 10))
+    # Instantané des vecteurs FAQ (matrice float32 mappée en mémoire)
+    FAQ_VECTOR_DIR = os.getenv("FAQ_VECTOR_DIR", os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "faq_vectors"
+    ))
+    FAQ_VECTOR_DIM = int(os.getenv("FAQ_VECTOR_DIM", 256))
+    # Listing paginé de GET /faq et compteurs par catégorie
+    FAQ_PAGE_SIZE = int(os.getenv("FAQ_PAGE_SIZE", 20))
+    FAQ_PAGE_SIZE_MAX = int(os.getenv("FAQ_PAGE_SIZE_MAX", 100))
+    FAQ_CATEGORIES_COLLECTION = os.getenv("FAQ_CATEGORIES_COLLECTION", "faq_categories")
+    # Compteurs d'utilisation des FAQ (vues, clics, chemin rapide du chat)
+    FAQ_USAGE_COLLECTION = os.getenv("FAQ_USAGE_COLLECTION", "faq_usage_daily")
+    FAQ_USAGE_FLUSH_INTERVAL_SECONDS = float(os.getenv("FAQ_USAGE_FLUSH_INTERVAL_SECONDS", 10))
+    # FAQ populaires : fenêtre glissante (jours), fréquence de recalcul, taille du classement
+    FAQ_POPULAR_DAYS = int(os.getenv("FAQ_POPULAR_DAYS", 30))
+    FAQ_POPULAR_REFRESH_SECONDS = float(os.getenv("FAQ_POPULAR_REFRESH_SECONDS", 60))
+    FAQ_POPULAR_MAX = int(os.getenv("FAQ_POPULAR_MAX", 100))
+    # FAQ liées : table des k plus proches voisins (cosinus sur les vecteurs FAQ), recalculée en arrière-plan
+    FAQ_RELATED_ENABLED = os.getenv("FAQ_RELATED_ENABLED", "true").lower() == "true"
+    FAQ_RELATED_K = int(os.getenv("FAQ_RELATED_K", 5))
+    FAQ_RELATED_DEBOUNCE_SECONDS = float(os.getenv("FAQ_RELATED_DEBOUNCE_SECONDS", 2))
+    # Quasi-doublons FAQ (MinHash + LSH) : seuil de similarité de Jaccard, nombre de permutations
+    FAQ_DUPLICATE_THRESHOLD = float(os.getenv("FAQ_DUPLICATE_THRESHOLD", 0.7))
+    FAQ_MINHASH_PERMUTATIONS = int(os.getenv("FAQ_MINHASH_PERMUTATIONS", 128))
+    # Import FAQ : taille des lots bulk_write
+    FAQ_IMPORT_BATCH_SIZE = int(os.getenv("FAQ_IMPORT_BATCH_SIZE", 500))
+
+    # Cache-Control des réponses GET conditionnelles (ETag / Last-Modified)
+    CACHE_CONTROL_FAQ = os.getenv("CACHE_CONTROL_FAQ", "public, max-age=0, must-revalidate")
+    CACHE_CONTROL_ANNOUNCEMENTS = os.getenv("CACHE_CONTROL_ANNOUNCEMENTS", "public, max-age=60, must-revalidate")
+    CACHE_CONTROL_CHAT_SESSIONS = os.getenv("CACHE_CONTROL_CHAT_SESSIONS", "private, no-cache")
+
     @classmethod
     def init_app(cls, app):
         print("Current configuration:")
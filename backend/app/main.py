@@ -1,9 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth_routes, announcement_routes, chat_routes
+from fastapi.responses import JSONResponse
+from flask import json
+from app.routes import async_chat_routes
 from app.database.mongodb import init_db
+from app.middleware.async_auth import AuthError
+from app.services.async_rasa_client import AsyncRasaClient
+from app.services.async_chat_service import AsyncChatService
+from app.services.chat_service import ChatService
+from app.services.faq_cache import init_faq_cache
 from app.config.config import Config
 
+# Point d'entrée asynchrone pour le chat :
+#   uvicorn app.main:app --host 0.0.0.0 --port 8000
 app = FastAPI(title="FSTS API", version="1.0.0")
 
 # Configuration CORS
@@ -15,26 +24,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialisation de la base de données
+rasa_client = None
+mongo_client = None
+
+# Initialisation de la base de données et du client Rasa
 @app.on_event("startup")
 async def startup_event():
+    global rasa_client, mongo_client
     try:
-        client, collections = init_db()
+        # Même stockage, mêmes index et mêmes agrégats que l'application Flask (pymongo, via le pool de threads)
+        mongo_client, collections = init_db()
         print("Collections initialized:", collections.keys())
-        # Vérifier que la collection announcements existe
-        if 'announcements' in collections:
-            print("Announcements collection is ready")
-        else:
-            print("Warning: Announcements collection not found")
+        chat_service = ChatService(collections['chat_history'])
+        chat_service.ensure_indexes()
+        # Index FAQ en mémoire pour le chemin rapide, rechargés quand la version de la collection change
+        init_faq_cache(collections['faqs'], lambda faqs: json.dumps({"success": True, "faqs": faqs})).sync()
+        rasa_client = AsyncRasaClient()
+        async_chat_routes.init_async_chat_routes(AsyncChatService(chat_service, rasa_client))
     except Exception as e:
         print(f"Error during startup: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if rasa_client is not None:
+        await rasa_client.close()
+    if mongo_client is not None:
+        mongo_client.close()
+
+@app.exception_handler(AuthError)
+async def auth_error_handler(request: Request, exc: AuthError):
+    return JSONResponse({"msg": exc.message}, status_code=exc.status_code)
+
 # Enregistrement des routes
-app.include_router(auth_routes.router, prefix="/api", tags=["Authentication"])
-app.include_router(announcement_routes.router, prefix="/api", tags=["Announcements"])
-app.include_router(chat_routes.router, prefix="/api", tags=["Chat"])
+app.include_router(async_chat_routes.router, prefix="/api", tags=["Chat"])
+
+@app.get("/api/health")
+async def health_check():
+    return {"status": "ok"}
 
 @app.get("/")
 async def root():
-    return {"message": "Bienvenue sur l'API FSTS"} 
\ No newline at end of file
+    return {"message": "Bienvenue sur l'API FSTS"}
@@ -0,0 +1,33 @@
+import jwt
+from fastapi import Request
+from ..config.config import Config
+
+
+class AuthError(Exception):
+    """Erreur d'authentification, rendue comme les erreurs de flask_jwt_extended"""
+
+    def __init__(self, message, status_code=401):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+async def get_jwt_identity(request: Request):
+    """Dépendance FastAPI : valide le jeton d'accès émis par l'application Flask et retourne son identité"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        raise AuthError("Missing Authorization Header")
+    if not auth_header.startswith('Bearer '):
+        raise AuthError("Missing 'Bearer' type in 'Authorization' header. Expected 'Authorization: Bearer <JWT>'")
+
+    token = auth_header.split(' ', 1)[1]
+    try:
+        data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Token has expired")
+    except jwt.InvalidTokenError as e:
+        raise AuthError(str(e), status_code=422)
+
+    if data.get('type', 'access') != 'access' or 'sub' not in data:
+        raise AuthError("Only non-refresh tokens are allowed", status_code=422)
+    return data['sub']
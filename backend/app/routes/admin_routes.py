@@ -4,6 +4,18 @@ from ..services.stats_service import StatsService
 from ..services.user_service import UserService
 from ..services.faq_service import FAQService
 from ..services.auth_service import AuthService
+from ..services.rasa_client import get_rasa_client
+from ..services.response_cache import get_response_cache
+from ..services.chat_writer import get_history_writer
+from ..services.latency_recorder import get_latency_recorder
+from ..services.faq_cache import get_faq_cache
+from ..services.faq_vectors import get_faq_vector_index
+from ..services.faq_usage import get_faq_usage
+from ..services.faq_related import get_faq_related_table
+from ..services.stats_sketches import get_distinct_sketches
+from ..services.stats_cache import get_stats_cache
+from ..services.role_backfill import get_role_backfill
+from ..services.stats_rollup import PERIOD_DAYS
 from ..database.mongodb import get_faqs_collection, get_users_collection
 
 admin_routes = Blueprint('admin', __name__)
@@ -13,13 +25,25 @@ user_service = UserService()
 faq_service = FAQService(get_faqs_collection())
 auth_service = AuthService(get_users_collection())
 
+def cached_stats(endpoint, compute):
+    """Statistiques `compute(période)` servies par le cache stale-while-revalidate (?refresh=true pour recalculer)"""
+    period = request.args.get('period', 'month')
+    period = period if period in PERIOD_DAYS else 'month'
+    cache = get_stats_cache(get_users_collection().database)
+    if cache is None:
+        return jsonify(compute(period)), 200
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
+    stats, state, age = cache.get((endpoint, period), lambda: compute(period), refresh)
+    response = jsonify(stats)
+    response.headers['X-Stats-Cache'] = state
+    response.headers['Age'] = str(int(age))
+    return response, 200
+
 @admin_routes.route('/admin/stats', methods=['GET'])
 @admin_required
 def get_admin_stats():
     try:
-        period = request.args.get('period', 'month')
-        stats = stats_service.get_user_stats(period)
-        return jsonify(stats), 200
+        return cached_stats('stats', stats_service.get_user_stats)
     except Exception as e:
         print(f"Error getting admin stats: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -50,13 +74,50 @@ def get_user_types():
 @admin_required
 def get_detailed_stats():
     try:
-        period = request.args.get('period', 'month')
-        stats = stats_service.get_detailed_stats(period)
-        return jsonify(stats), 200
+        return cached_stats('detailed', stats_service.get_detailed_stats)
     except Exception as e:
         print(f"Error getting detailed stats: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@admin_routes.route('/admin/stats/refresh', methods=['POST'])
+@admin_required
+def refresh_stats():
+    """Oublie les statistiques en cache de tous les workers (version "stats" partagée) : la prochaine lecture les recalcule"""
+    cache = get_stats_cache(get_users_collection().database)
+    scope = cache.invalidate_all() if cache is not None else None
+    return jsonify({"success": True, "scope": scope}), 200
+
+@admin_routes.route('/admin/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    try:
+        response_cache = get_response_cache()
+        history_writer = get_history_writer()
+        latency_recorder = get_latency_recorder()
+        faq_cache = get_faq_cache()
+        vector_index = get_faq_vector_index()
+        faq_usage = get_faq_usage()
+        related_table = get_faq_related_table()
+        sketches = get_distinct_sketches()
+        stats_cache = get_stats_cache()
+        role_backfill = get_role_backfill()
+        return jsonify({
+            "rasa": get_rasa_client().get_metrics(),
+            "response_cache": response_cache.get_metrics() if response_cache else {"enabled": False},
+            "chat_writer": history_writer.get_metrics() if history_writer else {"mode": "sync"},
+            "latency": latency_recorder.get_metrics() if latency_recorder else {},
+            "faq_cache": faq_cache.get_metrics() if faq_cache else {},
+            "faq_vectors": vector_index.get_metrics() if vector_index else {"enabled": False},
+            "faq_usage": faq_usage.get_metrics() if faq_usage else {},
+            "faq_related": related_table.get_metrics() if related_table else {"enabled": False},
+            "distinct_sketches": sketches.get_metrics() if sketches else {},
+            "stats_cache": stats_cache.get_metrics() if stats_cache else {"enabled": False},
+            "role_backfill": role_backfill.get_metrics() if role_backfill else {}
+        }), 200
+    except Exception as e:
+        print(f"Error getting metrics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @admin_routes.route('/admin/users', methods=['GET'])
 @admin_required
 def get_users(current_user=None):
@@ -3,6 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 import datetime
 from ..services.announcement_service import AnnouncementService
+from ..utils.http_cache import conditional_get
+from ..config.config import Config
 
 announcement_bp = Blueprint("announcements", __name__)
 announcement_service = None
@@ -53,6 +55,7 @@ def init_announcement_routes(db):
             return jsonify({"error": "Internal server error"}), 500
 
     @announcement_bp.route("/announcements", methods=["GET"])
+    @conditional_get(announcement_service.get_validators, Config.CACHE_CONTROL_ANNOUNCEMENTS)
     def list_announcements():
         try:
             announcements = announcement_service.get_all_announcements()
@@ -0,0 +1,107 @@
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
+from ..middleware.async_auth import get_jwt_identity
+from ..services.chat_service import rasa_sender_id
+
+router = APIRouter()
+chat_service = None
+
+def init_async_chat_routes(service):
+    global chat_service
+    chat_service = service
+
+def to_json(value):
+    """Sérialise comme flask.jsonify (dates au format HTTP) pour garder le même contrat JSON"""
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_json(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+    return value
+
+@router.post('/chat')
+async def chat(request: Request, user_id: str = Depends(get_jwt_identity)):
+    try:
+        started = time.perf_counter()
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not data or 'message' not in data:
+            return JSONResponse({"error": "Message is required"}, status_code=400)
+
+        message = data['message']
+        session_id = data.get('session_id') or str(uuid.uuid4())
+
+        # Get response from the FAQ fast path or Rasa
+        answer = await chat_service.get_response(message, rasa_sender_id(user_id, session_id))
+        timings = {
+            "rasa_ms": answer.get("rasa_ms"),
+            "response_ms": (time.perf_counter() - started) * 1000
+        }
+
+        # Save to chat history (db_ms et total_ms, mesurés après l'écriture, ajoutés à timings)
+        session_id = await chat_service.save_to_chat_history(
+            user_id=user_id,
+            message=message,
+            response=answer["response"],
+            session_id=session_id,
+            source=answer["source"],
+            faq_id=answer.get("faq_id"),
+            timings=timings,
+            started=started
+        )
+        chat_service.record_latency(answer["source"], timings)
+
+        payload = {
+            "response": answer["response"],
+            "session_id": session_id
+        }
+        if answer.get("faq_id"):
+            payload["related_faqs"] = to_json(await chat_service.get_related_faqs(answer["faq_id"]))
+        return JSONResponse(payload)
+
+    except Exception as e:
+        print(f"Chat error: {e}")
+        return JSONResponse({"error": "Failed to process message"}, status_code=500)
+
+@router.get('/chat/history')
+async def get_user_chat_history(limit: Optional[int] = None, before: Optional[str] = None,
+                                after: Optional[str] = None, user_id: str = Depends(get_jwt_identity)):
+    try:
+        page = await chat_service.get_user_chat_history(user_id, limit, before, after)
+        return JSONResponse(to_json(page))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"Get chat history error: {e}")
+        return JSONResponse({"error": "Failed to get chat history"}, status_code=500)
+
+@router.get('/chat/sessions')
+async def get_user_sessions(user_id: str = Depends(get_jwt_identity)):
+    try:
+        sessions = await chat_service.get_user_sessions(user_id)
+        return JSONResponse(to_json(sessions))
+    except Exception as e:
+        print(f"Get sessions error: {e}")
+        return JSONResponse({"error": "Failed to get chat sessions"}, status_code=500)
+
+@router.get('/chat/history/{session_id}')
+async def get_session_history(session_id: str, limit: Optional[int] = None, before: Optional[str] = None,
+                              after: Optional[str] = None, user_id: str = Depends(get_jwt_identity)):
+    try:
+        page = await chat_service.get_session_history(session_id, user_id, limit, before, after)
+        return JSONResponse(to_json(page))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"Get session history error: {e}")
+        return JSONResponse({"error": "Failed to get session history"}, status_code=500)
@@ -1,6 +1,10 @@
+import time
+import uuid
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..services.chat_service import ChatService
+from ..services.chat_service import ChatService, rasa_sender_id
+from ..utils.http_cache import conditional_get
+from ..config.config import Config
 
 chat_bp = Blueprint('chat', __name__)
 chat_service = None
@@ -8,34 +12,49 @@ chat_service = None
 def init_chat_routes(chat_history_collection):
     global chat_service
     chat_service = ChatService(chat_history_collection)
+    chat_service.ensure_indexes()
 
 @chat_bp.route('/chat', methods=['POST'])
 @jwt_required()
 def chat():
     try:
+        started = time.perf_counter()
         data = request.get_json()
         if not data or 'message' not in data:
             return jsonify({"error": "Message is required"}), 400
 
         user_id = get_jwt_identity()
         message = data['message']
-        session_id = data.get('session_id')
+        # Une conversation Rasa par session : l'id est fixé avant l'appel
+        session_id = data.get('session_id') or str(uuid.uuid4())
 
-        # Get response from Rasa
-        response = chat_service.get_rasa_response(message)
+        # Get response from the FAQ fast path or Rasa
+        answer = chat_service.get_response(message, rasa_sender_id(user_id, session_id))
+        timings = {
+            "rasa_ms": answer.get("rasa_ms"),
+            "response_ms": (time.perf_counter() - started) * 1000
+        }
 
-        # Save to chat history
+        # Save to chat history (db_ms et total_ms, mesurés après l'écriture, ajoutés à timings)
         session_id = chat_service.save_to_chat_history(
             user_id=user_id,
             message=message,
-            response=response,
-            session_id=session_id
+            response=answer["response"],
+            session_id=session_id,
+            source=answer["source"],
+            faq_id=answer.get("faq_id"),
+            timings=timings,
+            started=started
         )
+        chat_service.record_latency(answer["source"], timings)
 
-        return jsonify({
-            "response": response,
+        payload = {
+            "response": answer["response"],
             "session_id": session_id
-        })
+        }
+        if answer.get("faq_id"):
+            payload["related_faqs"] = chat_service.get_related_faqs(answer["faq_id"])
+        return jsonify(payload)
 
     except Exception as e:
         print(f"Chat error: {e}")
@@ -46,15 +65,22 @@ def chat():
 def get_user_chat_history():
     try:
         user_id = get_jwt_identity()
-        limit = request.args.get('limit', 50, type=int)
-        history = chat_service.get_user_chat_history(user_id, limit)
-        return jsonify(history)
+        page = chat_service.get_user_chat_history(
+            user_id,
+            limit=request.args.get('limit', type=int),
+            before=request.args.get('before'),
+            after=request.args.get('after')
+        )
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Get chat history error: {e}")
         return jsonify({"error": "Failed to get chat history"}), 500
 
 @chat_bp.route('/chat/sessions', methods=['GET'])
 @jwt_required()
+@conditional_get(cache_control=Config.CACHE_CONTROL_CHAT_SESSIONS)
 def get_user_sessions():
     try:
         user_id = get_jwt_identity()
@@ -69,8 +95,16 @@ def get_user_sessions():
 def get_session_history(session_id):
     try:
         user_id = get_jwt_identity()
-        history = chat_service.get_session_history(session_id, user_id)
-        return jsonify(history)
+        page = chat_service.get_session_history(
+            session_id,
+            user_id,
+            limit=request.args.get('limit', type=int),
+            before=request.args.get('before'),
+            after=request.args.get('after')
+        )
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Get session history error: {e}")
         return jsonify({"error": "Failed to get session history"}), 500 
\ No newline at end of file
@@ -1,34 +1,67 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, json, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..services.faq_service import FAQService
 from ..services.auth_service import AuthService
+from ..services.faq_cache import init_faq_cache
+from ..services.faq_import import FORMATS, detect_format
+from ..services.faq_usage import init_faq_usage
+from ..utils.http_cache import conditional_get
+from ..config.config import Config
 
 faq_bp = Blueprint('faq', __name__)
 faq_service = None
 auth_service = None
+faq_cache = None
+
+def serialize_faqs(faqs):
+    """Corps de GET /faq, sérialisé une fois par version de la collection"""
+    return json.dumps({"success": True, "faqs": faqs})
 
 def init_faq_routes(collections):
-    global faq_service, auth_service
+    global faq_service, auth_service, faq_cache
     faq_service = FAQService(collections['faqs'])
+    faq_cache = init_faq_cache(collections['faqs'], serialize_faqs)
     auth_service = AuthService(collections['users'])
     print("Initialisation des routes FAQ...")
     faq_service.init_faq_database()
+    faq_service.ensure_indexes()
+    faq_usage = init_faq_usage(
+        collections['faqs'].database[Config.FAQ_USAGE_COLLECTION], collections['faqs'], faq_service.suggest_index
+    )
+    faq_usage.ensure_indexes()
+    # Charge le cache et reconstruit l'index du chemin rapide
+    faq_cache.sync()
+
+# Paramètres qui font passer GET /faq du corps complet en cache au listing paginé
+LIST_PARAMS = ('category', 'limit', 'cursor', 'sort', 'fields', 'facets')
+
+def is_list_request():
+    return any(param in request.args for param in LIST_PARAMS)
+
+def faq_validators():
+    """Version du cache pour la liste complète ; empreinte du corps pour le listing paginé"""
+    if is_list_request():
+        return None, None
+    return faq_cache.get_validators()
 
 @faq_bp.route('/faq', methods=['GET'])
+@conditional_get(faq_validators, Config.CACHE_CONTROL_FAQ)
 def get_faqs():
     try:
-        print("=== Début de la requête GET /faq ===")
-        print("Récupération des FAQs depuis le service...")
-        faqs = faq_service.get_all_faqs()
-        print(f"Nombre de FAQs à renvoyer: {len(faqs)}")
-        
-        response = {
-            "success": True,
-            "faqs": faqs
-        }
-        print("Réponse préparée:", response)
-        print("=== Fin de la requête GET /faq ===")
-        return jsonify(response)
+        if is_list_request():
+            page = faq_service.list_faqs(
+                category=request.args.get('category') or None,
+                limit=request.args.get('limit', type=int),
+                cursor=request.args.get('cursor') or None,
+                sort=request.args.get('sort', 'popular'),
+                fields=request.args.get('fields'),
+                facets=request.args.get('facets', 'false').lower() == 'true'
+            )
+            return jsonify(dict(page, success=True))
+        payload, _ = faq_cache.get_payload()
+        return current_app.response_class(payload, mimetype="application/json")
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         print(f"Erreur lors de la récupération des FAQs: {str(e)}")
         return jsonify({
@@ -52,7 +85,8 @@ def add_faq(current_user):
         if faq:
             return jsonify({
                 'message': 'FAQ créée avec succès',
-                'faq': faq
+                'faq': faq,
+                'duplicates': faq_service.find_duplicates(faq, exclude_id=faq['_id'])
             }), 201
         return jsonify({'error': 'Erreur lors de la création de la FAQ'}), 500
     except Exception as e:
@@ -93,7 +127,8 @@ def update_faq(faq_id):
         print(f"FAQ mise à jour avec succès: {faq_id}")
         return jsonify({
             "message": "FAQ updated successfully",
-            "faq": updated_faq
+            "faq": updated_faq,
+            "duplicates": faq_service.find_duplicates(updated_faq, exclude_id=updated_faq['_id'])
         })
 
     except Exception as e:
@@ -131,14 +166,55 @@ def search_faqs():
             print("Requête de recherche vide")
             return jsonify({"error": "Search query is required"}), 400
 
-        print(f"Recherche de FAQs avec la requête: {query}")
-        results = faq_service.search_faqs(query)
+        results = faq_service.search_faqs(
+            query,
+            limit=request.args.get('limit', type=int),
+            category=request.args.get('category')
+        )
         return jsonify({"results": results})
 
     except Exception as e:
         print(f"Erreur lors de la recherche de FAQs: {e}")
         return jsonify({"error": "Failed to search FAQs"}), 500
 
+@faq_bp.route('/faq/suggest', methods=['GET'])
+def suggest_faqs():
+    try:
+        limit = min(request.args.get('limit', 8, type=int), 20)
+        suggestions = faq_service.suggest(request.args.get('prefix', ''), limit)
+        return jsonify({"suggestions": suggestions})
+    except Exception as e:
+        print(f"Erreur lors de l'autocomplétion des FAQs: {e}")
+        return jsonify({"error": "Failed to suggest FAQs"}), 500
+
+@faq_bp.route('/faq/popular', methods=['GET'])
+def popular_faqs():
+    try:
+        limit = min(request.args.get('limit', 10, type=int), Config.FAQ_POPULAR_MAX)
+        return jsonify({"faqs": faq_service.get_popular_faqs(limit), "days": Config.FAQ_POPULAR_DAYS})
+    except Exception as e:
+        print(f"Erreur lors de la récupération des FAQs populaires: {e}")
+        return jsonify({"error": "Failed to get popular FAQs"}), 500
+
+@faq_bp.route('/faq/<faq_id>/related', methods=['GET'])
+def related_faqs(faq_id):
+    try:
+        limit = request.args.get('limit', Config.FAQ_RELATED_K, type=int)
+        related = faq_service.get_related_faqs(faq_id, limit)
+        if related is None:
+            return jsonify({"error": "FAQ not found"}), 404
+        return jsonify({"related": related})
+    except Exception as e:
+        print(f"Erreur lors de la récupération des FAQs liées: {e}")
+        return jsonify({"error": "Failed to get related FAQs"}), 500
+
+@faq_bp.route('/faq/<faq_id>/<any(view, click):event>', methods=['POST'])
+def record_faq_usage(faq_id, event):
+    """Balise envoyée par le frontend : FAQ ouverte (view) ou résultat de recherche choisi (click)"""
+    if not faq_service.record_usage(faq_id, event):
+        return jsonify({"error": "FAQ not found"}), 404
+    return '', 204
+
 @faq_bp.route('/admin/faq', methods=['POST'])
 @jwt_required()
 def add_faq_admin():
@@ -159,9 +235,50 @@ def add_faq_admin():
         if faq:
             return jsonify({
                 'message': 'FAQ créée avec succès',
-                'faq': faq
+                'faq': faq,
+                'duplicates': faq_service.find_duplicates(faq, exclude_id=faq['_id'])
             }), 201
         return jsonify({'error': 'Erreur lors de la création de la FAQ'}), 500
     except Exception as e:
         print("Erreur lors de la création de la FAQ:", str(e))
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500 
+
+@faq_bp.route('/admin/faq/duplicates', methods=['GET'])
+@jwt_required()
+def faq_duplicates_report():
+    """Rapport des quasi-doublons (MinHash + LSH) sur toute la collection"""
+    try:
+        current_user = get_jwt_identity()
+        if not auth_service.is_admin(current_user):
+            return jsonify({"error": "Unauthorized"}), 403
+        return jsonify({"success": True, "report": faq_service.duplicate_report()}), 200
+    except Exception as e:
+        print(f"Erreur lors du rapport des doublons FAQ: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@faq_bp.route('/admin/faq/import', methods=['POST'])
+@jwt_required()
+def import_faqs_admin():
+    """Import en masse : fichier multipart `file` ou corps brut (JSON, NDJSON, CSV)"""
+    try:
+        current_user = get_jwt_identity()
+        if not auth_service.is_admin(current_user):
+            return jsonify({"error": "Unauthorized"}), 403
+
+        upload = request.files.get('file')
+        if upload is not None:
+            stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+        else:
+            stream, fmt = request.stream, detect_format(content_type=request.content_type)
+        fmt = request.args.get('format', fmt).lower()
+        if fmt not in FORMATS:
+            return jsonify({"error": f"Format must be one of: {', '.join(FORMATS)}"}), 400
+        prune = request.args.get('prune', 'false').lower() == 'true'
+
+        report = faq_service.import_faqs(stream, fmt, prune)
+        return jsonify({"success": True, "report": report}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Fichier d'import invalide: {e}"}), 400
+    except Exception as e:
+        print(f"Erreur lors de l'import des FAQs: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -1,9 +1,12 @@
 from datetime import datetime
 from bson import ObjectId
+from .collection_versions import get_collection_versions, get_version_poller
 
 class AnnouncementService:
     def __init__(self, collection):
         self.collection = collection
+        self.versions = get_collection_versions(collection.database)
+        self.version_poller = get_version_poller(collection.database, "announcements")
         print(f"AnnouncementService initialized with collection: {collection}")
 
     def create_announcement(self, data, author_id, author_name):
@@ -24,11 +27,22 @@ class AnnouncementService:
             result = self.collection.insert_one(announcement)
             print(f"Insert result: {result.inserted_id}")
             announcement["_id"] = str(result.inserted_id)
+            self.mark_changed()
             return announcement
         except Exception as e:
             print(f"Error in create_announcement: {str(e)}")
             raise
 
+    def mark_changed(self):
+        self.versions.bump("announcements")
+        self.version_poller.invalidate()
+
+    def get_validators(self):
+        """(ETag, Last-Modified) de la liste, d'après la version de la collection"""
+        version, updated_at = self.version_poller.get()
+        stamp = int(updated_at.timestamp()) if updated_at else 0
+        return f"announcements-{version}-{stamp}", updated_at
+
     def get_all_announcements(self):
         announcements = list(self.collection.find().sort("created_at", -1))
         for a in announcements:
@@ -53,10 +67,14 @@ class AnnouncementService:
             {"_id": ObjectId(announcement_id)},
             {"$set": update_data}
         )
+        if result.modified_count > 0:
+            self.mark_changed()
         return result.modified_count > 0
 
     def delete_announcement(self, announcement_id):
         result = self.collection.delete_one({"_id": ObjectId(announcement_id)})
+        if result.deleted_count > 0:
+            self.mark_changed()
         return result.deleted_count > 0
 
     def get_announcements_by_author(self, author_id):
@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import time
+from .chat_service import FALLBACK_RESPONSE, NOT_UNDERSTOOD_RESPONSE
+
+
+class AsyncChatService:
+    """Version asyncio de ChatService pour l'application FastAPI.
+
+    Seul l'appel à Rasa est asynchrone (httpx) ; le chemin rapide FAQ, l'historique,
+    les résumés de sessions, les agrégats et les latences passent par le même
+    ChatService que l'application Flask, exécuté dans le pool de threads de la boucle.
+    """
+
+    def __init__(self, chat_service, rasa_client):
+        self.chat_service = chat_service
+        self.rasa_client = rasa_client
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    async def _ask_rasa(self, message, sender=None):
+        messages = await self.rasa_client.send_message(message, sender)
+        if messages is None:
+            return None
+        return messages[0].get("text", NOT_UNDERSTOOD_RESPONSE) if messages else NOT_UNDERSTOOD_RESPONSE
+
+    async def get_response(self, message, sender=None):
+        """Même contrat que ChatService.get_response (sans le cache de réponses Rasa, synchrone)"""
+        answer = await self._run(self.chat_service.match_faq, message)
+        if answer:
+            return answer
+
+        started = time.perf_counter()
+        response = await self._ask_rasa(message, sender)
+        rasa_ms = (time.perf_counter() - started) * 1000
+        if response is None:
+            return {"response": FALLBACK_RESPONSE, "source": "fallback", "rasa_ms": rasa_ms}
+        return {"response": response, "source": "rasa", "rasa_ms": rasa_ms}
+
+    async def get_rasa_response(self, message, sender=None):
+        return (await self.get_response(message, sender))["response"]
+
+    async def get_related_faqs(self, faq_id, limit=3):
+        return await self._run(self.chat_service.get_related_faqs, faq_id, limit)
+
+    async def save_to_chat_history(self, user_id, message, response, session_id=None, source=None, faq_id=None,
+                                   timings=None, started=None):
+        return await self._run(
+            self.chat_service.save_to_chat_history, user_id, message, response, session_id=session_id,
+            source=source, faq_id=faq_id, timings=timings, started=started
+        )
+
+    def record_latency(self, source, timings):
+        self.chat_service.record_latency(source, timings)
+
+    async def get_user_chat_history(self, user_id, limit=None, before=None, after=None):
+        return await self._run(self.chat_service.get_user_chat_history, user_id, limit, before, after)
+
+    async def get_user_sessions(self, user_id):
+        # Résumés chat_sessions, écrits par save_to_chat_history comme côté Flask
+        return await self._run(self.chat_service.get_user_sessions, user_id)
+
+    async def get_session_history(self, session_id, user_id, limit=None, before=None, after=None):
+        return await self._run(self.chat_service.get_session_history, session_id, user_id, limit, before, after)
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import httpx
+from ..config.config import Config
+from .rasa_client import CircuitBreaker, backoff_delay
+
+
+class AsyncRasaClient:
+    """Équivalent asyncio de RasaClient, basé sur httpx.AsyncClient"""
+
+    def __init__(self, base_url=None, connect_timeout=None, read_timeout=None,
+                 pool_size=None, max_retries=None, retry_backoff=None, breaker=None):
+        self.base_url = (base_url or Config.RASA_API_URL).rstrip("/")
+        self.pool_size = pool_size or Config.RASA_POOL_SIZE
+        self.max_retries = Config.RASA_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = Config.RASA_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self.breaker = breaker or CircuitBreaker(
+            Config.RASA_BREAKER_THRESHOLD,
+            Config.RASA_BREAKER_RESET_SECONDS
+        )
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(
+                read_timeout or Config.RASA_READ_TIMEOUT,
+                connect=connect_timeout or Config.RASA_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            )
+        )
+        self.counters = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0
+        }
+
+    async def _post(self, path, payload):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.client.post(path, json=payload)
+            except httpx.HTTPError as e:
+                if isinstance(e, httpx.TimeoutException):
+                    self.counters["timeouts"] += 1
+                # ConnectError / ConnectTimeout : la requête n'a jamais atteint Rasa
+                retryable = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if attempt >= self.max_retries or not retryable:
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt, self.retry_backoff))
+
+    async def send_message(self, message, sender=None):
+        """Envoie un message au webhook REST ; retourne la liste des réponses ou None si Rasa est indisponible"""
+        if not self.breaker.allow_request():
+            return None
+
+        self.counters["requests"] += 1
+        payload = {"message": message}
+        if sender:
+            payload["sender"] = sender
+        try:
+            response = await self._post("/webhooks/rest/webhook", payload)
+            if response.status_code != 200:
+                raise httpx.HTTPStatusError(
+                    f"Rasa status {response.status_code}",
+                    request=response.request,
+                    response=response
+                )
+            messages = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Rasa error: {e}")
+            self.counters["failures"] += 1
+            self.breaker.record_failure()
+            return None
+
+        self.counters["successes"] += 1
+        self.breaker.record_success()
+        return messages
+
+    def get_metrics(self):
+        return {
+            "base_url": self.base_url,
+            "pid": os.getpid(),
+            "requests": dict(self.counters),
+            "pool": {"max_size": self.pool_size},
+            "breaker": self.breaker.get_metrics()
+        }
+
+    async def close(self):
+        await self.client.aclose()
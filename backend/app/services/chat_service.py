@@ -1,27 +1,159 @@
-import requests
+import hashlib
+import time
 import uuid
 from datetime import datetime, timedelta
 from bson import ObjectId
+from .rasa_client import get_rasa_client
+from .response_cache import get_response_cache
+from .faq_index import get_faq_index
+from .faq_cache import get_faq_cache
+from .faq_usage import get_faq_usage
+from .faq_vectors import get_faq_vector_index
+from .faq_related import get_faq_related_table
+from .chat_writer import init_history_writer
+from .chat_storage import make_chat_store
+from .session_summary import ChatSessionSummaries
+from .latency_recorder import init_latency_recorder
+from .stats_rollup import get_stats_rollup
+from .user_roles import get_user_roles
+from .role_backfill import get_role_backfill
+from ..utils.histogram import LogHistogram
+from ..utils.pagination import encode_cursor, decode_cursor, clamp_page_size
 from ..config.config import Config
 
+FALLBACK_RESPONSE = "Désolé, je rencontre des problèmes techniques."
+NOT_UNDERSTOOD_RESPONSE = "Je suis désolé, je n'ai pas compris votre message."
+
+def rasa_sender_id(user_id, session_id):
+    """Identifiant de conversation Rasa propre à (utilisateur, session), sans exposer l'email"""
+    return hashlib.sha256(f"{user_id}:{session_id}".encode()).hexdigest()[:32]
+
 class ChatService:
-    def __init__(self, chat_history_collection):
+    def __init__(self, chat_history_collection, rasa_client=None, response_cache=None, faq_index=None,
+                 vector_index=None):
         self.chat_history_collection = chat_history_collection
+        self.store = make_chat_store(chat_history_collection)
+        self.session_summaries = ChatSessionSummaries(
+            chat_history_collection.database[Config.CHAT_SESSIONS_COLLECTION]
+        )
+        self._rasa_client = rasa_client
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        self.faq_index = faq_index if faq_index is not None else get_faq_index()
+        self.vector_index = vector_index if vector_index is not None else get_faq_vector_index()
+        self.stats_rollup = get_stats_rollup(
+            chat_history_collection.database, (FALLBACK_RESPONSE,)
+        )
+        self.user_roles = get_user_roles(chat_history_collection.database.users)
+        self.role_backfill = get_role_backfill(self.store)
+        self.history_writer = init_history_writer(self._persist_entries)
+        self.latency = init_latency_recorder(
+            chat_history_collection.database[Config.LATENCY_COLLECTION]
+        )
 
-    def get_rasa_response(self, message):
-        try:
-            response = requests.post(
-                f"{Config.RASA_API_URL}/webhooks/rest/webhook",
-                json={"message": message}
+    def ensure_indexes(self):
+        """Index de l'historique et des collections dérivées (une seule définition, Flask et FastAPI)"""
+        self.store.ensure_indexes()
+        self.session_summaries.ensure_indexes()
+        self.latency.ensure_indexes()
+        self.stats_rollup.ensure_indexes()
+        self.user_roles.ensure_indexes()
+
+    @property
+    def rasa_client(self):
+        # Résolu à chaque appel pour que chaque worker utilise son propre pool après fork
+        return self._rasa_client or get_rasa_client()
+
+    def _ask_rasa(self, message, sender=None):
+        messages = self.rasa_client.send_message(message, sender)
+        if messages is None:
+            return None
+        return messages[0].get("text", NOT_UNDERSTOOD_RESPONSE) if messages else NOT_UNDERSTOOD_RESPONSE
+
+    def _ask_rasa_with_intent(self, message, sender=None):
+        """(texte, intent, confiance) en un seul aller-retour, pour le cache de réponses"""
+        messages, intent, confidence = self.rasa_client.send_message_with_intent(message, sender)
+        if messages is None:
+            return None, None, 0.0
+        text = messages[0].get("text", NOT_UNDERSTOOD_RESPONSE) if messages else NOT_UNDERSTOOD_RESPONSE
+        return text, intent, confidence
+
+    def get_rasa_response(self, message, sender=None):
+        return self.get_response(message, sender)["response"]
+
+    def match_faq(self, message):
+        """Chemin rapide : réponse FAQ directe si la question est assez proche"""
+        if not Config.FAQ_FASTPATH_ENABLED:
+            return None
+        faq_cache = get_faq_cache()
+        if faq_cache is not None:
+            # Reprend les modifications faites dans un autre worker
+            faq_cache.sync()
+        if Config.FAQ_FASTPATH_MODE == "semantic" and self.vector_index is not None:
+            index, threshold = self.vector_index, Config.FAQ_SEMANTIC_THRESHOLD
+        else:
+            index, threshold = self.faq_index, Config.FAQ_FASTPATH_THRESHOLD
+        if not len(index):
+            return None
+        faq_id, faq, score = index.match(message)
+        if faq_id is None or score < threshold:
+            return None
+        faq_usage = get_faq_usage()
+        if faq_usage is not None:
+            faq_usage.record(faq_id, "chat")
+        return {"response": faq["answer"], "source": "faq", "faq_id": faq_id, "score": score}
+
+    def get_related_faqs(self, faq_id, limit=3):
+        """Questions liées proposées sous une réponse du chemin rapide (table précalculée)"""
+        related_table = get_faq_related_table()
+        if related_table is None:
+            return []
+        related = []
+        for other_id, _ in related_table.related(faq_id, limit) or []:
+            faq = self.faq_index.get(other_id)
+            if faq is not None:
+                related.append({"_id": other_id, "question": faq["question"]})
+        return related
+
+    def get_response(self, message, sender=None):
+        """Retourne la réponse et le chemin qui l'a produite (faq, cache, rasa ou fallback).
+
+        `sender` identifie le tracker Rasa de la conversation (voir rasa_sender_id).
+        """
+        answer = self.match_faq(message)
+        if answer:
+            return answer
+
+        started = time.perf_counter()
+        if self.response_cache is not None:
+            response, cached = self.response_cache.get_or_compute(
+                message, lambda m: self._ask_rasa_with_intent(m, sender)
             )
-            if response.status_code == 200:
-                return response.json()[0]["text"] if response.json() else "Je suis désolé, je n'ai pas compris votre message."
-            return "Désolé, je rencontre des problèmes techniques."
+        else:
+            response, cached = self._ask_rasa(message, sender), False
+        rasa_ms = (time.perf_counter() - started) * 1000
+        if response is None:
+            return {"response": FALLBACK_RESPONSE, "source": "fallback", "rasa_ms": rasa_ms}
+        if cached:
+            return {"response": response, "source": "cache"}
+        return {"response": response, "source": "rasa", "rasa_ms": rasa_ms}
+
+    def record_latency(self, source, timings):
+        self.latency.record(source or "unknown", timings)
+
+    def _user_role(self, user_id):
+        try:
+            return self.user_roles.get(user_id)
         except Exception as e:
-            print(f"Rasa error: {e}")
-            return "Désolé, je rencontre des problèmes techniques."
+            # Le message est enregistré sans rôle ; le backfill le complète au prochain changement de rôle
+            print(f"Error getting user role: {e}")
+            return None
 
-    def save_to_chat_history(self, user_id, message, response, session_id=None):
+    def save_to_chat_history(self, user_id, message, response, session_id=None, source=None, faq_id=None,
+                             timings=None, user_role=None, started=None):
+        """Enregistre l'échange ; `timings` est complété avec db_ms (écriture Mongo, ou mise en
+        file en write-behind) et total_ms (depuis `started`, le début de la requête) pour les histogrammes.
+        """
+        write_started = time.perf_counter()
         if not session_id:
             session_id = str(uuid.uuid4())
 
@@ -32,161 +164,134 @@ class ChatService:
             "response": response,
             "timestamp": datetime.utcnow()
         }
-        
+        # Rôle dénormalisé : la répartition par rôle se lit sans jointure sur users
+        user_role = user_role or self._user_role(user_id)
+        if user_role:
+            chat_entry["user_role"] = user_role
+        if source:
+            chat_entry["source"] = source
+        if faq_id:
+            chat_entry["faq_id"] = faq_id
+        if timings is not None:
+            # Seuls les temps connus avant l'écriture sont stockés avec le message ;
+            # db_ms et total_ms ne vont qu'aux histogrammes de latence
+            chat_entry["timings"] = {k: round(v, 2) for k, v in timings.items() if v is not None}
+
         try:
-            self.chat_history_collection.insert_one(chat_entry)
-            print(f"Message saved to chat history for session {session_id}")
-            return session_id
+            if self.history_writer is not None:
+                self.history_writer.submit(chat_entry)
+            else:
+                self._persist_entries([chat_entry])
         except Exception as e:
             print(f"Error saving to chat history: {e}")
             raise
 
-    def get_user_chat_history(self, user_id, limit=50):
+        if timings is not None:
+            written = time.perf_counter()
+            timings["db_ms"] = (written - write_started) * 1000
+            if started is not None:
+                timings["total_ms"] = (written - started) * 1000
+        return session_id
+
+    def _insert_entries(self, entries):
+        """Insère le lot, rejoué une fois en cas d'erreur (les stores ne réécrivent pas un message déjà écrit)"""
+        for attempt in range(2):
+            try:
+                self.store.insert_entries(entries, retry=attempt > 0)
+                return
+            except Exception as e:
+                if attempt:
+                    raise
+                print(f"Error inserting chat history ({len(entries)} entries), retrying: {e}")
+                time.sleep(0.1)
+
+    def _persist_entries(self, entries):
+        """Écrit un lot d'entrées d'historique (appelé directement ou par le writer différé).
+
+        Seule l'insertion peut faire échouer le lot. Les $inc des résumés et des agrégats
+        ne sont jamais rejoués : une mise à jour manquante se rattrape avec
+        ChatSessionSummaries.backfill ou StatsRollup.rebuild.
+        """
+        self._insert_entries(entries)
+        try:
+            self.session_summaries.record(entries)
+        except Exception as e:
+            print(f"Error updating session summaries: {e}")
+        try:
+            self.stats_rollup.record(entries)
+        except Exception as e:
+            print(f"Error updating daily stats: {e}")
+
+    @staticmethod
+    def _page_response(items, has_more, oldest, newest):
+        """Page d'historique avec curseurs opaques (?before= vers le passé, ?after= vers le présent)"""
+        return {
+            "items": items,
+            "has_more": has_more,
+            "cursors": {
+                "before": encode_cursor(oldest["timestamp"], oldest["_id"]) if oldest else None,
+                "after": encode_cursor(newest["timestamp"], newest["_id"]) if newest else None
+            }
+        }
+
+    def get_user_chat_history(self, user_id, limit=None, before=None, after=None):
+        limit = clamp_page_size(limit, Config.CHAT_PAGE_SIZE, Config.CHAT_PAGE_SIZE_MAX)
+        before = decode_cursor(before) if before else None
+        after = decode_cursor(after) if after else None
         try:
-            history = list(self.chat_history_collection
-                .find({"user_id": user_id})
-                .sort("timestamp", -1)
-                .limit(limit))
-            
-            # Convertir les ObjectId en str pour la sérialisation JSON
-            for entry in history:
-                if '_id' in entry:
-                    entry['_id'] = str(entry['_id'])
-            
-            return history
+            items, has_more = self.store.get_user_history(user_id, limit, before, after)
         except Exception as e:
             print(f"Error getting user chat history: {e}")
-            return []
+            items, has_more = [], False
+        # Du plus récent au plus ancien
+        return self._page_response(items, has_more, items[-1] if items else None, items[0] if items else None)
 
     def get_user_sessions(self, user_id):
         try:
-            pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {
-                    "_id": "$session_id",
-                    "last_message": {"$last": "$message"},
-                    "last_timestamp": {"$last": "$timestamp"},
-                    "message_count": {"$sum": 1}
-                }},
-                {"$sort": {"last_timestamp": -1}},
-                {"$project": {
-                    "session_id": "$_id",
-                    "last_message": 1,
-                    "last_timestamp": 1,
-                    "message_count": 1,
-                    "_id": 0
-                }}
-            ]
-            sessions = list(self.chat_history_collection.aggregate(pipeline))
-            print(f"Retrieved {len(sessions)} sessions for user {user_id}")
-            return sessions
+            return self.session_summaries.get_user_sessions(user_id)
         except Exception as e:
             print(f"Error getting user sessions: {e}")
             return []
 
-    def get_session_history(self, session_id, user_id):
+    def get_session_history(self, session_id, user_id, limit=None, before=None, after=None):
+        limit = clamp_page_size(limit, Config.CHAT_PAGE_SIZE, Config.CHAT_PAGE_SIZE_MAX)
+        before = decode_cursor(before) if before else None
+        after = decode_cursor(after) if after else None
         try:
-            history = list(self.chat_history_collection
-                .find({"session_id": session_id, "user_id": user_id})
-                .sort("timestamp", 1))
-            
-            # Convertir les ObjectId en str pour la sérialisation JSON
-            for entry in history:
-                if '_id' in entry:
-                    entry['_id'] = str(entry['_id'])
-            
-            print(f"Retrieved {len(history)} messages for session {session_id}")
-            return history
+            items, has_more = self.store.get_session_history(session_id, user_id, limit, before, after)
         except Exception as e:
             print(f"Error getting session history: {e}")
-            return []
+            items, has_more = [], False
+        # Ordre chronologique ; sans curseur, la page la plus récente de la session
+        return self._page_response(items, has_more, items[0] if items else None, items[-1] if items else None)
 
     def count_conversations(self):
-        return len(self.chat_history_collection.distinct("session_id"))
+        """Nombre de sessions distinctes, estimé par le sketch global"""
+        return self.stats_rollup.count_distinct("session")
 
-    def count_active_users(self, since):
-        return len(self.chat_history_collection.distinct("user_id", 
-            {"timestamp": {"$gte": since}}))
+    def count_active_users(self, since, exact=None):
+        return self.stats_rollup.count_distinct("user", since, exact=exact)
 
     def average_response_time(self, since):
-        pipeline = [
-            {"$match": {"timestamp": {"$gte": since}}},
-            {"$group": {
-                "_id": "$session_id",
-                "avg_time": {"$avg": {"$subtract": ["$timestamp", "$timestamp"]}}
-            }},
-            {"$group": {
-                "_id": None,
-                "overall_avg": {"$avg": "$avg_time"}
-            }}
-        ]
-        result = list(self.chat_history_collection.aggregate(pipeline))
-        return result[0]["overall_avg"] if result else 0
+        """Temps de réponse moyen (ms, de bout en bout) lu dans les histogrammes de latence"""
+        overall = LogHistogram(self.latency.precision)
+        for histogram in self.latency.get_histograms(since, "total_ms").values():
+            overall.merge(histogram)
+        return overall.total / overall.count if overall.count else 0
 
     def calculate_resolution_rate(self, since):
-        pipeline = [
-            {"$match": {"timestamp": {"$gte": since}}},
-            {"$group": {
-                "_id": None,
-                "total": {"$sum": 1},
-                "resolved": {
-                    "$sum": {
-                        "$cond": [
-                            {"$ne": ["$response", "Désolé, je rencontre des problèmes techniques."]},
-                            1,
-                            0
-                        ]
-                    }
-                }
-            }}
-        ]
-        result = list(self.chat_history_collection.aggregate(pipeline))
-        if not result:
-            return 0
-        total = result[0]["total"]
-        resolved = result[0]["resolved"]
+        """Part des réponses hors repli technique, lue dans les agrégats journaliers"""
+        days = self.stats_rollup.get_days(since)
+        total = sum(day.get("messages", 0) for day in days)
+        resolved = total - sum(day.get("fallbacks", 0) for day in days)
         return (resolved / total * 100) if total > 0 else 0
 
     def get_activity_data(self, since):
-        pipeline = [
-            {"$match": {"timestamp": {"$gte": since}}},
-            {"$group": {
-                "_id": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%d",
-                        "date": "$timestamp"
-                    }
-                },
-                "users": {"$addToSet": "$user_id"},
-                "messages": {"$sum": 1}
-            }},
-            {"$project": {
-                "date": "$_id",
-                "users": {"$size": "$users"},
-                "messages": 1,
-                "_id": 0
-            }},
-            {"$sort": {"date": 1}}
+        return [
+            {"date": day["date"], "users": day.get("users", 0), "messages": day.get("messages", 0)}
+            for day in self.stats_rollup.get_days(since)
         ]
-        return list(self.chat_history_collection.aggregate(pipeline))
-
-    def get_user_type_distribution(self):
-        pipeline = [
-            {"$lookup": {
-                "from": "users",
-                "localField": "user_id",
-                "foreignField": "_id",
-                "as": "user"
-            }},
-            {"$unwind": "$user"},
-            {"$group": {
-                "_id": "$user.role",
-                "count": {"$sum": 1}
-            }},
-            {"$project": {
-                "name": "$_id",
-                "value": "$count",
-                "_id": 0
-            }}
-        ]
-        return list(self.chat_history_collection.aggregate(pipeline))
\ No newline at end of file
+
+    def get_user_type_distribution(self, since=None, max_time_ms=None):
+        """Messages par rôle d'utilisateur, groupés sur l'index (user_role, timestamp)"""
+        return self.store.count_by_role(since, max_time_ms)
\ No newline at end of file
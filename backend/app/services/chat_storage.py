@@ -0,0 +1,324 @@
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from ..config.config import Config
+from ..utils.pagination import keyset_condition
+
+
+def _timestamp_condition(pipeline):
+    """Condition sur `timestamp` du premier $match d'un pipeline, s'il y en a une"""
+    if pipeline and "$match" in pipeline[0]:
+        return pipeline[0]["$match"].get("timestamp")
+    return None
+
+
+def _only_duplicates(error):
+    """Vrai si un BulkWriteError ne contient que des clés dupliquées (documents déjà écrits)"""
+    details = error.details or {}
+    return (not details.get("writeConcernErrors")
+            and all(e.get("code") == 11000 for e in details.get("writeErrors", [])))
+
+
+def _set_role_in_batches(collection, query, role, batch_size):
+    """Met `role` sur au plus `batch_size` documents de `query` qui en ont un autre ; retourne leur nombre"""
+    ids = [doc["_id"] for doc in
+           collection.find(dict(query, user_role={"$ne": role}), {"_id": 1}).limit(batch_size)]
+    if not ids:
+        return 0
+    return collection.update_many({"_id": {"$in": ids}}, {"$set": {"user_role": role}}).modified_count
+
+
+class MessageChatStore:
+    """Un document par message dans chat_history (modèle historique)"""
+
+    model = "message"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        # Pagination par (timestamp, _id) servie par un parcours d'index borné
+        self.collection.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)])
+        self.collection.create_index([
+            ("session_id", ASCENDING), ("user_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)
+        ])
+        # Répartition par rôle : $group couvert par l'index, borné par la période
+        self.collection.create_index([("user_role", ASCENDING), ("timestamp", DESCENDING)])
+
+    def insert_entries(self, entries, retry=False):
+        """Insertion rejouable : les _id sont fixés avant l'envoi, un doublon est un message déjà écrit"""
+        for entry in entries:
+            entry.setdefault("_id", ObjectId())
+        try:
+            if len(entries) == 1:
+                self.collection.insert_one(entries[0])
+            else:
+                self.collection.insert_many(entries, ordered=False)
+        except DuplicateKeyError:
+            pass
+        except BulkWriteError as e:
+            if not _only_duplicates(e):
+                raise
+
+    def _page(self, query, limit, before=None, after=None):
+        """Page de `limit` messages, du plus récent au plus ancien, et indicateur has_more"""
+        direction = 1 if after else -1
+        position = after or before
+        if position:
+            query = {"$and": [query, keyset_condition(position, direction)]}
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"timestamp": direction, "_id": direction}},
+            {"$limit": limit + 1},
+            {"$addFields": {"_id": {"$toString": "$_id"}}}
+        ]
+        items = list(self.collection.aggregate(pipeline))
+        has_more = len(items) > limit
+        items = items[:limit]
+        if direction > 0:
+            items.reverse()
+        return items, has_more
+
+    def get_user_history(self, user_id, limit, before=None, after=None):
+        return self._page({"user_id": user_id}, limit, before, after)
+
+    def get_session_history(self, session_id, user_id, limit, before=None, after=None):
+        items, has_more = self._page({"session_id": session_id, "user_id": user_id}, limit, before, after)
+        items.reverse()
+        return items, has_more
+
+    def get_user_sessions(self, user_id):
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$sort": {"timestamp": 1}},
+            {"$group": {
+                "_id": "$session_id",
+                "last_message": {"$last": "$message"},
+                "last_timestamp": {"$last": "$timestamp"},
+                "message_count": {"$sum": 1}
+            }},
+            {"$sort": {"last_timestamp": -1}},
+            {"$project": {
+                "session_id": "$_id",
+                "last_message": 1,
+                "last_timestamp": 1,
+                "message_count": 1,
+                "_id": 0
+            }}
+        ]
+        return list(self.collection.aggregate(pipeline))
+
+    def aggregate_messages(self, pipeline, **kwargs):
+        return self.collection.aggregate(pipeline, **kwargs)
+
+    def distinct(self, field, query=None):
+        return self.collection.distinct(field, query or {})
+
+    def count_messages(self, query=None):
+        return self.collection.count_documents(query or {})
+
+    def count_by_role(self, since=None, max_time_ms=None):
+        """[{"name": rôle, "value": nombre de messages}] depuis `since` (tout l'historique sans)"""
+        match = {"timestamp": {"$gte": since}} if since else {}
+        options = {"maxTimeMS": max_time_ms} if max_time_ms else {}
+        return list(self.collection.aggregate([
+            {"$match": match},
+            {"$sort": {"user_role": 1}},
+            {"$group": {"_id": "$user_role", "count": {"$sum": 1}}},
+            # Messages antérieurs au rôle dénormalisé : comptés sous "unknown" plutôt que null
+            {"$project": {"name": {"$ifNull": ["$_id", "unknown"]}, "value": "$count", "_id": 0}}
+        ], hint=[("user_role", ASCENDING), ("timestamp", DESCENDING)], **options))
+
+    def set_user_role(self, user_id, role, batch_size):
+        return _set_role_in_batches(self.collection, {"user_id": user_id}, role, batch_size)
+
+
+class BucketChatStore:
+    """Messages regroupés par session dans chat_buckets.
+
+    Chaque bucket contient au plus `bucket_size` tours dans `turns`, avec
+    `last_message`, `last_timestamp` et `message_count` dénormalisés ; un nouveau
+    bucket est créé par upsert quand le précédent est plein. Le rôle de l'utilisateur
+    est porté par le bucket (`user_role`).
+    """
+
+    model = "bucket"
+
+    def __init__(self, collection, bucket_size=None):
+        self.collection = collection
+        self.bucket_size = bucket_size or Config.CHAT_BUCKET_SIZE
+
+    def ensure_indexes(self):
+        self.collection.create_index([("session_id", ASCENDING), ("user_id", ASCENDING), ("message_count", ASCENDING)])
+        self.collection.create_index([("user_id", ASCENDING), ("last_timestamp", DESCENDING)])
+        self.collection.create_index([("user_id", ASCENDING), ("first_timestamp", ASCENDING)])
+        self.collection.create_index([("session_id", ASCENDING), ("user_id", ASCENDING), ("last_timestamp", DESCENDING)])
+        self.collection.create_index([("last_timestamp", DESCENDING)])
+        self.collection.create_index([("user_role", ASCENDING), ("last_timestamp", DESCENDING), ("message_count", ASCENDING)])
+
+    @staticmethod
+    def to_turn(entry):
+        turn = {k: v for k, v in entry.items() if k not in ("user_id", "session_id", "user_role")}
+        turn.setdefault("_id", ObjectId())
+        entry["_id"] = turn["_id"]
+        return turn
+
+    def _unwritten(self, entries):
+        """Entrées dont le tour n'est encore dans aucun bucket (après un essai en erreur)"""
+        ids = [entry["_id"] for entry in entries if "_id" in entry]
+        if not ids:
+            return entries
+        written = set()
+        query = {"session_id": {"$in": list({entry["session_id"] for entry in entries})}, "turns._id": {"$in": ids}}
+        for bucket in self.collection.find(query, {"turns._id": 1}):
+            written.update(turn["_id"] for turn in bucket.get("turns", []))
+        return [entry for entry in entries if entry.get("_id") not in written]
+
+    def insert_entries(self, entries, retry=False):
+        """$push des tours ; en nouvel essai, les tours déjà poussés ne sont pas rejoués"""
+        if retry:
+            entries = self._unwritten(entries)
+        operations = []
+        for entry in entries:
+            turn = self.to_turn(entry)
+            fields = {"last_message": turn["message"]}
+            if entry.get("user_role"):
+                fields["user_role"] = entry["user_role"]
+            operations.append(UpdateOne(
+                {
+                    "session_id": entry["session_id"],
+                    "user_id": entry["user_id"],
+                    "message_count": {"$lt": self.bucket_size}
+                },
+                {
+                    "$push": {"turns": turn},
+                    "$inc": {"message_count": 1},
+                    "$min": {"first_timestamp": turn["timestamp"]},
+                    "$max": {"last_timestamp": turn["timestamp"]},
+                    "$set": fields
+                },
+                upsert=True
+            ))
+        # Ordonné : les tours d'une même session restent dans l'ordre d'arrivée
+        if operations:
+            self.collection.bulk_write(operations, ordered=True)
+
+    def _page(self, query, limit, before=None, after=None):
+        """Page de `limit` tours, du plus récent au plus ancien, et indicateur has_more"""
+        direction = 1 if after else -1
+        position = after or before
+        bucket_query = dict(query)
+        if position and direction < 0:
+            bucket_query["first_timestamp"] = {"$lte": position[0]}
+        elif position:
+            bucket_query["last_timestamp"] = {"$gte": position[0]}
+
+        def key(turn):
+            return turn["timestamp"], turn["_id"]
+
+        turns = []
+        cursor = (self.collection
+            .find(bucket_query)
+            .sort("first_timestamp" if direction > 0 else "last_timestamp", direction))
+        for bucket in cursor:
+            # Les buckets suivants ne peuvent plus entrer dans la page
+            if len(turns) > limit:
+                boundary = turns[limit]["timestamp"]
+                if direction < 0 and bucket["last_timestamp"] < boundary:
+                    break
+                if direction > 0 and bucket["first_timestamp"] > boundary:
+                    break
+            for turn in bucket["turns"]:
+                if position and (key(turn) >= position if direction < 0 else key(turn) <= position):
+                    continue
+                turns.append(dict(turn, user_id=bucket["user_id"], session_id=bucket["session_id"]))
+            turns.sort(key=key, reverse=direction < 0)
+        cursor.close()
+
+        has_more = len(turns) > limit
+        turns = turns[:limit]
+        if direction > 0:
+            turns.reverse()
+        for turn in turns:
+            turn["_id"] = str(turn["_id"])
+        return turns, has_more
+
+    def get_user_history(self, user_id, limit, before=None, after=None):
+        return self._page({"user_id": user_id}, limit, before, after)
+
+    def get_session_history(self, session_id, user_id, limit, before=None, after=None):
+        items, has_more = self._page({"session_id": session_id, "user_id": user_id}, limit, before, after)
+        items.reverse()
+        return items, has_more
+
+    def get_user_sessions(self, user_id):
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$sort": {"last_timestamp": 1}},
+            {"$group": {
+                "_id": "$session_id",
+                "last_message": {"$last": "$last_message"},
+                "last_timestamp": {"$last": "$last_timestamp"},
+                "message_count": {"$sum": "$message_count"}
+            }},
+            {"$sort": {"last_timestamp": -1}},
+            {"$project": {
+                "session_id": "$_id",
+                "last_message": 1,
+                "last_timestamp": 1,
+                "message_count": 1,
+                "_id": 0
+            }}
+        ]
+        return list(self.collection.aggregate(pipeline))
+
+    def aggregate_messages(self, pipeline, **kwargs):
+        """Exécute un pipeline écrit pour des documents-messages sur les buckets dépliés"""
+        prefix = []
+        condition = _timestamp_condition(pipeline)
+        if condition is not None:
+            prefix.append({"$match": {"last_timestamp": condition}})
+        prefix += [
+            {"$unwind": "$turns"},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+                "$turns",
+                {"user_id": "$user_id", "session_id": "$session_id", "user_role": "$user_role"}
+            ]}}}
+        ]
+        return self.collection.aggregate(prefix + pipeline, **kwargs)
+
+    def distinct(self, field, query=None):
+        query = dict(query or {})
+        if "timestamp" in query:
+            # Un bucket terminé après `since` contient au moins un message après `since`
+            query["last_timestamp"] = query.pop("timestamp")
+        return self.collection.distinct(field, query)
+
+    def count_messages(self, query=None):
+        pipeline = [{"$match": query or {}}, {"$count": "count"}]
+        result = list(self.aggregate_messages(pipeline))
+        return result[0]["count"] if result else 0
+
+    def count_by_role(self, since=None, max_time_ms=None):
+        """Messages par rôle, sommés sur les buckets (un bucket terminé après `since` compte en entier)"""
+        match = {"last_timestamp": {"$gte": since}} if since else {}
+        options = {"maxTimeMS": max_time_ms} if max_time_ms else {}
+        return list(self.collection.aggregate([
+            {"$match": match},
+            {"$sort": {"user_role": 1}},
+            {"$group": {"_id": "$user_role", "count": {"$sum": "$message_count"}}},
+            # Messages antérieurs au rôle dénormalisé : comptés sous "unknown" plutôt que null
+            {"$project": {"name": {"$ifNull": ["$_id", "unknown"]}, "value": "$count", "_id": 0}}
+        ], hint=[("user_role", ASCENDING), ("last_timestamp", DESCENDING), ("message_count", ASCENDING)],
+            **options))
+
+    def set_user_role(self, user_id, role, batch_size):
+        return _set_role_in_batches(self.collection, {"user_id": user_id}, role, batch_size)
+
+
+def make_chat_store(chat_history_collection):
+    """Modèle de stockage choisi par CHAT_STORAGE_MODEL ("message" ou "bucket")"""
+    if Config.CHAT_STORAGE_MODEL == "bucket":
+        db = chat_history_collection.database
+        return BucketChatStore(db[Config.CHAT_BUCKET_COLLECTION])
+    return MessageChatStore(chat_history_collection)
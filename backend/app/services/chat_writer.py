@@ -0,0 +1,183 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from ..config.config import Config
+
+
+class _Ticket:
+    """Accusé d'écriture pour le mode de durabilité « flush »"""
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class ChatHistoryWriter:
+    """Écriture différée de l'historique : tampon borné vidé par lots (taille ou délai).
+
+    `sink(entries)` persiste un lot et rejoue lui-même ce qui peut l'être. En durabilité
+    « immediate » l'appelant repart dès la mise en tampon ; en « flush » il attend que
+    son lot soit écrit. Si le tampon est plein, l'appelant attend puis écrit lui-même
+    son entrée (contre-pression).
+    """
+
+    def __init__(self, sink, buffer_size=None, batch_size=None, flush_interval=None,
+                 durability=None, enqueue_timeout=None):
+        self.sink = sink
+        self.buffer_size = buffer_size or Config.CHAT_WRITE_BUFFER_SIZE
+        self.batch_size = batch_size or Config.CHAT_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.CHAT_WRITE_FLUSH_INTERVAL_MS / 1000
+        self.durability = durability or Config.CHAT_WRITE_DURABILITY
+        self.enqueue_timeout = (Config.CHAT_WRITE_ENQUEUE_TIMEOUT_MS / 1000
+            if enqueue_timeout is None else enqueue_timeout)
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.counters = {
+            "enqueued": 0,
+            "written": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "dropped": 0,
+            "backpressure_sync_writes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "max_queue_delay_ms": 0.0
+        }
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Le thread et la file sont propres à chaque processus (workers forkés)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.buffer_size)
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, entry):
+        self._ensure_started()
+        ticket = _Ticket() if self.durability == "flush" else None
+        try:
+            self._queue.put((entry, ticket, time.monotonic()), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self.counters["backpressure_sync_writes"] += 1
+            self._write([entry])
+            return
+        with self._lock:
+            self.counters["enqueued"] += 1
+
+        if ticket is not None:
+            if not ticket.done.wait(timeout=self.flush_interval + 30):
+                raise TimeoutError("Chat history flush timed out")
+            if ticket.error is not None:
+                raise ticket.error
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(self.flush_interval)
+        self._drain(0)
+
+    def _drain(self, wait):
+        """Collecte un lot (jusqu'à batch_size ou flush_interval) puis l'écrit"""
+        try:
+            batch = [self._queue.get(timeout=wait) if wait else self._queue.get_nowait()]
+        except queue.Empty:
+            return
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 and wait else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._flush(batch)
+
+    def _write(self, entries):
+        start = time.perf_counter()
+        self.sink(entries)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.counters["written"] += len(entries)
+            self.counters["flushes"] += 1
+            self.counters["last_flush_ms"] = elapsed_ms
+            self.counters["total_flush_ms"] += elapsed_ms
+            self.counters["max_flush_ms"] = max(self.counters["max_flush_ms"], elapsed_ms)
+
+    def _flush(self, batch):
+        entries = [entry for entry, _, _ in batch]
+        oldest = min(enqueued_at for _, _, enqueued_at in batch)
+        error = None
+        try:
+            # Pas de nouvel essai du lot entier : le sink rejoue lui-même l'étape en échec
+            self._write(entries)
+        except Exception as e:
+            error = e
+            with self._lock:
+                self.counters["flush_errors"] += 1
+            print(f"Error flushing chat history batch ({len(entries)} entries): {e}")
+
+        with self._lock:
+            if error is not None:
+                self.counters["dropped"] += len(entries)
+            self.counters["max_queue_delay_ms"] = max(
+                self.counters["max_queue_delay_ms"],
+                (time.monotonic() - oldest) * 1000
+            )
+        for _, ticket, _ in batch:
+            if ticket is not None:
+                ticket.error = error
+                ticket.done.set()
+
+    def close(self):
+        """Vide le tampon avant l'arrêt du processus"""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=10)
+        while not self._queue.empty():
+            self._drain(0)
+
+    def get_metrics(self):
+        with self._lock:
+            counters = dict(self.counters)
+        flushes = counters["flushes"]
+        return {
+            "mode": "write_behind",
+            "durability": self.durability,
+            "buffer_size": self.buffer_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "avg_flush_ms": counters["total_flush_ms"] / flushes if flushes else 0.0,
+            **counters
+        }
+
+
+_writer = None
+
+
+def init_history_writer(sink):
+    """Crée le writer différé si CHAT_WRITE_MODE=write_behind, sinon retourne None"""
+    global _writer
+    if Config.CHAT_WRITE_MODE != "write_behind":
+        return None
+    if _writer is None:
+        _writer = ChatHistoryWriter(sink)
+    return _writer
+
+
+def get_history_writer():
+    return _writer
@@ -0,0 +1,85 @@
+import threading
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from ..config.config import Config
+
+
+class CollectionVersions:
+    """Compteurs de version par collection (un document par nom dans collection_versions).
+
+    Chaque écriture incrémente la version ; les caches des workers comparent leur
+    version à celle de Mongo (un find_one par _id) pour savoir s'ils sont à jour.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def bump(self, name):
+        return self.advance(name)[0]
+
+    def advance(self, name):
+        """Incrémente la version ; retourne (version, updated_at) comme get()"""
+        doc = self.collection.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["version"], doc["updated_at"]
+
+    def get(self, name):
+        """Retourne (version, updated_at) ; (0, None) si la collection n'a jamais été modifiée"""
+        doc = self.collection.find_one({"_id": name})
+        if doc is None:
+            return 0, None
+        return doc["version"], doc.get("updated_at")
+
+
+class VersionPoller:
+    """Version d'une collection relue au plus toutes les `poll_interval` secondes"""
+
+    def __init__(self, versions, name, poll_interval=None):
+        self.versions = versions
+        self.name = name
+        self.poll_interval = Config.COLLECTION_VERSION_POLL_SECONDS if poll_interval is None else poll_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._checked_at = 0.0
+        self.checks = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def set(self, value):
+        """Version produite par une écriture de ce worker : connue sans relire Mongo"""
+        with self._lock:
+            if self._value is None or value[0] >= self._value[0]:
+                self._value = value
+                self._checked_at = time.monotonic()
+
+    def get(self):
+        """Retourne (version, updated_at) sans requête tant que le délai de relecture n'est pas écoulé"""
+        with self._lock:
+            now = time.monotonic()
+            if self._value is None or now - self._checked_at >= self.poll_interval:
+                self._value = self.versions.get(self.name)
+                self._checked_at = now
+                self.checks += 1
+            return self._value
+
+
+def get_collection_versions(db):
+    return CollectionVersions(db[Config.COLLECTION_VERSIONS])
+
+
+_pollers = {}
+
+
+def get_version_poller(db, name):
+    """Poller partagé par les services d'un même worker pour la collection `name`"""
+    poller = _pollers.get(name)
+    if poller is None:
+        poller = _pollers.setdefault(name, VersionPoller(get_collection_versions(db), name))
+    return poller
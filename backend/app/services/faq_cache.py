@@ -0,0 +1,146 @@
+import hashlib
+import threading
+from ..config.config import Config
+from .collection_versions import VersionPoller, get_collection_versions
+from .faq_index import get_faq_index
+from .faq_search import get_faq_search_index
+from .faq_vectors import get_faq_vector_index
+from .faq_suggest import get_faq_suggest_index
+from .faq_duplicates import get_faq_duplicate_index
+from .faq_related import get_faq_related_table
+
+
+class FAQCache:
+    """Cache en lecture seule de la liste des FAQ, avec la réponse JSON déjà sérialisée.
+
+    La version de la collection (collection_versions) est relue au plus toutes les
+    `poll_interval` secondes ; si elle a changé (écriture dans un autre worker ou par
+    un script d'import), la liste est rechargée et les index en mémoire (chemin rapide
+    du chat, recherche, autocomplétion) reconstruits. Les écritures de ce worker, déjà
+    appliquées aux index par FAQService, ne mettent à jour que la liste et sa sérialisation.
+    """
+
+    def __init__(self, faq_collection, serialize, poll_interval=None, indexes=None):
+        self.faq_collection = faq_collection
+        self.serialize = serialize
+        self.poll_interval = Config.FAQ_CACHE_POLL_SECONDS if poll_interval is None else poll_interval
+        self.version_poller = VersionPoller(
+            get_collection_versions(faq_collection.database), "faqs", self.poll_interval
+        )
+        if indexes is None:
+            indexes = [get_faq_index(), get_faq_search_index(), get_faq_suggest_index(), get_faq_vector_index(),
+                       get_faq_related_table(), get_faq_duplicate_index()]
+        self.indexes = [index for index in indexes if index is not None]
+
+        self._lock = threading.Lock()
+        # Un seul rechargement complet à la fois ; les autres lecteurs gardent la version en cache
+        self._reload_lock = threading.Lock()
+        self._version = None
+        self._faqs = None
+        self._payload = None
+        self.etag = None
+        self.last_modified = None
+        self.counters = {"hits": 0, "reloads": 0, "incremental_updates": 0}
+
+    def invalidate(self):
+        """Force un rechargement complet à la prochaine lecture"""
+        self.version_poller.invalidate()
+        with self._lock:
+            self._version = None
+
+    def _set_faqs(self, faqs, version, updated_at):
+        """À appeler sous verrou : liste, corps sérialisé et validateurs de `version`"""
+        self._faqs = faqs
+        self._payload = self.serialize(faqs)
+        # ETag fort : empreinte du corps servi
+        self.etag = hashlib.sha1(self._payload.encode()).hexdigest()[:20]
+        self.last_modified = updated_at
+        self._version = version
+
+    def apply(self, version, updated_at, upserted=(), removed=()):
+        """Écriture de ce worker (index déjà à jour) : passe à `version` sans tout recharger.
+
+        Si une autre écriture s'est intercalée depuis la version en cache, on retombe
+        sur un rechargement complet.
+        """
+        with self._lock:
+            if self._faqs is None or self._version != version - 1:
+                self.version_poller.invalidate()
+                return
+            removed = {str(faq_id) for faq_id in removed}
+            changed = {str(faq["_id"]): faq for faq in upserted}
+            faqs = []
+            for faq in self._faqs:
+                if faq["_id"] in removed:
+                    continue
+                faqs.append(changed.pop(faq["_id"], faq))
+            faqs.extend(changed.values())
+            self._set_faqs(faqs, version, updated_at)
+            self.counters["incremental_updates"] += 1
+        self.version_poller.set((version, updated_at))
+
+    def sync(self):
+        """Recharge si la version a changé ; retourne la version en cache"""
+        version, updated_at = self.version_poller.get()
+        with self._lock:
+            if version == self._version:
+                self.counters["hits"] += 1
+                return version
+        # Premier chargement : on attend ; ensuite, la version en cache est servie pendant le rechargement
+        if not self._reload_lock.acquire(blocking=self._faqs is None):
+            return self._version
+        try:
+            with self._lock:
+                if version == self._version:
+                    return version
+            faqs = list(self.faq_collection.find())
+            for faq in faqs:
+                faq['_id'] = str(faq['_id'])
+            # Les index sont reconstruits avant de publier la version : une écriture locale
+            # concurrente voit une version différente et déclenche un nouveau rechargement
+            for index in self.indexes:
+                index.rebuild(faqs)
+            with self._lock:
+                self._set_faqs(faqs, version, updated_at)
+                self.counters["reloads"] += 1
+            return version
+        finally:
+            self._reload_lock.release()
+
+    def get_validators(self):
+        """(ETag, Last-Modified) de la version en cache, pour les GET conditionnels"""
+        self.sync()
+        return self.etag, self.last_modified
+
+    def get_faqs(self):
+        self.sync()
+        return self._faqs
+
+    def get_payload(self):
+        """Retourne (corps JSON sérialisé, version)"""
+        version = self.sync()
+        return self._payload, version
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "version": self._version,
+                "size": len(self._faqs or []),
+                "poll_interval_seconds": self.poll_interval,
+                "version_checks": self.version_poller.checks,
+                **self.counters
+            }
+
+
+_cache = None
+
+
+def init_faq_cache(faq_collection, serialize):
+    global _cache
+    if _cache is None:
+        _cache = FAQCache(faq_collection, serialize)
+    return _cache
+
+
+def get_faq_cache():
+    return _cache
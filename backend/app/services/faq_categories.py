@@ -0,0 +1,57 @@
+from datetime import datetime
+from ..config.config import Config
+
+
+class FAQCategoryCounts:
+    """Nombre de FAQ par catégorie, tenu à jour à chaque écriture (un document par catégorie).
+
+    La facette des catégories est lue par un simple find sur cette petite collection au
+    lieu d'une agrégation $group sur les FAQ à chaque requête. Après un import en masse
+    les compteurs sont recalculés d'un coup avec `rebuild`.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def increment(self, category, delta=1):
+        if not category or not delta:
+            return
+        self.collection.update_one(
+            {"_id": category},
+            {"$inc": {"count": delta}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        if delta < 0:
+            self.collection.delete_one({"_id": category, "count": {"$lte": 0}})
+
+    def move(self, old_category, new_category):
+        """Une FAQ change de catégorie"""
+        if old_category != new_category:
+            self.increment(old_category, -1)
+            self.increment(new_category, 1)
+
+    def rebuild(self, faq_collection):
+        """Recalcule tous les compteurs depuis la collection des FAQ"""
+        counts = {
+            row["_id"]: row["count"]
+            for row in faq_collection.aggregate([{"$group": {"_id": "$category", "count": {"$sum": 1}}}])
+            if row["_id"]
+        }
+        now = datetime.utcnow()
+        for category, count in counts.items():
+            self.collection.update_one(
+                {"_id": category}, {"$set": {"count": count, "updated_at": now}}, upsert=True
+            )
+        self.collection.delete_many({"_id": {"$nin": list(counts)}})
+        return counts
+
+    def get_counts(self):
+        """{catégorie: nombre de FAQ}, catégories les plus fournies d'abord"""
+        return {
+            doc["_id"]: doc["count"]
+            for doc in self.collection.find({"count": {"$gt": 0}}).sort([("count", -1), ("_id", 1)])
+        }
+
+
+def get_faq_category_counts(db):
+    return FAQCategoryCounts(db[Config.FAQ_CATEGORIES_COLLECTION])
@@ -0,0 +1,137 @@
+import threading
+from ..config.config import Config
+from ..utils.minhash import MinHasher, MinHashLSH, shingles
+from ..utils.text import analyze
+
+FIELDS = ("question", "answer")
+
+
+class FAQDuplicateIndex:
+    """Détection des FAQ quasi dupliquées par MinHash + LSH, sur les questions et les réponses.
+
+    Chaque FAQ a une signature MinHash par champ, rangée dans un index LSH par champ.
+    Deux FAQ sont quasi dupliquées si la similarité de Jaccard estimée de leurs questions
+    ou de leurs réponses atteint `threshold`. Seuls les candidats LSH sont comparés :
+    une vérification coûte O(bandes + candidats), le rapport complet reste quasi linéaire.
+    """
+
+    def __init__(self, threshold=None, num_perm=None):
+        self.threshold = threshold or Config.FAQ_DUPLICATE_THRESHOLD
+        self.hasher = MinHasher(num_perm or Config.FAQ_MINHASH_PERMUTATIONS)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._lsh = {field: MinHashLSH(self.threshold, self.hasher.num_perm) for field in FIELDS}
+        self._signatures = {}
+        self._docs = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _signatures_for(self, faq):
+        """Signature par champ ; None pour un champ vide (jamais comparé)"""
+        signatures = {}
+        for field in FIELDS:
+            items = shingles(analyze(faq.get(field) or ""))
+            signatures[field] = self.hasher.signature(items) if items else None
+        return signatures
+
+    def rebuild(self, faqs):
+        with self._lock:
+            self._reset()
+            for faq in faqs:
+                self.upsert(faq)
+
+    def upsert(self, faq):
+        faq_id = str(faq['_id'])
+        signatures = self._signatures_for(faq)
+        with self._lock:
+            self._signatures[faq_id] = signatures
+            self._docs[faq_id] = {"question": faq.get('question'), "category": faq.get('category')}
+            for field in FIELDS:
+                if signatures[field] is None:
+                    self._lsh[field].remove(faq_id)
+                else:
+                    self._lsh[field].insert(faq_id, signatures[field])
+
+    def remove(self, faq_id):
+        faq_id = str(faq_id)
+        with self._lock:
+            if self._docs.pop(faq_id, None) is None:
+                return
+            del self._signatures[faq_id]
+            for field in FIELDS:
+                self._lsh[field].remove(faq_id)
+
+    def _matches(self, faq_id, signatures):
+        """[(autre_id, {question, answer})] des candidats LSH au-dessus du seuil"""
+        candidates = set()
+        for field in FIELDS:
+            if signatures[field] is not None:
+                candidates.update(self._lsh[field].query(signatures[field]))
+        candidates.discard(faq_id)
+        matches = []
+        for other_id in candidates:
+            other = self._signatures[other_id]
+            scores = {
+                field: round(MinHasher.jaccard(signatures[field], other[field]), 3)
+                if signatures[field] is not None and other[field] is not None else 0.0
+                for field in FIELDS
+            }
+            if max(scores.values()) >= self.threshold:
+                matches.append((other_id, scores))
+        return matches
+
+    def find_duplicates(self, faq, exclude_id=None, limit=5):
+        """FAQ existantes proches de `faq` (dict question/answer), les plus similaires d'abord"""
+        signatures = self._signatures_for(faq)
+        with self._lock:
+            matches = self._matches(str(exclude_id) if exclude_id else None, signatures)
+            duplicates = [
+                dict(self._docs[other_id], _id=other_id, similarity=scores)
+                for other_id, scores in matches
+            ]
+        duplicates.sort(key=lambda d: -max(d["similarity"].values()))
+        return duplicates[:limit]
+
+    def report(self):
+        """Groupes de FAQ quasi dupliquées sur toute la collection (union-find sur les paires)"""
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        with self._lock:
+            pairs = []
+            for faq_id, signatures in self._signatures.items():
+                for other_id, scores in self._matches(faq_id, signatures):
+                    if faq_id < other_id:
+                        pairs.append({"faq_ids": [faq_id, other_id], "similarity": scores})
+                        parent[find(faq_id)] = find(other_id)
+            groups = {}
+            for faq_id in parent:
+                groups.setdefault(find(faq_id), []).append(faq_id)
+            clusters = [
+                [dict(self._docs[faq_id], _id=faq_id) for faq_id in sorted(members)]
+                for members in groups.values()
+            ]
+            total = len(self._docs)
+        clusters.sort(key=len, reverse=True)
+        return {
+            "threshold": self.threshold,
+            "faqs": total,
+            "pairs": sorted(pairs, key=lambda p: -max(p["similarity"].values())),
+            "clusters": clusters
+        }
+
+
+_index = FAQDuplicateIndex()
+
+
+def get_faq_duplicate_index():
+    return _index
@@ -0,0 +1,234 @@
+import codecs
+import csv
+import hashlib
+import io
+import json
+import time
+import uuid
+from datetime import datetime
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from ..utils.text import normalize_message
+
+FORMATS = ("json", "ndjson", "csv")
+
+
+def detect_format(filename=None, content_type=None):
+    """Format d'import d'après l'extension ou le Content-Type (json par défaut)"""
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonlines" in content_type:
+        return "ndjson"
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    return "json"
+
+
+def text_stream(stream):
+    """Flux texte UTF-8 (BOM toléré) à partir d'un flux binaire ou texte"""
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return codecs.getreader("utf-8-sig")(stream)
+
+
+def iter_json_array(stream, chunk_size=65536):
+    """Objets d'un tableau JSON lus au fil de l'eau, sans charger tout le fichier"""
+    decoder = json.JSONDecoder()
+    buffer, position, eof, started = "", 0, False, False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON input")
+            fill()
+            continue
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("JSON input must be an array of FAQ objects")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        position = end
+        yield value
+
+
+def iter_records(stream, fmt):
+    stream = text_stream(stream)
+    if fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == "csv":
+        try:
+            yield from csv.DictReader(stream)
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV: {e}")
+    elif fmt == "json":
+        yield from iter_json_array(stream)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def faq_key(record):
+    """Clé stable d'une FAQ : clé explicite, sinon empreinte de la question normalisée"""
+    key = record.get("faq_key") or record.get("key") or record.get("id")
+    if key:
+        return str(key)
+    return "q-" + hashlib.sha1(normalize_message(record.get("question", "")).encode()).hexdigest()[:16]
+
+
+def content_hash(question, answer, category):
+    return hashlib.sha1("\x1f".join([question, answer, category]).encode()).hexdigest()
+
+
+class FAQImporter:
+    """Import en flux de FAQ (JSON, NDJSON, CSV) par lots de bulk_write upsert.
+
+    Chaque ligne est rattachée à son document par `faq_key` ; l'empreinte du contenu
+    (`content_hash`) permet d'ignorer les lignes inchangées. Rien n'est supprimé avant
+    la fin de l'import : avec `prune`, les FAQ absentes du fichier sont retirées après
+    coup, la collection n'est donc jamais vide pour les lecteurs.
+    """
+
+    def __init__(self, faq_collection, batch_size=500, max_errors=20):
+        self.faq_collection = faq_collection
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def ensure_indexes(self):
+        self.faq_collection.create_index(
+            [("faq_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"faq_key": {"$exists": True}}
+        )
+
+    def _write_keys(self, docs, key_fn):
+        operations = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {
+                "faq_key": key_fn(doc),
+                "content_hash": content_hash(doc.get("question", ""), doc.get("answer", ""), doc.get("category", ""))
+            }})
+            for doc in docs
+        ]
+        try:
+            self.faq_collection.bulk_write(operations, ordered=False)
+            return []
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            return [doc for index, doc in enumerate(docs) if index in failed]
+
+    def backfill_keys(self):
+        """Attribue une faq_key aux FAQ créées avant l'import par clé"""
+        count, batch = 0, []
+        cursor = self.faq_collection.find(
+            {"faq_key": {"$exists": False}},
+            {"id": 1, "question": 1, "answer": 1, "category": 1}
+        )
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                count += len(batch)
+                # Question en double : la clé dérivée de l'_id reste unique
+                self._write_keys(self._write_keys(batch, faq_key), lambda d: f"oid-{d['_id']}")
+                batch = []
+        if batch:
+            count += len(batch)
+            self._write_keys(self._write_keys(batch, faq_key), lambda d: f"oid-{d['_id']}")
+        return count
+
+    def _validate(self, record):
+        question = (record.get("question") or "").strip()
+        answer = (record.get("answer") or "").strip()
+        if not question or not answer:
+            raise ValueError("question and answer are required")
+        return question, answer, (record.get("category") or "general").strip()
+
+    def _flush(self, batch, report, run_id):
+        keys = [key for key, _ in batch]
+        existing = {
+            doc["faq_key"]: doc.get("content_hash")
+            for doc in self.faq_collection.find({"faq_key": {"$in": keys}}, {"faq_key": 1, "content_hash": 1})
+        }
+        now = datetime.utcnow()
+        operations, touched = [], 0
+        for key, fields in batch:
+            if existing.get(key) == fields["content_hash"]:
+                report["unchanged"] += 1
+                if run_id:
+                    # Marque la FAQ comme présente dans le fichier (pour prune)
+                    operations.append(UpdateOne({"faq_key": key}, {"$set": {"import_run": run_id}}))
+                    touched += 1
+                continue
+            update = {
+                "$set": dict(fields, updated_at=now),
+                "$setOnInsert": {"faq_key": key, "id": key, "popularity": 0, "created_at": now}
+            }
+            if run_id:
+                update["$set"]["import_run"] = run_id
+            operations.append(UpdateOne({"faq_key": key}, update, upsert=True))
+        if operations:
+            result = self.faq_collection.bulk_write(operations, ordered=False)
+            report["inserted"] += result.upserted_count
+            report["updated"] += result.modified_count - touched
+        batch.clear()
+
+    def import_stream(self, stream, fmt="json", prune=False):
+        """Importe un flux et retourne le rapport (inserted, updated, unchanged, invalid, deleted)"""
+        started = time.perf_counter()
+        self.ensure_indexes()
+        self.backfill_keys()
+        run_id = uuid.uuid4().hex if prune else None
+        report = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "invalid": 0, "deleted": 0, "errors": []}
+
+        batch, seen = [], set()
+        for line, record in enumerate(iter_records(stream, fmt), start=1):
+            report["read"] += 1
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError("record must be an object")
+                question, answer, category = self._validate(record)
+            except ValueError as e:
+                report["invalid"] += 1
+                if len(report["errors"]) < self.max_errors:
+                    report["errors"].append(f"record {line}: {e}")
+                continue
+            key = faq_key(record)
+            if key in seen:
+                # Une même clé deux fois dans le lot : la dernière occurrence l'emporte
+                batch = [(k, f) for k, f in batch if k != key]
+            seen.add(key)
+            batch.append((key, {
+                "question": question,
+                "answer": answer,
+                "category": category,
+                "content_hash": content_hash(question, answer, category)
+            }))
+            if len(batch) >= self.batch_size:
+                self._flush(batch, report, run_id)
+                seen.clear()
+        if batch:
+            self._flush(batch, report, run_id)
+
+        if prune and report["read"] and not report["invalid"]:
+            report["deleted"] = self.faq_collection.delete_many({"import_run": {"$ne": run_id}}).deleted_count
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return report
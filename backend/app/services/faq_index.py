@@ -0,0 +1,109 @@
+import math
+import threading
+from ..utils.text import tokenize
+
+
+class FAQIndex:
+    """Index inversé en mémoire des questions FAQ pour le chemin rapide du chat.
+
+    Le score est un cosinus TF-IDF binaire entre le message et la question ;
+    les IDF sont recalculés à la volée, l'index se met à jour FAQ par FAQ.
+    """
+
+    def __init__(self):
+        self._docs = {}
+        self._postings = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, faq_id):
+        return str(faq_id) in self._docs
+
+    def get(self, faq_id):
+        """Question, réponse et catégorie d'une FAQ, ou None"""
+        doc = self._docs.get(str(faq_id))
+        if doc is None:
+            return None
+        return {"_id": str(faq_id), "question": doc["question"], "answer": doc["answer"], "category": doc["category"]}
+
+    def rebuild(self, faqs):
+        with self._lock:
+            self._docs = {}
+            self._postings = {}
+            for faq in faqs:
+                self.upsert(faq)
+        print(f"FAQ index rebuilt with {len(self._docs)} entries")
+
+    def upsert(self, faq):
+        faq_id = str(faq['_id'])
+        tokens = frozenset(tokenize(faq.get('question', '')))
+        with self._lock:
+            self._remove_postings(faq_id)
+            self._docs[faq_id] = {
+                "tokens": tokens,
+                "question": faq.get('question'),
+                "answer": faq.get('answer'),
+                "category": faq.get('category')
+            }
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(faq_id)
+
+    def remove(self, faq_id):
+        faq_id = str(faq_id)
+        with self._lock:
+            self._remove_postings(faq_id)
+            self._docs.pop(faq_id, None)
+
+    def _remove_postings(self, faq_id):
+        doc = self._docs.get(faq_id)
+        if not doc:
+            return
+        for token in doc["tokens"]:
+            ids = self._postings.get(token)
+            if ids is not None:
+                ids.discard(faq_id)
+                if not ids:
+                    del self._postings[token]
+
+    def _idf(self, token):
+        return math.log(1 + len(self._docs) / (1 + len(self._postings.get(token, ()))))
+
+    def match(self, message):
+        """Retourne (faq_id, faq, score) pour la meilleure question, ou (None, None, 0.0)"""
+        query = frozenset(tokenize(message))
+        if not query:
+            return None, None, 0.0
+
+        with self._lock:
+            candidates = set()
+            for token in query:
+                candidates.update(self._postings.get(token, ()))
+            if not candidates:
+                return None, None, 0.0
+
+            idf = {}
+            def weight(token):
+                if token not in idf:
+                    idf[token] = self._idf(token) ** 2
+                return idf[token]
+
+            query_norm = math.sqrt(sum(weight(t) for t in query))
+            best_id, best_score = None, 0.0
+            for faq_id in candidates:
+                tokens = self._docs[faq_id]["tokens"]
+                shared = sum(weight(t) for t in query & tokens)
+                norm = query_norm * math.sqrt(sum(weight(t) for t in tokens))
+                score = shared / norm if norm else 0.0
+                if score > best_score:
+                    best_id, best_score = faq_id, score
+            return best_id, dict(self._docs[best_id]), best_score
+
+
+_index = FAQIndex()
+
+
+def get_faq_index():
+    """Index FAQ partagé par FAQService et ChatService dans le worker courant"""
+    return _index
@@ -0,0 +1,270 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from ..config.config import Config
+from .faq_vectors import get_faq_vector_index
+
+# Nombre max de similarités calculées à la fois (blocs de lignes × toutes les FAQ)
+BLOCK_ELEMENTS = 4_000_000
+
+
+class FAQRelatedTable:
+    """Table des k FAQ les plus proches de chaque FAQ, servie en O(1).
+
+    Les similarités cosinus sont des produits matriciels par blocs sur les vecteurs de
+    FAQVectorIndex. La table est compacte (voisins int32 et scores float16, k par FAQ) et
+    enregistrée dans le répertoire de l'instantané des vecteurs auquel elle correspond
+    (pas après les écritures unitaires, qui ne touchent que la mémoire). Après une modification, un thread
+    de fond ne recalcule que les lignes touchées : celles des FAQ modifiées et celles
+    dont un voisin a changé ; les autres lignes intègrent seulement les FAQ modifiées
+    dans leur top-k.
+    """
+
+    SNAPSHOT_FILE = "faq_related.npz"
+
+    def __init__(self, vector_index, k=None, debounce=None):
+        self.vector_index = vector_index
+        self.k = k or Config.FAQ_RELATED_K
+        self.debounce = Config.FAQ_RELATED_DEBOUNCE_SECONDS if debounce is None else debounce
+
+        self._lock = threading.RLock()
+        self._ids = []
+        self._hashes = []
+        self._rows = {}
+        self._neighbors = np.full((0, self.k), -1, dtype=np.int32)
+        self._scores = np.zeros((0, self.k), dtype=np.float16)
+        self._loaded = False
+        self._pid = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.counters = {"refreshes": 0, "rows_recomputed": 0, "rows_merged": 0, "last_refresh_ms": 0.0}
+        atexit.register(self.close)
+
+    # Même contrat que les autres index FAQ : le travail est différé au thread de fond
+    def rebuild(self, faqs):
+        self.schedule()
+
+    def upsert(self, faq):
+        self.schedule()
+
+    def remove(self, faq_id):
+        self.schedule()
+
+    def schedule(self):
+        self._ensure_started()
+        self._wake.set()
+
+    def _ensure_started(self):
+        # Un thread de calcul par processus (workers forkés)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._wake = threading.Event()
+            self._stop = threading.Event()
+            threading.Thread(target=self._run, name="faq-related", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            if self._stop.is_set():
+                return
+            # Regroupe les modifications rapprochées en un seul recalcul
+            time.sleep(self.debounce)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing related FAQs: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _load(self):
+        directory, _, _ = self.vector_index.persisted_snapshot()
+        if directory is None:
+            return
+        try:
+            with np.load(os.path.join(directory, self.SNAPSHOT_FILE), allow_pickle=False) as data:
+                if data["neighbors"].shape[1] != self.k:
+                    return
+                self._ids = [str(i) for i in data["ids"]]
+                self._hashes = [str(h) for h in data["hashes"]]
+                self._neighbors = data["neighbors"]
+                self._scores = data["scores"]
+                self._rows = {faq_id: row for row, faq_id in enumerate(self._ids)}
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def _save(self, ids, hashes, neighbors, scores):
+        """Enregistre la table une fois par instantané de vecteurs, s'il correspond à ces vecteurs"""
+        directory, snapshot_ids, snapshot_hashes = self.vector_index.persisted_snapshot()
+        if directory is None or ids != snapshot_ids or hashes != snapshot_hashes:
+            return
+        path = os.path.join(directory, self.SNAPSHOT_FILE)
+        if os.path.exists(path):
+            return
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp.npz"
+        np.savez(tmp, ids=np.array(ids, dtype=str), hashes=np.array(hashes, dtype=str),
+                 neighbors=neighbors, scores=scores)
+        os.replace(tmp, path)
+
+    def _top_k(self, scores, columns):
+        """Indices (dans `columns`) et valeurs des k plus grands scores de chaque ligne"""
+        k = min(self.k, scores.shape[1])
+        neighbors = np.full((scores.shape[0], self.k), -1, dtype=np.int32)
+        values = np.zeros((scores.shape[0], self.k), dtype=np.float16)
+        if k == 0:
+            return neighbors, values
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        valid = np.isfinite(top_scores)
+        neighbors[:, :k] = np.where(valid, columns[top], -1)
+        values[:, :k] = np.where(valid, top_scores, 0)
+        return neighbors, values
+
+    def _compute_rows(self, matrix, rows):
+        """Top-k complet des lignes `rows` contre toute la matrice, par blocs"""
+        n = matrix.shape[0]
+        columns = np.arange(n, dtype=np.int32)
+        neighbors = np.full((len(rows), self.k), -1, dtype=np.int32)
+        values = np.zeros((len(rows), self.k), dtype=np.float16)
+        block = max(1, BLOCK_ELEMENTS // max(n, 1))
+        for start in range(0, len(rows), block):
+            batch = rows[start:start + block]
+            scores = np.asarray(matrix[batch] @ matrix.T, dtype=np.float32)
+            scores[np.arange(len(batch)), batch] = -np.inf
+            neighbors[start:start + block], values[start:start + block] = self._top_k(scores, columns)
+        return neighbors, values
+
+    def _merge_rows(self, matrix, rows, neighbors, values, changed):
+        """Intègre les FAQ `changed` au top-k existant des lignes `rows`"""
+        changed = np.asarray(changed, dtype=np.int32)
+        block = max(1, BLOCK_ELEMENTS // max(len(changed) + self.k, 1))
+        for start in range(0, len(rows), block):
+            batch = rows[start:start + block]
+            fresh = np.asarray(matrix[batch] @ matrix[changed].T, dtype=np.float32)
+            current = values[batch].astype(np.float32)
+            current[neighbors[batch] < 0] = -np.inf
+            scores = np.concatenate([current, fresh], axis=1)
+            candidates = np.concatenate([neighbors[batch], np.broadcast_to(changed, fresh.shape)], axis=1)
+            k = min(self.k, scores.shape[1])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            valid = np.isfinite(top_scores)
+            neighbors[batch, :k] = np.where(valid, np.take_along_axis(candidates, top, axis=1), -1)
+            values[batch, :k] = np.where(valid, top_scores, 0)
+
+    def refresh(self):
+        """Aligne la table sur les vecteurs courants en ne recalculant que les lignes touchées"""
+        started = time.perf_counter()
+        matrix, ids, hashes = self.vector_index.snapshot()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+            old_ids, old_hashes = self._ids, self._hashes
+            old_neighbors = self._neighbors
+            old_scores = self._scores
+        if ids == old_ids and hashes == old_hashes:
+            return
+
+        n = len(ids)
+        old_rows = {faq_id: row for row, faq_id in enumerate(old_ids)}
+        # Ancienne ligne -> nouvelle ligne (-1 pour une FAQ supprimée ou modifiée)
+        remap = np.full(len(old_ids) + 1, -1, dtype=np.int32)
+        changed = []
+        for row, (faq_id, digest) in enumerate(zip(ids, hashes)):
+            old_row = old_rows.get(faq_id)
+            if old_row is not None and old_hashes[old_row] == digest:
+                remap[old_row] = row
+            else:
+                changed.append(row)
+
+        neighbors = np.full((n, self.k), -1, dtype=np.int32)
+        values = np.zeros((n, self.k), dtype=np.float16)
+        changed_rows = set(changed)
+        kept = [row for row in range(n) if ids[row] in old_rows and row not in changed_rows]
+        dirty = list(changed)
+        if kept:
+            kept_old = np.array([old_rows[ids[row]] for row in kept], dtype=np.int32)
+            moved = remap[old_neighbors[kept_old]]
+            # Un voisin supprimé ou modifié : la ligne doit être recalculée entièrement
+            lost = ((old_neighbors[kept_old] >= 0) & (moved < 0)).any(axis=1)
+            dirty.extend(np.array(kept)[lost].tolist())
+            clean = np.array(kept)[~lost]
+            neighbors[clean] = moved[~lost]
+            values[clean] = old_scores[kept_old[~lost]]
+            if changed and len(clean):
+                self._merge_rows(matrix, clean, neighbors, values, changed)
+                self.counters["rows_merged"] += len(clean)
+        if dirty:
+            dirty = np.array(sorted(dirty), dtype=np.int32)
+            neighbors[dirty], values[dirty] = self._compute_rows(matrix, dirty)
+            self.counters["rows_recomputed"] += len(dirty)
+
+        with self._lock:
+            self._ids, self._hashes = ids, hashes
+            self._rows = {faq_id: row for row, faq_id in enumerate(ids)}
+            self._neighbors, self._scores = neighbors, values
+            self.counters["refreshes"] += 1
+            self.counters["last_refresh_ms"] = (time.perf_counter() - started) * 1000
+        self._save(ids, hashes, neighbors, values)
+
+    def related(self, faq_id, limit=None):
+        """[(faq_id, score)] des FAQ les plus proches, lus dans la table ; None si la FAQ est inconnue"""
+        limit = min(limit or self.k, self.k)
+        with self._lock:
+            row = self._rows.get(str(faq_id))
+            if row is not None:
+                return [
+                    (self._ids[neighbor], float(score))
+                    for neighbor, score in zip(self._neighbors[row][:limit], self._scores[row][:limit])
+                    if neighbor >= 0
+                ]
+        # FAQ pas encore dans la table (recalcul en attente) : une seule ligne, calculée à la volée
+        matrix, ids, _ = self.vector_index.snapshot()
+        if str(faq_id) not in ids:
+            return None
+        row = ids.index(str(faq_id))
+        neighbors, values = self._compute_rows(matrix, np.array([row], dtype=np.int32))
+        return [(ids[n], float(s)) for n, s in zip(neighbors[0][:limit], values[0][:limit]) if n >= 0]
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "k": self.k,
+                "size": len(self._ids),
+                "bytes": int(self._neighbors.nbytes + self._scores.nbytes),
+                "pending": self._wake.is_set(),
+                **self.counters
+            }
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_faq_related_table():
+    """Table des FAQ liées du worker, ou None si FAQ_RELATED_ENABLED est désactivé"""
+    global _table
+    if not Config.FAQ_RELATED_ENABLED:
+        return None
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                vector_index = get_faq_vector_index()
+                _table = FAQRelatedTable(vector_index) if vector_index is not None else None
+    return _table
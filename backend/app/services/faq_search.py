@@ -0,0 +1,190 @@
+import bisect
+import threading
+import numpy as np
+from ..utils.text import analyze
+
+# Ordre des champs dans les matrices de fréquences
+FIELDS = ("question", "answer", "category")
+
+
+def _within_one_edit(a, b):
+    """Vrai si `b` s'obtient depuis `a` par une insertion, suppression, substitution ou transposition"""
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class BM25Index:
+    """Index inversé BM25F en mémoire sur question, réponse et catégorie.
+
+    Chaque FAQ occupe une ligne (slot) ; les postings d'un terme sont convertis en
+    tableaux NumPy à la demande et mis en cache jusqu'à la prochaine écriture qui
+    touche ce terme. Le dernier mot de la requête est aussi traité comme un préfixe
+    (saisie en cours) et un terme inconnu est rapproché des termes à une faute près.
+    """
+
+    def __init__(self, field_weights=None, k1=1.2, b=0.75, prefix_weight=0.8, typo_weight=0.6):
+        weights = field_weights or {"question": 3.0, "answer": 1.0, "category": 1.5}
+        self.weights = np.array([weights.get(f, 0.0) for f in FIELDS], dtype=np.float32)
+        self.k1 = k1
+        self.b = b
+        self.prefix_weight = prefix_weight
+        self.typo_weight = typo_weight
+
+        self._lock = threading.RLock()
+        self._slots = {}
+        self._free = []
+        self._docs = []
+        self._lengths = np.zeros((0, len(FIELDS)), dtype=np.float32)
+        self._postings = {}
+        self._arrays = {}
+        self._vocabulary = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def rebuild(self, faqs):
+        with self._lock:
+            self._slots, self._free, self._docs = {}, [], []
+            self._lengths = np.zeros((0, len(FIELDS)), dtype=np.float32)
+            self._postings, self._arrays, self._vocabulary = {}, {}, None
+            for faq in faqs:
+                self.upsert(faq)
+
+    def _allocate(self):
+        if self._free:
+            return self._free.pop()
+        slot = len(self._docs)
+        self._docs.append(None)
+        if slot >= len(self._lengths):
+            grown = np.zeros((max(16, 2 * len(self._lengths)), len(FIELDS)), dtype=np.float32)
+            grown[:len(self._lengths)] = self._lengths
+            self._lengths = grown
+        return slot
+
+    def upsert(self, faq):
+        faq_id = str(faq['_id'])
+        fields = [analyze(faq.get(field) or "") for field in FIELDS]
+        with self._lock:
+            self.remove(faq_id)
+            slot = self._allocate()
+            self._slots[faq_id] = slot
+            self._docs[slot] = {
+                "_id": faq_id,
+                "question": faq.get('question'),
+                "answer": faq.get('answer'),
+                "category": faq.get('category'),
+                "terms": set()
+            }
+            for position, terms in enumerate(fields):
+                self._lengths[slot, position] = len(terms)
+                for term in terms:
+                    counts = self._postings.setdefault(term, {})
+                    counts.setdefault(slot, [0, 0, 0])[position] += 1
+                    self._docs[slot]["terms"].add(term)
+                    self._arrays.pop(term, None)
+            self._vocabulary = None
+
+    def remove(self, faq_id):
+        faq_id = str(faq_id)
+        with self._lock:
+            slot = self._slots.pop(faq_id, None)
+            if slot is None:
+                return
+            for term in self._docs[slot]["terms"]:
+                counts = self._postings.get(term)
+                counts.pop(slot, None)
+                if not counts:
+                    del self._postings[term]
+                self._arrays.pop(term, None)
+            self._docs[slot] = None
+            self._lengths[slot] = 0
+            self._free.append(slot)
+            self._vocabulary = None
+
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            counts = self._postings[term]
+            slots = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = np.array(list(counts.values()), dtype=np.float32)
+            arrays = self._arrays[term] = (slots, tf)
+        return arrays
+
+    def _expand(self, terms):
+        """Termes de l'index pour chaque terme de requête, avec leur poids"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        expanded = {}
+
+        def add(term, weight):
+            expanded[term] = max(expanded.get(term, 0.0), weight)
+
+        for position, term in enumerate(terms):
+            if term in self._postings:
+                add(term, 1.0)
+            elif len(term) >= 4:
+                for candidate in self._vocabulary:
+                    if candidate[0] == term[0] and _within_one_edit(term, candidate):
+                        add(candidate, self.typo_weight)
+            if position == len(terms) - 1 and len(term) >= 2:
+                start = bisect.bisect_left(self._vocabulary, term)
+                for candidate in self._vocabulary[start:start + 50]:
+                    if not candidate.startswith(term):
+                        break
+                    if candidate != term:
+                        add(candidate, self.prefix_weight)
+        return expanded
+
+    def search(self, query, limit=10, category=None):
+        """Retourne [(faq, score)] triés par score BM25F décroissant"""
+        terms = analyze(query)
+        if not terms:
+            return []
+        with self._lock:
+            count = len(self._slots)
+            if not count:
+                return []
+            capacity = len(self._docs)
+            lengths = self._lengths[:capacity]
+            average = np.maximum(lengths.sum(axis=0) / count, 1.0)
+            scores = np.zeros(capacity, dtype=np.float32)
+
+            for term, weight in self._expand(terms).items():
+                slots, tf = self._term_arrays(term)
+                norm = 1 - self.b + self.b * lengths[slots] / average
+                weighted = (tf / norm) @ self.weights
+                idf = np.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+                scores[slots] += weight * idf * weighted * (self.k1 + 1) / (weighted + self.k1)
+
+            if category:
+                for slot, doc in enumerate(self._docs):
+                    if doc is not None and doc["category"] != category:
+                        scores[slot] = 0.0
+
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [
+                ({k: v for k, v in self._docs[slot].items() if k != "terms"}, float(scores[slot]))
+                for slot in candidates
+            ]
+
+
+_index = BM25Index()
+
+
+def get_faq_search_index():
+    """Index de recherche FAQ du worker courant"""
+    return _index
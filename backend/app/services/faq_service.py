@@ -1,13 +1,87 @@
-import json
 from datetime import datetime
 import os
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from .faq_index import get_faq_index
+from .faq_search import get_faq_search_index
+from .faq_vectors import get_faq_vector_index
+from .faq_suggest import get_faq_suggest_index
+from .faq_duplicates import get_faq_duplicate_index
+from .faq_related import get_faq_related_table
+from .faq_cache import get_faq_cache
+from .faq_usage import get_faq_usage
+from .faq_import import FAQImporter
+from .faq_categories import get_faq_category_counts
+from .collection_versions import get_collection_versions
+from ..utils.pagination import encode_cursor, decode_cursor, keyset_condition, clamp_page_size
+from ..config.config import Config
+
+# Tris du listing paginé : champ trié (décroissant, puis _id décroissant)
+FAQ_SORTS = {"popular": "popularity", "recent": "updated_at"}
+# Champs demandables avec ?fields= (l'_id est toujours renvoyé)
+FAQ_LIST_FIELDS = ("question", "answer", "category", "popularity", "created_at", "updated_at")
 
 class FAQService:
-    def __init__(self, faq_collection):
+    def __init__(self, faq_collection, faq_index=None, search_index=None, vector_index=None, suggest_index=None,
+                 duplicate_index=None, related_table=None):
         self.faq_collection = faq_collection
+        self.faq_index = faq_index if faq_index is not None else get_faq_index()
+        self.search_index = search_index if search_index is not None else get_faq_search_index()
+        self.vector_index = vector_index if vector_index is not None else get_faq_vector_index()
+        self.suggest_index = suggest_index if suggest_index is not None else get_faq_suggest_index()
+        self.duplicate_index = duplicate_index if duplicate_index is not None else get_faq_duplicate_index()
+        self.related_table = related_table if related_table is not None else get_faq_related_table()
+        self.versions = get_collection_versions(faq_collection.database)
+        self.categories = get_faq_category_counts(faq_collection.database)
         print("FAQService initialisé avec la collection:", faq_collection.name)
 
+    def refresh_faq_index(self):
+        """Reconstruit les index en mémoire (chemin rapide du chat et recherche)"""
+        faqs = list(self.faq_collection.find({}, {'question': 1, 'answer': 1, 'category': 1, 'popularity': 1}))
+        for index in self.indexes:
+            index.rebuild(faqs)
+
+    @property
+    def indexes(self):
+        """Index en mémoire tenus à jour à chaque écriture"""
+        # La table des FAQ liées suit l'index vectoriel, dont elle lit les vecteurs
+        indexes = (self.faq_index, self.search_index, self.suggest_index, self.vector_index,
+                   self.related_table, self.duplicate_index)
+        return [index for index in indexes if index is not None]
+
+    def mark_changed(self, upserted=(), removed=()):
+        """Nouvelle version de la collection : les autres workers rechargent tout.
+
+        Avec `upserted` / `removed` (écriture unitaire déjà appliquée aux index), le cache
+        de ce worker passe à la nouvelle version sans recharger ; sinon il est invalidé.
+        """
+        version, updated_at = self.versions.advance("faqs")
+        faq_cache = get_faq_cache()
+        if faq_cache is not None:
+            if upserted or removed:
+                faq_cache.apply(version, updated_at, upserted, removed)
+            else:
+                faq_cache.invalidate()
+        return version
+
+    def ensure_indexes(self):
+        """Index composés du listing (catégorie, tri, _id) et compteurs par catégorie"""
+        # Les anciennes FAQ n'ont pas toujours popularity / updated_at, nécessaires au tri
+        result = self.faq_collection.update_many(
+            {"$or": [{"popularity": {"$exists": False}}, {"updated_at": {"$exists": False}}]},
+            [{"$set": {
+                "popularity": {"$ifNull": ["$popularity", 0]},
+                "updated_at": {"$ifNull": ["$updated_at", {"$ifNull": ["$created_at", {"$toDate": "$_id"}]}]}
+            }}]
+        )
+        for field in FAQ_SORTS.values():
+            self.faq_collection.create_index([(field, DESCENDING), ("_id", DESCENDING)])
+            self.faq_collection.create_index([("category", ASCENDING), (field, DESCENDING), ("_id", DESCENDING)])
+        # Recalcul au démarrage : corrige une éventuelle dérive des compteurs
+        self.categories.rebuild(self.faq_collection)
+        if result.modified_count:
+            self.mark_changed()
+
     def init_faq_database(self):
         try:
             # Vérifier si la collection est vide
@@ -18,16 +92,10 @@ class FAQService:
                 faq_file_path = os.path.join(current_dir, '..', '..', 'faq_data.json')
                 
                 if os.path.exists(faq_file_path):
-                    with open(faq_file_path, 'r', encoding='utf-8') as f:
-                        faq_data = json.load(f)
-                        if faq_data:
-                            # Ajouter les champs de métadonnées
-                            for faq in faq_data:
-                                faq['created_at'] = datetime.utcnow()
-                                faq['updated_at'] = datetime.utcnow()
-                            
-                            result = self.faq_collection.insert_many(faq_data)
-                            print(f"✅ {len(result.inserted_ids)} FAQs initialisées avec succès")
+                    # Lecture en flux, insertion par lots
+                    with open(faq_file_path, 'rb') as f:
+                        report = self.import_faqs(f, "json")
+                    print(f"✅ {report['inserted']} FAQs initialisées avec succès")
                 else:
                     print(f"❌ Fichier faq_data.json non trouvé à {faq_file_path}")
             else:
@@ -36,27 +104,72 @@ class FAQService:
             print(f"❌ Erreur lors de l'initialisation de la base de données FAQ: {e}")
             raise
 
+    def import_faqs(self, stream, fmt="json", prune=False):
+        """Importe un flux JSON, NDJSON ou CSV (upsert par faq_key) et retourne le rapport"""
+        importer = FAQImporter(self.faq_collection, batch_size=Config.FAQ_IMPORT_BATCH_SIZE)
+        report = importer.import_stream(stream, fmt, prune)
+        if report["inserted"] or report["updated"] or report["deleted"]:
+            self.categories.rebuild(self.faq_collection)
+            self.mark_changed()
+        print(f"Import FAQ: {report['inserted']} insérées, {report['updated']} modifiées, "
+              f"{report['unchanged']} inchangées, {report['invalid']} invalides, {report['deleted']} supprimées")
+        return report
+
     def get_all_faqs(self):
         try:
-            print("Début de la récupération des FAQs...")
-            # Vérification de la connexion à la collection
-            print(f"Collection utilisée: {self.faq_collection.name}")
-            print(f"Nombre de documents dans la collection: {self.faq_collection.count_documents({})}")
-            
-            # Récupération de toutes les FAQs avec l'ID
+            faq_cache = get_faq_cache()
+            if faq_cache is not None:
+                return faq_cache.get_faqs()
+
             faqs = list(self.faq_collection.find())
-            print(f"Nombre de FAQs récupérées: {len(faqs)}")
-            
-            # Conversion des ObjectId en string et affichage des détails
             for faq in faqs:
                 faq['_id'] = str(faq['_id'])
-                print(f"FAQ trouvée - ID: {faq['_id']}, Question: {faq['question']}")
-            
             return faqs
         except Exception as e:
             print(f"Erreur détaillée lors de la récupération des FAQs: {str(e)}")
             raise
 
+    @staticmethod
+    def _list_projection(fields, sort_field):
+        if not fields:
+            return None, None
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in FAQ_LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # Le champ de tri est lu pour construire le curseur, même s'il n'est pas demandé
+        projection = dict.fromkeys(requested + [sort_field], 1)
+        return projection, set(requested)
+
+    def list_faqs(self, category=None, limit=None, cursor=None, sort="popular", fields=None, facets=False):
+        """Page de FAQ par pagination keyset sur (champ de tri, _id), servie par les index composés"""
+        if sort not in FAQ_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(FAQ_SORTS)}")
+        sort_field = FAQ_SORTS[sort]
+        limit = clamp_page_size(limit, Config.FAQ_PAGE_SIZE, Config.FAQ_PAGE_SIZE_MAX)
+        projection, requested = self._list_projection(fields, sort_field)
+
+        criteria = {"category": category} if category else {}
+        if cursor:
+            criteria.update(keyset_condition(decode_cursor(cursor), -1, sort_field))
+        faqs = list(
+            self.faq_collection.find(criteria, projection)
+            .sort([(sort_field, DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+        )
+        has_more = len(faqs) > limit
+        faqs = faqs[:limit]
+        next_cursor = encode_cursor(faqs[-1].get(sort_field), faqs[-1]["_id"]) if has_more else None
+
+        for faq in faqs:
+            faq['_id'] = str(faq['_id'])
+            if requested is not None and sort_field not in requested:
+                faq.pop(sort_field, None)
+        page = {"items": faqs, "has_more": has_more, "cursors": {"next": next_cursor}}
+        if facets:
+            page["facets"] = {"category": self.categories.get_counts()}
+        return page
+
     def add_faq(self, faq_data):
         try:
             print("Tentative d'ajout d'une FAQ avec les données:", faq_data)
@@ -69,7 +182,9 @@ class FAQService:
                 'question': faq_data['question'],
                 'answer': faq_data['answer'],
                 'category': faq_data['category'],
-                'created_at': datetime.utcnow()
+                'popularity': 0,
+                'created_at': datetime.utcnow(),
+                'updated_at': datetime.utcnow()
             }
             print("FAQ préparée:", faq)
             
@@ -82,6 +197,10 @@ class FAQService:
             if created_faq:
                 # Conversion de l'ObjectId en string pour le JSON
                 created_faq['_id'] = str(created_faq['_id'])
+                for index in self.indexes:
+                    index.upsert(created_faq)
+                self.categories.increment(created_faq['category'])
+                self.mark_changed(upserted=[created_faq])
                 return created_faq
             return None
         except Exception as e:
@@ -104,15 +223,21 @@ class FAQService:
                 "updated_by": updated_by,
                 "updated_at": datetime.utcnow()
             }
-            result = self.faq_collection.find_one_and_update(
+            # Document avant modification : l'ancienne catégorie sert aux compteurs
+            previous = self.faq_collection.find_one_and_update(
                 {"_id": faq_id},
                 {"$set": update_data},
-                return_document=True
+                return_document=ReturnDocument.BEFORE
             )
+            result = dict(previous, **update_data) if previous else None
             if result:
                 print(f"FAQ mise à jour avec succès: {faq_id}")
                 # Convertir l'ObjectId en string pour le JSON
                 result['_id'] = str(result['_id'])
+                for index in self.indexes:
+                    index.upsert(result)
+                self.categories.move(previous.get('category'), category)
+                self.mark_changed(upserted=[result])
             else:
                 print(f"FAQ non trouvée: {faq_id}")
             return result
@@ -129,9 +254,15 @@ class FAQService:
                 print(f"Erreur de conversion de l'ID: {e}")
                 return None
 
+            existing = self.faq_collection.find_one({"_id": faq_id}, {"category": 1})
             result = self.faq_collection.delete_one({"_id": faq_id})
             if result.deleted_count > 0:
                 print(f"FAQ supprimée avec succès: {faq_id}")
+                for index in self.indexes:
+                    index.remove(faq_id)
+                if existing:
+                    self.categories.increment(existing.get('category'), -1)
+                self.mark_changed(removed=[faq_id])
             else:
                 print(f"FAQ non trouvée pour suppression: {faq_id}")
             return result
@@ -139,14 +270,88 @@ class FAQService:
             print(f"Erreur lors de la suppression de la FAQ: {e}")
             raise
 
-    def search_faqs(self, query):
+    def search_faqs(self, query, limit=None, category=None):
+        limit = limit or Config.FAQ_SEARCH_LIMIT
         try:
-            results = list(self.faq_collection.find(
-                {"$text": {"$search": query}},
-                {"score": {"$meta": "textScore"}}
-            ).sort([("score", {"$meta": "textScore"})]))
-            print(f"Recherche FAQ: {len(results)} résultats trouvés pour '{query}'")
-            return results
+            if Config.FAQ_SEARCH_MODE == "text":
+                return self.text_search(query, limit, category)
+            faq_cache = get_faq_cache()
+            if faq_cache is not None:
+                # Reprend les modifications faites dans un autre worker
+                faq_cache.sync()
+            index = self.vector_index if Config.FAQ_SEARCH_MODE == "semantic" else self.search_index
+            return [dict(faq, score=score) for faq, score in index.search(query, limit, category)]
         except Exception as e:
             print(f"Erreur lors de la recherche de FAQs: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+    def suggest(self, prefix, limit=8):
+        """Autocomplétion des questions, servie par l'index de préfixes en mémoire"""
+        faq_cache = get_faq_cache()
+        if faq_cache is not None:
+            faq_cache.sync()
+        return self.suggest_index.suggest(prefix, limit)
+
+    def find_duplicates(self, faq, exclude_id=None):
+        """FAQ quasi dupliquées de `faq` (avertissement à l'écriture, n'empêche pas l'enregistrement)"""
+        duplicates = self.duplicate_index.find_duplicates(faq, exclude_id)
+        if duplicates:
+            print(f"⚠️ FAQ proche de {len(duplicates)} FAQ existante(s): {faq.get('question')}")
+        return duplicates
+
+    def duplicate_report(self):
+        """Groupes de quasi-doublons sur toute la collection"""
+        faq_cache = get_faq_cache()
+        if faq_cache is not None:
+            faq_cache.sync()
+        return self.duplicate_index.report()
+
+    def get_related_faqs(self, faq_id, limit=None):
+        """FAQ les plus proches de `faq_id` (table précalculée) ; None si la FAQ est inconnue"""
+        if self.related_table is None or faq_id not in self.faq_index:
+            return None
+        related = []
+        for other_id, score in self.related_table.related(faq_id, limit) or []:
+            faq = self.faq_index.get(other_id)
+            if faq is not None:
+                related.append(dict(faq, score=round(score, 3)))
+        return related
+
+    def record_usage(self, faq_id, event):
+        """Compte une vue ou un clic (en mémoire, versé dans Mongo par lots) ; False si la FAQ est inconnue"""
+        faq_usage = get_faq_usage()
+        if faq_usage is None or faq_id not in self.faq_index:
+            return False
+        faq_usage.record(faq_id, event)
+        return True
+
+    def get_popular_faqs(self, limit=10):
+        """FAQ les plus utilisées sur les FAQ_POPULAR_DAYS derniers jours, avec leurs compteurs"""
+        faq_usage = get_faq_usage()
+        if faq_usage is None:
+            return []
+        popular = []
+        for usage in faq_usage.get_popular(Config.FAQ_POPULAR_MAX):
+            faq = self.faq_index.get(usage["faq_id"])
+            # Les FAQ supprimées depuis restent dans faq_usage_daily
+            if faq is not None:
+                popular.append(dict(faq, usage={k: v for k, v in usage.items() if k != "faq_id"}))
+                if len(popular) >= limit:
+                    break
+        return popular
+
+    def text_search(self, query, limit=None, category=None):
+        """Recherche par l'index $text de Mongo (question seulement)"""
+        criteria = {"$text": {"$search": query}}
+        if category:
+            criteria["category"] = category
+        cursor = self.faq_collection.find(
+            criteria,
+            {"score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"})])
+        if limit:
+            cursor = cursor.limit(limit)
+        results = list(cursor)
+        for faq in results:
+            faq['_id'] = str(faq['_id'])
+        return results 
\ No newline at end of file
@@ -0,0 +1,140 @@
+import bisect
+import threading
+from ..utils.text import FRENCH_STOPWORDS, words
+
+
+class PrefixIndex:
+    """Index de préfixes pour l'autocomplétion des questions FAQ.
+
+    Tableau trié de clés (la question normalisée entière et chacune de ses fins de
+    phrase commençant par un mot plein) parcouru par recherche dichotomique. Les
+    résultats sont classés par popularité ; pour les préfixes courts, qui couvrent
+    beaucoup de clés, le classement est précalculé, et les préfixes plus longs déjà
+    demandés sont mémorisés jusqu'à la prochaine modification.
+    """
+
+    def __init__(self, short_prefix_length=4, scan_limit=2048, top_k=20, memo_size=10000):
+        self.short_prefix_length = short_prefix_length
+        self.scan_limit = scan_limit
+        self.top_k = top_k
+        self.memo_size = memo_size
+        self._lock = threading.RLock()
+        self._keys = []
+        self._ids = []
+        self._docs = {}
+        self._short = None
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _phrases(question):
+        tokens = words(question)
+        for start, token in enumerate(tokens):
+            if start == 0 or token not in FRENCH_STOPWORDS:
+                yield " ".join(tokens[start:])
+
+    def rebuild(self, faqs):
+        entries, docs = [], {}
+        for faq in faqs:
+            faq_id = str(faq['_id'])
+            docs[faq_id] = self._document(faq)
+            entries.extend((key, faq_id) for key in self._phrases(faq.get('question') or ""))
+        entries.sort()
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._ids = [faq_id for _, faq_id in entries]
+            self._docs = docs
+            self._invalidate()
+
+    @staticmethod
+    def _document(faq):
+        return {
+            "_id": str(faq['_id']),
+            "question": faq.get('question'),
+            "category": faq.get('category'),
+            "popularity": faq.get('popularity') or 0
+        }
+
+    def upsert(self, faq):
+        faq_id = str(faq['_id'])
+        with self._lock:
+            self.remove(faq_id)
+            self._docs[faq_id] = self._document(faq)
+            for key in self._phrases(faq.get('question') or ""):
+                position = bisect.bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._ids.insert(position, faq_id)
+            self._invalidate()
+
+    def remove(self, faq_id):
+        faq_id = str(faq_id)
+        with self._lock:
+            if self._docs.pop(faq_id, None) is None:
+                return
+            kept = [(k, i) for k, i in zip(self._keys, self._ids) if i != faq_id]
+            self._keys = [k for k, _ in kept]
+            self._ids = [i for _, i in kept]
+            self._invalidate()
+
+    def set_popularity(self, popularity):
+        """Met à jour les popularités ({faq_id: score}) sans reconstruire l'index"""
+        with self._lock:
+            for faq_id, score in popularity.items():
+                doc = self._docs.get(str(faq_id))
+                if doc is not None:
+                    doc["popularity"] = score
+            self._invalidate()
+
+    def _invalidate(self):
+        self._short = None
+        self._memo = {}
+
+    def _rank(self, faq_ids):
+        return sorted(
+            faq_ids,
+            key=lambda i: (-self._docs[i]["popularity"], len(self._docs[i]["question"] or ""), i)
+        )[:self.top_k]
+
+    def _range(self, prefix):
+        low = bisect.bisect_left(self._keys, prefix)
+        high = bisect.bisect_left(self._keys, prefix + "\uffff", low)
+        return low, high
+
+    def _short_prefixes(self):
+        """Classement précalculé des préfixes de moins de `short_prefix_length` + 1 caractères"""
+        if self._short is None:
+            candidates = {}
+            for key, faq_id in zip(self._keys, self._ids):
+                for length in range(1, self.short_prefix_length + 1):
+                    if len(key) >= length:
+                        candidates.setdefault(key[:length], set()).add(faq_id)
+            self._short = {prefix: self._rank(ids) for prefix, ids in candidates.items()}
+        return self._short
+
+    def suggest(self, prefix, limit=8):
+        """Questions dont une fin de phrase commence par `prefix`, les plus populaires d'abord"""
+        tokens = words(prefix)
+        if not tokens:
+            return []
+        query = " ".join(tokens)
+        with self._lock:
+            if len(query) <= self.short_prefix_length:
+                ranked = self._short_prefixes().get(query, [])
+            elif query in self._memo:
+                ranked = self._memo[query]
+            else:
+                low, high = self._range(query)
+                ranked = self._rank(set(self._ids[low:min(high, low + self.scan_limit)]))
+                if len(self._memo) >= self.memo_size:
+                    self._memo.clear()
+                self._memo[query] = ranked
+            return [dict(self._docs[faq_id]) for faq_id in ranked[:limit]]
+
+
+_index = PrefixIndex()
+
+
+def get_faq_suggest_index():
+    return _index
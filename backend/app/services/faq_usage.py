@@ -0,0 +1,199 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, UpdateOne
+from ..config.config import Config
+
+# view : FAQ ouverte, click : résultat de recherche choisi, chat : réponse du chemin rapide
+USAGE_EVENTS = ("view", "click", "chat")
+
+
+class FAQUsageCounter:
+    """Compteurs d'utilisation des FAQ en mémoire, versés périodiquement dans Mongo.
+
+    Aucune écriture par requête : chaque worker cumule ses compteurs puis un thread les
+    verse par bulk_write ($inc) dans faq_usage_daily (un document par jour et par FAQ).
+    Au plus toutes les `refresh_interval` secondes, les totaux de la fenêtre glissante
+    (`window_days`) sont recalculés : ils donnent le classement des FAQ populaires, servi
+    depuis la mémoire, et sont recopiés dans le champ `popularity` des FAQ (tri du
+    listing, classement des suggestions), qui mesure donc la même chose.
+    """
+
+    def __init__(self, collection, faq_collection, suggest_index=None,
+                 flush_interval=None, refresh_interval=None, window_days=None):
+        self.collection = collection
+        self.faq_collection = faq_collection
+        self.suggest_index = suggest_index
+        self.flush_interval = flush_interval or Config.FAQ_USAGE_FLUSH_INTERVAL_SECONDS
+        self.refresh_interval = refresh_interval or Config.FAQ_POPULAR_REFRESH_SECONDS
+        self.window_days = window_days or Config.FAQ_POPULAR_DAYS
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._popular = None
+        self._refreshed_at = 0.0
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.counters = {"recorded": 0, "flushes": 0, "flush_errors": 0, "refreshes": 0, "last_flush_ms": 0.0}
+        atexit.register(self.close)
+
+    def ensure_indexes(self):
+        self.collection.create_index([("day", ASCENDING), ("faq_id", ASCENDING)], unique=True)
+
+    def _ensure_started(self):
+        # Un thread de flush par processus (workers forkés)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pending = {}
+            self._popular = None
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="faq-usage", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def record(self, faq_id, event, timestamp=None):
+        if event not in USAGE_EVENTS:
+            raise ValueError(f"event must be one of: {', '.join(USAGE_EVENTS)}")
+        self._ensure_started()
+        day = (timestamp or datetime.utcnow()).strftime("%Y-%m-%d")
+        with self._lock:
+            counts = self._pending.setdefault((day, str(faq_id)), {})
+            counts[event] = counts.get(event, 0) + 1
+            self.counters["recorded"] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                self.refresh()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        usage_operations = []
+        for (day, faq_id), counts in pending.items():
+            total = sum(counts.values())
+            increments = {f"counts.{event}": count for event, count in counts.items()}
+            increments["total"] = total
+            usage_operations.append(UpdateOne({"day": day, "faq_id": faq_id}, {"$inc": increments}, upsert=True))
+
+        started = datetime.utcnow()
+        try:
+            self.collection.bulk_write(usage_operations, ordered=False)
+        except Exception as e:
+            print(f"Error flushing FAQ usage counters: {e}")
+            with self._lock:
+                self.counters["flush_errors"] += 1
+                # Remis en attente pour le prochain flush
+                for key, counts in pending.items():
+                    current = self._pending.setdefault(key, {})
+                    for event, count in counts.items():
+                        current[event] = current.get(event, 0) + count
+            return
+        with self._lock:
+            self.counters["flushes"] += 1
+            self.counters["last_flush_ms"] = (datetime.utcnow() - started).total_seconds() * 1000
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self.flush()
+
+    def _aggregate(self, days):
+        """Totaux par FAQ sur les `days` derniers jours, du plus utilisé au moins utilisé"""
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        rows = self.collection.aggregate([
+            {"$match": {"day": {"$gte": since}}},
+            {"$group": {
+                "_id": "$faq_id",
+                "total": {"$sum": "$total"},
+                **{event: {"$sum": f"$counts.{event}"} for event in USAGE_EVENTS}
+            }},
+            {"$sort": {"total": -1, "_id": 1}}
+        ])
+        return [
+            {"faq_id": row["_id"], "total": row["total"], **{event: row[event] for event in USAGE_EVENTS}}
+            for row in rows
+        ]
+
+    def _set_popularity(self, totals):
+        """Aligne `popularity` des FAQ sur les totaux de la fenêtre (seules les valeurs changées sont écrites).
+
+        Retourne {faq_id: popularité} y compris les FAQ sorties de la fenêtre, remises à 0.
+        """
+        current = {
+            str(doc["_id"]): doc["popularity"]
+            for doc in self.faq_collection.find({"popularity": {"$gt": 0}}, {"popularity": 1})
+        }
+        operations = []
+        popularity = {faq_id: totals.get(faq_id, 0) for faq_id in set(current) | set(totals)}
+        for faq_id, total in popularity.items():
+            if current.get(faq_id, 0) == total:
+                continue
+            try:
+                operations.append(UpdateOne({"_id": ObjectId(faq_id)}, {"$set": {"popularity": total}}))
+            except InvalidId:
+                continue
+        if operations:
+            self.faq_collection.bulk_write(operations, ordered=False)
+        return popularity
+
+    def refresh(self):
+        """Recalcule le classement des FAQ populaires, leur popularité et celle des suggestions"""
+        try:
+            usage = self._aggregate(self.window_days)
+            totals = {row["faq_id"]: row["total"] for row in usage}
+            popularity = self._set_popularity(totals)
+            if self.suggest_index is not None:
+                self.suggest_index.set_popularity(popularity)
+        except Exception as e:
+            print(f"Error refreshing popular FAQs: {e}")
+            return
+        with self._lock:
+            self._popular = usage[:Config.FAQ_POPULAR_MAX]
+            self._refreshed_at = time.monotonic()
+            self.counters["refreshes"] += 1
+
+    def get_popular(self, limit=10):
+        """FAQ les plus utilisées sur la fenêtre glissante, depuis le classement en mémoire"""
+        self._ensure_started()
+        if self._popular is None:
+            self.refresh()
+        with self._lock:
+            return list(self._popular or [])[:limit]
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "flush_interval_seconds": self.flush_interval,
+                "refresh_interval_seconds": self.refresh_interval,
+                "window_days": self.window_days,
+                "pending": len(self._pending),
+                "popular": len(self._popular or []),
+                **self.counters
+            }
+
+
+_counter = None
+
+
+def init_faq_usage(collection, faq_collection, suggest_index=None):
+    global _counter
+    if _counter is None:
+        _counter = FAQUsageCounter(collection, faq_collection, suggest_index)
+    return _counter
+
+
+def get_faq_usage():
+    return _counter
@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+from ..config.config import Config
+from ..utils.encoder import HashingEncoder
+
+
+def faq_text(faq):
+    """Texte encodé pour une FAQ : la question, complétée par la réponse"""
+    return [(faq.get('question') or "", 1.0), (faq.get('answer') or "", 0.5)]
+
+
+def content_hash(faq, signature):
+    payload = "\x1f".join([signature, faq.get('question') or "", faq.get('answer') or "", faq.get('category') or ""])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class FAQVectorIndex:
+    """Vecteurs denses des FAQ, chargés depuis un instantané mappé en mémoire.
+
+    Chaque instantané est un répertoire versionné `v-<id>/` contenant `faq_vectors.npy`
+    (matrice float32 contiguë, une ligne par FAQ) et `faq_vectors.json` (ids, empreintes
+    de contenu, signature de l'encodeur) ; le lien `current` désigne l'instantané en
+    service et est remplacé atomiquement, les deux fichiers changeant ensemble. Seule
+    la reconstruction écrit un instantané, en ne réencodant que les FAQ dont l'empreinte
+    a changé ; les écritures unitaires ne modifient qu'une ligne en mémoire.
+    """
+
+    # Délai avant suppression d'un ancien instantané (un autre worker peut être en train de l'écrire)
+    PRUNE_AFTER_SECONDS = 300
+
+    def __init__(self, snapshot_dir=None, encoder=None, chunk_size=4096):
+        self.snapshot_dir = snapshot_dir or Config.FAQ_VECTOR_DIR
+        self.encoder = encoder or HashingEncoder(dim=Config.FAQ_VECTOR_DIM)
+        self.chunk_size = chunk_size
+        self.current_path = os.path.join(self.snapshot_dir, "current")
+
+        self._lock = threading.RLock()
+        # Lignes [0, n) de _store ; _store peut être l'instantané mappé (lecture seule)
+        self._store = np.zeros((0, self.encoder.dim), dtype=np.float32)
+        self._matrix = self._store
+        # Ligne supprimée : id et empreinte à None, vecteur nul (compactée à la reconstruction)
+        self._ids = []
+        self._hashes = []
+        self._rows = {}
+        self._docs = {}
+        self._removed = 0
+        self._persisted = (None, [], [])
+        self.counters = {"encoded": 0, "reused": 0, "snapshots": 0, "upserts": 0, "removals": 0}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _load_snapshot(self):
+        """(répertoire, matrice mappée, ids, empreintes) de l'instantané en service s'il est compatible"""
+        try:
+            directory = os.path.realpath(self.current_path)
+            with open(os.path.join(directory, "faq_vectors.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("encoder") != self.encoder.signature:
+                return None, None, [], []
+            matrix = np.load(os.path.join(directory, "faq_vectors.npy"), mmap_mode="r")
+            if matrix.shape != (len(meta["ids"]), self.encoder.dim):
+                return None, None, [], []
+            return directory, matrix, meta["ids"], meta["hashes"]
+        except (OSError, ValueError, KeyError):
+            return None, None, [], []
+
+    def _write_snapshot(self, matrix, ids, hashes):
+        """Écrit un nouveau répertoire versionné puis bascule `current` dessus"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        name = f"v-{uuid.uuid4().hex}"
+        directory = os.path.join(self.snapshot_dir, name)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "faq_vectors.npy"), "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        with open(os.path.join(directory, "faq_vectors.json"), "w", encoding="utf-8") as f:
+            json.dump({"encoder": self.encoder.signature, "ids": ids, "hashes": hashes}, f)
+        previous = os.path.realpath(self.current_path) if os.path.islink(self.current_path) else None
+        link = f"{self.current_path}.{uuid.uuid4().hex}.tmp"
+        os.symlink(name, link)
+        os.replace(link, self.current_path)
+        self.counters["snapshots"] += 1
+        self._prune({directory, previous})
+        return directory, np.load(os.path.join(directory, "faq_vectors.npy"), mmap_mode="r")
+
+    def _prune(self, keep):
+        """Supprime les anciens instantanés ; les fichiers déjà mappés restent lisibles"""
+        now = time.time()
+        for name in os.listdir(self.snapshot_dir):
+            path = os.path.join(self.snapshot_dir, name)
+            if not name.startswith("v-") or path in keep:
+                continue
+            try:
+                if now - os.path.getmtime(path) > self.PRUNE_AFTER_SECONDS:
+                    shutil.rmtree(path)
+            except OSError:
+                pass
+
+    def rebuild(self, faqs):
+        """Aligne l'instantané sur `faqs` en ne réencodant que les FAQ modifiées"""
+        faqs = list(faqs)
+        signature = self.encoder.signature
+        with self._lock:
+            directory, matrix, ids, hashes = self._load_snapshot()
+            previous = {faq_id: row for row, faq_id in enumerate(ids)}
+            new_ids = [str(faq['_id']) for faq in faqs]
+            new_hashes = [content_hash(faq, signature) for faq in faqs]
+
+            if matrix is not None and new_ids == ids and new_hashes == hashes:
+                vectors = matrix
+            else:
+                vectors = np.zeros((len(faqs), self.encoder.dim), dtype=np.float32)
+                stale = []
+                for row, (faq_id, digest) in enumerate(zip(new_ids, new_hashes)):
+                    old_row = previous.get(faq_id)
+                    if matrix is not None and old_row is not None and hashes[old_row] == digest:
+                        vectors[row] = matrix[old_row]
+                    else:
+                        stale.append(row)
+                if stale:
+                    vectors[stale] = self.encoder.encode([faq_text(faqs[row]) for row in stale])
+                self.counters["encoded"] += len(stale)
+                self.counters["reused"] += len(faqs) - len(stale)
+                directory, vectors = self._write_snapshot(vectors, new_ids, new_hashes)
+
+            self._store = self._matrix = vectors
+            self._ids = new_ids
+            self._hashes = new_hashes
+            self._rows = {faq_id: row for row, faq_id in enumerate(new_ids)}
+            self._removed = 0
+            self._persisted = (directory, list(new_ids), list(new_hashes))
+            self._docs = {
+                str(faq['_id']): {
+                    "question": faq.get('question'),
+                    "answer": faq.get('answer'),
+                    "category": faq.get('category')
+                }
+                for faq in faqs
+            }
+        print(f"FAQ vectors ready: {len(new_ids)} entries")
+
+    def _reserve(self, size):
+        """À appeler sous verrou : _store modifiable et d'au moins `size` lignes (copie au besoin)"""
+        if self._store.flags.writeable and self._store.shape[0] >= size:
+            return
+        n = self._matrix.shape[0]
+        capacity = max(size, self._store.shape[0], 2 * n, 16)
+        store = np.zeros((capacity, self.encoder.dim), dtype=np.float32)
+        store[:n] = self._matrix
+        self._store = store
+        self._matrix = store[:n]
+
+    def upsert(self, faq):
+        """Réencode une FAQ et écrit sa seule ligne (ajoutée en fin de matrice si nouvelle)"""
+        faq_id = str(faq['_id'])
+        digest = content_hash(faq, self.encoder.signature)
+        doc = {"question": faq.get('question'), "answer": faq.get('answer'), "category": faq.get('category')}
+        with self._lock:
+            row = self._rows.get(faq_id)
+            unchanged = row is not None and self._hashes[row] == digest
+        vector = None if unchanged else self.encoder.encode([faq_text(faq)])[0]
+        with self._lock:
+            self._docs[faq_id] = doc
+            if vector is None:
+                return
+            row = self._rows.get(faq_id)
+            if row is None:
+                n = self._matrix.shape[0]
+                self._reserve(n + 1)
+                self._store[n] = vector
+                self._ids.append(faq_id)
+                self._hashes.append(digest)
+                self._rows[faq_id] = n
+                # La ligne est écrite avant d'être visible des recherches en cours
+                self._matrix = self._store[:n + 1]
+            else:
+                self._reserve(self._matrix.shape[0])
+                self._store[row] = vector
+                self._hashes[row] = digest
+            self.counters["encoded"] += 1
+            self.counters["upserts"] += 1
+
+    def remove(self, faq_id):
+        with self._lock:
+            row = self._rows.pop(str(faq_id), None)
+            self._docs.pop(str(faq_id), None)
+            if row is None:
+                return
+            self._reserve(self._matrix.shape[0])
+            self._store[row] = 0
+            self._ids[row] = None
+            self._hashes[row] = None
+            self._removed += 1
+            self.counters["removals"] += 1
+
+    def snapshot(self):
+        """(matrice, ids, empreintes) courants, cohérents entre eux et sans lignes supprimées"""
+        with self._lock:
+            if not self._removed:
+                return self._matrix, list(self._ids), list(self._hashes)
+            live = [row for row, faq_id in enumerate(self._ids) if faq_id is not None]
+            return self._matrix[live], [self._ids[row] for row in live], [self._hashes[row] for row in live]
+
+    def persisted_snapshot(self):
+        """(répertoire, ids, empreintes) de l'instantané sur disque chargé à la dernière reconstruction"""
+        with self._lock:
+            return self._persisted
+
+    def search(self, query, limit=10, category=None):
+        """Retourne [(faq, score)] par similarité cosinus décroissante"""
+        query_vector = self.encoder.encode([query])[0]
+        if not query_vector.any():
+            return []
+        with self._lock:
+            matrix, ids, docs = self._matrix, list(self._ids), self._docs
+        n = matrix.shape[0]
+        if not n:
+            return []
+
+        # Produits scalaires par blocs pour borner la mémoire sur de grandes collections
+        # (les lignes supprimées sont nulles : score 0, écartées ci-dessous)
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, self.chunk_size):
+            scores[start:start + self.chunk_size] = matrix[start:start + self.chunk_size] @ query_vector
+        if category:
+            for row, faq_id in enumerate(ids[:n]):
+                if (docs.get(faq_id) or {}).get("category") != category:
+                    scores[row] = -np.inf
+
+        k = min(limit, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results = []
+        for row in top:
+            doc = docs.get(ids[row])
+            if doc is not None and np.isfinite(scores[row]) and scores[row] > 0:
+                results.append((dict(doc, _id=ids[row]), float(scores[row])))
+        return results
+
+    def match(self, message):
+        """Même contrat que FAQIndex.match : (faq_id, faq, score) de la FAQ la plus proche"""
+        results = self.search(message, 1)
+        if not results:
+            return None, None, 0.0
+        faq, score = results[0]
+        return faq["_id"], faq, score
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "size": len(self._ids),
+                "dim": self.encoder.dim,
+                "encoder": self.encoder.signature,
+                "snapshot": self._persisted[0],
+                "removed_rows": self._removed,
+                **self.counters
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_faq_vector_index():
+    """Index vectoriel du worker, ou None si ni mode sémantique ni FAQ liées ne sont activés"""
+    global _index
+    if (Config.FAQ_SEARCH_MODE != "semantic" and Config.FAQ_FASTPATH_MODE != "semantic"
+            and not Config.FAQ_RELATED_ENABLED):
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FAQVectorIndex()
+    return _index
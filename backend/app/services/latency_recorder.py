@@ -0,0 +1,160 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+from pymongo import ASCENDING, UpdateOne
+from ..config.config import Config
+from ..utils.histogram import LogHistogram
+
+
+class LatencyRecorder:
+    """Histogrammes de latence en mémoire, fusionnés périodiquement dans Mongo.
+
+    Un document par (jour, chemin, métrique) dans latency_histograms ; chaque flush
+    ajoute les compteurs du worker par $inc, ce qui permet à plusieurs workers
+    d'écrire sans coordination. Les percentiles se lisent sans parcourir les messages.
+    """
+
+    def __init__(self, collection, flush_interval=None, precision=None, read_only=False):
+        self.collection = collection
+        self.flush_interval = flush_interval or Config.LATENCY_FLUSH_INTERVAL_SECONDS
+        self.precision = precision or Config.LATENCY_HISTOGRAM_PRECISION
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.counters = {"recorded": 0, "flushes": 0, "flush_errors": 0, "last_flush_ms": 0.0}
+        # Un lecteur (statistiques) n'enregistre rien : pas de flush à l'arrêt
+        self.read_only = read_only
+        if not read_only:
+            atexit.register(self.close)
+
+    def ensure_indexes(self):
+        self.collection.create_index([("day", ASCENDING), ("path", ASCENDING), ("metric", ASCENDING)], unique=True)
+
+    def _ensure_started(self):
+        # Un thread de flush par processus (workers forkés)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pending = {}
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="latency-recorder", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def record(self, path, timings, timestamp=None):
+        """Ajoute les durées (ms) d'une requête : {"rasa_ms": ..., "db_ms": ..., "total_ms": ...}"""
+        if self.read_only:
+            raise RuntimeError("read-only latency recorder")
+        self._ensure_started()
+        day = (timestamp or datetime.utcnow()).strftime("%Y-%m-%d")
+        with self._lock:
+            for metric, value in timings.items():
+                if value is None:
+                    continue
+                key = (day, path, metric)
+                histogram = self._pending.get(key)
+                if histogram is None:
+                    histogram = self._pending[key] = LogHistogram(self.precision)
+                histogram.record(value)
+            self.counters["recorded"] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        operations = []
+        for (day, path, metric), histogram in pending.items():
+            increments = {"count": histogram.count, "sum": histogram.total}
+            for index, count in histogram.buckets.items():
+                increments[f"buckets.{index}"] = count
+            operations.append(UpdateOne(
+                {"day": day, "path": path, "metric": metric},
+                {
+                    "$inc": increments,
+                    "$max": {"max": histogram.max},
+                    "$setOnInsert": {"precision": self.precision}
+                },
+                upsert=True
+            ))
+        started = datetime.utcnow()
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Error flushing latency histograms: {e}")
+            with self._lock:
+                self.counters["flush_errors"] += 1
+                # Remis en attente pour le prochain flush
+                for key, histogram in pending.items():
+                    current = self._pending.get(key)
+                    self._pending[key] = histogram.merge(current) if current else histogram
+            return
+        with self._lock:
+            self.counters["flushes"] += 1
+            self.counters["last_flush_ms"] = (datetime.utcnow() - started).total_seconds() * 1000
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self.flush()
+
+    def get_histograms(self, since, metric=None, max_time_ms=None):
+        """Histogrammes fusionnés par (jour, chemin, métrique) depuis `since`, en-cours du worker inclus"""
+        query = {"day": {"$gte": since.strftime("%Y-%m-%d")}}
+        if metric:
+            query["metric"] = metric
+        histograms = {}
+        cursor = self.collection.find(query, {"_id": 0})
+        if max_time_ms:
+            cursor = cursor.max_time_ms(max_time_ms)
+        for doc in cursor:
+            key = (doc["day"], doc["path"], doc["metric"])
+            histograms[key] = LogHistogram.from_document(doc, doc.get("precision", self.precision))
+        with self._lock:
+            pending = [(key, h) for key, h in self._pending.items()
+                       if key[0] >= query["day"]["$gte"] and (not metric or key[2] == metric)]
+            for key, histogram in pending:
+                current = histograms.get(key)
+                histograms[key] = (current or LogHistogram(histogram.precision)).merge(histogram)
+        return histograms
+
+    def get_percentiles(self, since, metric=None, max_time_ms=None):
+        """Percentiles p50/p95/p99 par jour et par chemin (faq, cache, rasa, fallback)"""
+        return [
+            {"date": day, "path": path, "metric": name, **histogram.summary()}
+            for (day, path, name), histogram in sorted(self.get_histograms(since, metric, max_time_ms).items())
+        ]
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "flush_interval_seconds": self.flush_interval,
+                "precision": self.precision,
+                "pending_histograms": len(self._pending),
+                **self.counters
+            }
+
+
+_recorder = None
+
+
+def init_latency_recorder(collection):
+    global _recorder
+    if _recorder is None:
+        _recorder = LatencyRecorder(collection)
+    return _recorder
+
+
+def get_latency_recorder():
+    return _recorder
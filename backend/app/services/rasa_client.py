@@ -0,0 +1,230 @@
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from ..config.config import Config
+
+
+class CircuitBreaker:
+    """Coupe-circuit : s'ouvre après N échecs consécutifs, laisse passer une sonde après le délai de reset"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.open_count = 0
+        self.short_circuited = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.open_count += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "open_count": self.open_count,
+                "short_circuited": self.short_circuited
+            }
+
+
+def is_retryable_error(error):
+    """Seuls les échecs où la requête n'a jamais atteint Rasa sont rejoués (POST non idempotent)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], "reason", error.args[0])
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def backoff_delay(attempt, base):
+    """Backoff exponentiel avec full jitter"""
+    return random.uniform(0, base * (2 ** attempt))
+
+
+class RasaClient:
+    """Client HTTP vers Rasa avec pool keep-alive, délais, retries et coupe-circuit"""
+
+    def __init__(self, base_url=None, connect_timeout=None, read_timeout=None,
+                 pool_size=None, max_retries=None, retry_backoff=None, breaker=None):
+        self.base_url = (base_url or Config.RASA_API_URL).rstrip("/")
+        self.timeout = (
+            connect_timeout or Config.RASA_CONNECT_TIMEOUT,
+            read_timeout or Config.RASA_READ_TIMEOUT
+        )
+        self.pool_size = pool_size or Config.RASA_POOL_SIZE
+        self.max_retries = Config.RASA_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = Config.RASA_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self.breaker = breaker or CircuitBreaker(
+            Config.RASA_BREAKER_THRESHOLD,
+            Config.RASA_BREAKER_RESET_SECONDS
+        )
+
+        # Un seul hôte : un pool de `pool_size` connexions réutilisées entre requêtes
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _post(self, path, payload):
+        """POST avec retries limités aux erreurs de connexion ; lève l'exception finale"""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.session.post(url, json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                if isinstance(e, requests.exceptions.Timeout):
+                    self._count("timeouts")
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                self._count("retries")
+                time.sleep(backoff_delay(attempt, self.retry_backoff))
+
+    def _webhook(self, path, message, sender=None):
+        """POST d'un message sur un webhook ; retourne le JSON ou None si Rasa est indisponible"""
+        if not self.breaker.allow_request():
+            return None
+
+        self._count("requests")
+        payload = {"message": message}
+        if sender:
+            payload["sender"] = sender
+        try:
+            response = self._post(path, payload)
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(f"Rasa status {response.status_code}")
+            body = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Rasa error: {e}")
+            self._count("failures")
+            self.breaker.record_failure()
+            return None
+
+        self._count("successes")
+        self.breaker.record_success()
+        return body
+
+    def send_message(self, message, sender=None):
+        """Envoie un message au webhook REST ; retourne la liste des réponses ou None si Rasa est indisponible"""
+        return self._webhook("/webhooks/rest/webhook", message, sender)
+
+    def send_message_with_intent(self, message, sender=None):
+        """Webhook rest_intent (rasa_bot/rest_with_intent.py) : (réponses, intent, confiance) en un seul appel.
+
+        Retourne (None, None, 0.0) si Rasa est indisponible.
+        """
+        body = self._webhook("/webhooks/rest_intent/webhook", message, sender)
+        if body is None:
+            return None, None, 0.0
+        intent = body.get("intent") or {}
+        return body.get("messages") or [], intent.get("name"), intent.get("confidence") or 0.0
+
+    def get_model_fingerprint(self):
+        """Identifiant du modèle chargé (GET /status), None si indisponible"""
+        try:
+            response = self.session.get(f"{self.base_url}/status", timeout=self.timeout)
+            response.raise_for_status()
+            status = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Rasa status error: {e}")
+            return None
+        return status.get("model_id") or status.get("model_file") or str(status.get("fingerprint"))
+
+    def get_pool_metrics(self):
+        pools = self.adapter.poolmanager.pools
+        stats = []
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats.append({
+                "host": pool.host,
+                "port": pool.port,
+                "max_size": self.pool_size,
+                "idle": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+                "in_use": self.pool_size - pool.pool.qsize() if pool.pool else 0,
+                "connections_opened": pool.num_connections,
+                "requests_served": pool.num_requests
+            })
+        return stats
+
+    def get_metrics(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "base_url": self.base_url,
+            "pid": os.getpid(),
+            "timeouts_config": {"connect": self.timeout[0], "read": self.timeout[1]},
+            "requests": counters,
+            "pool": self.get_pool_metrics(),
+            "breaker": self.breaker.get_metrics()
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_rasa_client():
+    """Retourne le client Rasa du worker courant (recréé après un fork)"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = RasaClient()
+                _client_pid = os.getpid()
+    return _client
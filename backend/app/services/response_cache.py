@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import OrderedDict
+from ..config.config import Config
+from ..utils.text import normalize_message
+from .rasa_client import get_rasa_client
+
+
+class _Entry:
+    __slots__ = ("response", "cacheable", "expires_at")
+
+    def __init__(self, response, cacheable, expires_at):
+        self.response = response
+        self.cacheable = cacheable
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Cache LRU/TTL des réponses Rasa, indexé sur le message normalisé.
+
+    Seules les réponses d'intents sans état sont conservées ; les autres messages
+    sont mémorisés comme « non cachables » pour ne pas les reclassifier à chaque fois.
+    Le cache est vidé dès que l'empreinte du modèle Rasa chargé change.
+    """
+
+    def __init__(self, max_size=None, ttl=None, fingerprint_check_interval=None,
+                 cacheable_intents=None, min_confidence=None, fingerprint_fn=None):
+        self.max_size = max_size or Config.RESPONSE_CACHE_MAX_SIZE
+        self.ttl = ttl or Config.RESPONSE_CACHE_TTL_SECONDS
+        self.fingerprint_check_interval = (fingerprint_check_interval
+            or Config.RESPONSE_CACHE_FINGERPRINT_CHECK_SECONDS)
+        self.cacheable_intents = set(cacheable_intents or Config.RESPONSE_CACHE_INTENTS)
+        self.min_confidence = Config.RESPONSE_CACHE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.fingerprint_fn = fingerprint_fn
+
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._fingerprint_checked_at = 0.0
+        self._fingerprint_checking = False
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def is_cacheable_intent(self, intent, confidence):
+        return intent in self.cacheable_intents and confidence >= self.min_confidence
+
+    def _check_fingerprint(self):
+        """Interroge Rasa au plus une fois par intervalle et vide le cache si le modèle a changé"""
+        if self.fingerprint_fn is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._fingerprint_checking or now - self._fingerprint_checked_at < self.fingerprint_check_interval:
+                return
+            self._fingerprint_checking = True
+        try:
+            fingerprint = self.fingerprint_fn()
+        finally:
+            with self._lock:
+                self._fingerprint_checking = False
+                self._fingerprint_checked_at = now
+        if fingerprint is None:
+            return
+        with self._lock:
+            if self._fingerprint is not None and fingerprint != self._fingerprint:
+                print(f"Rasa model changed ({self._fingerprint} -> {fingerprint}), clearing response cache")
+                self._entries.clear()
+                self.counters["invalidations"] += 1
+            self._fingerprint = fingerprint
+
+    def _lookup(self, key):
+        """À appeler sous verrou ; retourne l'entrée valide ou None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.counters["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, response, cacheable):
+        with self._lock:
+            self._entries[key] = _Entry(response, cacheable, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def get_or_compute(self, message, fetch):
+        """Retourne (réponse, servie_par_le_cache) pour `message`.
+
+        `fetch(message)` interroge Rasa et retourne (texte, intent, confiance), le texte
+        valant None en cas d'échec : l'intent revient avec la réponse, sans /model/parse.
+        Un seul appel à Rasa est fait par clé manquante, les requêtes concurrentes
+        attendent son résultat.
+        """
+        self._check_fingerprint()
+        key = normalize_message(message)
+
+        while True:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    if entry.cacheable:
+                        self.counters["hits"] += 1
+                        return entry.response, True
+                    self.counters["bypassed"] += 1
+                    leader = None
+                else:
+                    waiter = self._inflight.get(key)
+                    if waiter is None:
+                        leader = self._inflight[key] = threading.Event()
+                        self.counters["misses"] += 1
+                    else:
+                        self.counters["coalesced"] += 1
+                        leader = False
+
+            if leader is None:
+                # Intent avec état : toujours envoyé à Rasa
+                return fetch(message)[0], False
+            if leader is False:
+                if not waiter.wait(Config.RASA_CONNECT_TIMEOUT + Config.RASA_READ_TIMEOUT):
+                    return fetch(message)[0], False
+                continue
+            break
+
+        try:
+            response, intent, confidence = fetch(message)
+            if response is not None:
+                self._store(key, response, self.is_cacheable_intent(intent, confidence))
+            return response, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            leader.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.counters["invalidations"] += 1
+
+    def get_metrics(self):
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._entries)
+            fingerprint = self._fingerprint
+        # Les requêtes coalescées sont comptées comme hits une fois la réponse disponible
+        lookups = counters["hits"] + counters["misses"] + counters["bypassed"]
+        return {
+            "enabled": True,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "model_fingerprint": fingerprint,
+            "hit_ratio": counters["hits"] / lookups if lookups else 0.0,
+            **counters
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Cache du worker courant, ou None si désactivé (RESPONSE_CACHE_ENABLED)"""
+    global _cache
+    if not Config.RESPONSE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(fingerprint_fn=lambda: get_rasa_client().get_model_fingerprint())
+    return _cache
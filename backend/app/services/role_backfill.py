@@ -0,0 +1,97 @@
+import os
+import queue
+import threading
+import time
+from ..config.config import Config
+
+
+class UserRoleBackfill:
+    """Réécrit en arrière-plan le rôle dénormalisé des entrées d'historique d'un utilisateur.
+
+    Après un changement de rôle, les entrées de l'utilisateur qui portent un autre
+    rôle sont mises à jour par lots de `batch_size`, avec une pause entre les lots
+    pour ne pas saturer le primaire. Une seconde passe, USER_ROLE_CACHE_SECONDS plus
+    tard, reprend les entrées écrites par les workers dont le cache avait l'ancien rôle.
+    """
+
+    def __init__(self, store, batch_size=None, pause_ms=None, recheck_delay=None):
+        self.store = store
+        self.batch_size = batch_size or Config.USER_ROLE_BACKFILL_BATCH_SIZE
+        self.pause = (Config.USER_ROLE_BACKFILL_PAUSE_MS if pause_ms is None else pause_ms) / 1000
+        self.recheck_delay = Config.USER_ROLE_CACHE_SECONDS if recheck_delay is None else recheck_delay
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pid = None
+        self.counters = {"jobs": 0, "batches": 0, "updated": 0, "errors": 0, "last_job_ms": 0.0}
+
+    def _ensure_started(self):
+        # Un thread par processus (workers forkés)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, name="user-role-backfill", daemon=True).start()
+            self._pid = os.getpid()
+
+    def schedule(self, user_id, role, recheck=True):
+        self._ensure_started()
+        self._queue.put((user_id, role, recheck))
+
+    def _run(self):
+        while True:
+            user_id, role, recheck = self._queue.get()
+            try:
+                self.run(user_id, role)
+            except Exception as e:
+                print(f"Error backfilling role of {user_id}: {e}")
+                with self._lock:
+                    self.counters["errors"] += 1
+            if recheck and self.recheck_delay:
+                timer = threading.Timer(self.recheck_delay, self.schedule, args=(user_id, role, False))
+                timer.daemon = True
+                timer.start()
+
+    def run(self, user_id, role):
+        """Met `role` sur toutes les entrées de `user_id` ; retourne le nombre de documents modifiés"""
+        started = time.perf_counter()
+        total = 0
+        while True:
+            updated = self.store.set_user_role(user_id, role, self.batch_size)
+            if not updated:
+                break
+            total += updated
+            with self._lock:
+                self.counters["batches"] += 1
+                self.counters["updated"] += updated
+            if updated < self.batch_size:
+                break
+            time.sleep(self.pause)
+        with self._lock:
+            self.counters["jobs"] += 1
+            self.counters["last_job_ms"] = (time.perf_counter() - started) * 1000
+        return total
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "batch_size": self.batch_size,
+                "pending_jobs": self._queue.qsize(),
+                **self.counters
+            }
+
+
+_backfill = None
+_backfill_lock = threading.Lock()
+
+
+def get_role_backfill(store=None):
+    """Backfill des rôles du worker (créé au premier appel avec `store`), ou None"""
+    global _backfill
+    if _backfill is None and store is not None:
+        with _backfill_lock:
+            if _backfill is None:
+                _backfill = UserRoleBackfill(store)
+    return _backfill
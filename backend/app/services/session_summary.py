@@ -0,0 +1,95 @@
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+
+class ChatSessionSummaries:
+    """Résumés de sessions (chat_sessions) tenus à jour à chaque écriture de messages"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([("session_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+        self.collection.create_index([("user_id", ASCENDING), ("last_timestamp", DESCENDING)])
+
+    def record(self, entries):
+        """Un upsert par session du lot : compteur, bornes des dates et dernier message.
+
+        Mise à jour en pipeline : `last_message` ne change que si le lot est au moins aussi
+        récent que `last_timestamp`, même si un autre worker ou un flush différé écrit plus tard.
+        """
+        sessions = {}
+        for entry in entries:
+            key = (entry["session_id"], entry["user_id"])
+            summary = sessions.get(key)
+            if summary is None:
+                summary = sessions[key] = {
+                    "count": 0,
+                    "first": entry["timestamp"],
+                    "last": entry["timestamp"],
+                    "last_message": entry["message"]
+                }
+            summary["count"] += 1
+            summary["first"] = min(summary["first"], entry["timestamp"])
+            if entry["timestamp"] >= summary["last"]:
+                summary["last"] = entry["timestamp"]
+                summary["last_message"] = entry["message"]
+
+        operations = [
+            UpdateOne(
+                {"session_id": session_id, "user_id": user_id},
+                [{"$set": {
+                    "message_count": {"$add": [{"$ifNull": ["$message_count", 0]}, summary["count"]]},
+                    "first_timestamp": {"$min": ["$first_timestamp", summary["first"]]},
+                    "last_timestamp": {"$max": ["$last_timestamp", summary["last"]]},
+                    # Les champs lus ici sont ceux d'avant la mise à jour
+                    "last_message": {"$cond": [
+                        {"$gte": [summary["last"], {"$ifNull": ["$last_timestamp", summary["last"]]}]},
+                        {"$literal": summary["last_message"]},
+                        "$last_message"
+                    ]}
+                }}],
+                upsert=True
+            )
+            for (session_id, user_id), summary in sessions.items()
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def get_user_sessions(self, user_id):
+        return list(self.collection
+            .find(
+                {"user_id": user_id},
+                {"_id": 0, "session_id": 1, "last_message": 1, "last_timestamp": 1, "message_count": 1}
+            )
+            .sort("last_timestamp", -1))
+
+    def backfill(self, chat_store):
+        """Reconstruit tous les résumés depuis l'historique (agrégation côté serveur + $merge)"""
+        pipeline = [
+            {"$sort": {"timestamp": 1}},
+            {"$group": {
+                "_id": {"session_id": "$session_id", "user_id": "$user_id"},
+                "message_count": {"$sum": 1},
+                "first_timestamp": {"$first": "$timestamp"},
+                "last_timestamp": {"$last": "$timestamp"},
+                "last_message": {"$last": "$message"}
+            }},
+            {"$project": {
+                "_id": 0,
+                "session_id": "$_id.session_id",
+                "user_id": "$_id.user_id",
+                "message_count": 1,
+                "first_timestamp": 1,
+                "last_timestamp": 1,
+                "last_message": 1
+            }},
+            {"$merge": {
+                "into": self.collection.name,
+                "on": ["session_id", "user_id"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]
+        self.ensure_indexes()
+        list(chat_store.aggregate_messages(pipeline, allowDiskUse=True))
+        return self.collection.count_documents({})
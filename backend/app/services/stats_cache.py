@@ -0,0 +1,198 @@
+import threading
+import time
+from ..config.config import Config
+from .collection_versions import get_version_poller
+
+
+class _Entry:
+    __slots__ = ("value", "computed_at")
+
+    def __init__(self, value, computed_at):
+        self.value = value
+        self.computed_at = computed_at
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class StatsCache:
+    """Cache stale-while-revalidate des statistiques d'administration, par (endpoint, période).
+
+    Avant `soft_ttl`, la valeur est servie telle quelle ; entre `soft_ttl` et `hard_ttl`,
+    elle est servie périmée pendant qu'un seul thread de fond la recalcule. Au-delà, ou
+    sans valeur, une seule requête calcule (single-flight) et les autres attendent son
+    résultat. `refresh=True` force un recalcul synchrone, partagé de la même façon.
+    Une valeur refusée par `cacheable` (résultat partiel) est servie sans être conservée.
+
+    Avec un `version_poller` (version "stats" de collection_versions), `invalidate_all`
+    incrémente la version et chaque worker vide son cache en voyant la nouvelle version.
+    """
+
+    def __init__(self, soft_ttl=None, hard_ttl=None, cacheable=None, version_poller=None):
+        self.soft_ttl = Config.STATS_CACHE_SOFT_TTL_SECONDS if soft_ttl is None else soft_ttl
+        self.hard_ttl = Config.STATS_CACHE_HARD_TTL_SECONDS if hard_ttl is None else hard_ttl
+        self.cacheable = cacheable
+        self.version_poller = version_poller
+
+        self._version = None
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "forced_refreshes": 0,
+            "refresh_errors": 0,
+            "uncacheable": 0,
+            "invalidations": 0
+        }
+
+    def _sync_version(self):
+        """Vide le cache si la version partagée a changé (invalidation depuis un autre worker)"""
+        if self.version_poller is None:
+            return
+        version, _ = self.version_poller.get()
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._entries.clear()
+                    self.counters["invalidations"] += 1
+                self._version = version
+
+    def _compute(self, key, compute, flight):
+        """Calcule et stocke la valeur de `key` ; réveille les requêtes en attente"""
+        with self._lock:
+            version = self._version
+        try:
+            value = flight.value = compute()
+            with self._lock:
+                # Invalidé pendant le calcul : la valeur est servie sans être conservée
+                if version == self._version:
+                    if self.cacheable is None or self.cacheable(value):
+                        self._entries[key] = _Entry(value, time.monotonic())
+                    else:
+                        # L'entrée précédente, même périmée, reste plus complète
+                        self.counters["uncacheable"] += 1
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def _refresh_in_background(self, key, compute, flight):
+        try:
+            self._compute(key, compute, flight)
+            with self._lock:
+                self.counters["refreshes"] += 1
+        except Exception as e:
+            print(f"Error refreshing stats cache {key}: {e}")
+            with self._lock:
+                self.counters["refresh_errors"] += 1
+
+    def get(self, key, compute, refresh=False):
+        """Retourne (valeur, état, âge en secondes) ; état : "hit", "stale", "miss", "refresh" ou "coalesced"."""
+        self._sync_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry.computed_at if entry else None
+            flight = self._inflight.get(key)
+            if entry is not None and not refresh:
+                if age < self.soft_ttl:
+                    self.counters["hits"] += 1
+                    return entry.value, "hit", age
+                if age < self.hard_ttl:
+                    self.counters["stale_hits"] += 1
+                    if flight is None:
+                        flight = self._inflight[key] = _Flight()
+                        threading.Thread(
+                            target=self._refresh_in_background, args=(key, compute, flight),
+                            name="stats-cache-refresh", daemon=True
+                        ).start()
+                    return entry.value, "stale", age
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                self.counters["forced_refreshes" if refresh else "misses"] += 1
+                leader = True
+            else:
+                self.counters["coalesced"] += 1
+                leader = False
+
+        if leader:
+            return self._compute(key, compute, flight), "refresh" if refresh else "miss", 0.0
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value, "coalesced", 0.0
+
+    def invalidate(self, endpoint=None):
+        """Oublie les entrées (toutes, ou celles d'un endpoint)"""
+        with self._lock:
+            for key in [k for k in self._entries if endpoint is None or k[0] == endpoint]:
+                del self._entries[key]
+            self.counters["invalidations"] += 1
+
+    def invalidate_all(self):
+        """Invalide le cache de tous les workers ; retourne "all" ou "worker" sans version partagée"""
+        if self.version_poller is None:
+            self.invalidate()
+            return "worker"
+        version = self.version_poller.versions.bump(self.version_poller.name)
+        self.version_poller.invalidate()
+        with self._lock:
+            self._entries.clear()
+            self._version = version
+            self.counters["invalidations"] += 1
+        return "all"
+
+    def get_metrics(self):
+        now = time.monotonic()
+        with self._lock:
+            counters = dict(self.counters)
+            entries = [
+                {"endpoint": key[0], "period": key[1], "age_seconds": round(now - entry.computed_at, 1)}
+                for key, entry in sorted(self._entries.items())
+            ]
+            refreshing = len(self._inflight)
+        lookups = counters["hits"] + counters["stale_hits"] + counters["misses"] + counters["coalesced"]
+        return {
+            "version": self._version,
+            "soft_ttl_seconds": self.soft_ttl,
+            "hard_ttl_seconds": self.hard_ttl,
+            "size": len(entries),
+            "refreshing": refreshing,
+            "hit_ratio": (counters["hits"] + counters["stale_hits"]) / lookups if lookups else 0.0,
+            "fresh_hit_ratio": counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            **counters
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_stats_cache(db=None):
+    """Cache des statistiques du worker (créé au premier appel avec `db`), ou None si désactivé (STATS_CACHE_ENABLED)"""
+    global _cache
+    if not Config.STATS_CACHE_ENABLED:
+        return None
+    if _cache is None and db is not None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StatsCache(
+                    cacheable=lambda stats: not stats.get("partial"),
+                    version_poller=get_version_poller(db, "stats")
+                )
+    return _cache
@@ -0,0 +1,236 @@
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from ..config.config import Config
+from ..utils.histogram import LogHistogram
+from .stats_sketches import get_distinct_sketches, role_dimension, ALL
+
+# Durée stockée par entrée d'historique (timings.response_ms) et agrégée par jour
+LATENCY_METRIC = "response_ms"
+
+
+def day_key(timestamp):
+    return timestamp.strftime("%Y-%m-%d")
+
+
+class StatsRollup:
+    """Agrégats journaliers du tableau de bord (stats_daily), tenus à jour à chaque écriture.
+
+    Un document par jour : nombre de messages, d'utilisateurs et de sessions distincts,
+    réponses par source, réponses de repli et histogramme des temps de réponse. Les
+    valeurs distinctes du jour sont des clés de stats_daily_keys ("jour|kind|valeur") :
+    seul un upsert qui crée la clé incrémente le compteur du jour, ce qui reste exact
+    avec plusieurs workers. Le tableau de bord ne lit plus que ces agrégats.
+
+    Les clés expirent (index TTL sur expires_at) après STATS_DAILY_KEYS_RETENTION_DAYS
+    jours : les compteurs journaliers déjà écrits restent, mais les comptes distincts
+    exacts ne sont possibles que sur cette fenêtre. Les comptes sur plusieurs jours
+    (utilisateurs actifs, conversations) fusionnent les sketches HyperLogLog de
+    DistinctSketches ; les petites plages récentes restent exactes.
+    """
+
+    def __init__(self, collection, keys_collection, fallback_responses=(), precision=None, sketches=None,
+                 keys_retention_days=None):
+        self.collection = collection
+        self.keys_collection = keys_collection
+        self.fallback_responses = frozenset(fallback_responses)
+        self.precision = precision or Config.LATENCY_HISTOGRAM_PRECISION
+        self.sketches = sketches
+        self.keys_retention_days = keys_retention_days or Config.STATS_DAILY_KEYS_RETENTION_DAYS
+
+    def ensure_indexes(self):
+        self.keys_collection.create_index([("day", ASCENDING), ("kind", ASCENDING)])
+        self.keys_collection.create_index("expires_at", expireAfterSeconds=0)
+        # Clés écrites avant l'index TTL : même échéance que les nouvelles
+        self.keys_collection.update_many(
+            {"expires_at": {"$exists": False}},
+            [{"$set": {"expires_at": {"$add": [
+                {"$dateFromString": {"dateString": "$day", "format": "%Y-%m-%d"}},
+                self.keys_retention_days * 86400 * 1000
+            ]}}}]
+        )
+        if self.sketches is not None:
+            self.sketches.ensure_indexes()
+
+    def _is_fallback(self, entry):
+        return entry.get("source") == "fallback" or entry.get("response") in self.fallback_responses
+
+    def _summarize(self, entries):
+        days = {}
+        for entry in entries:
+            day = day_key(entry["timestamp"])
+            summary = days.get(day)
+            if summary is None:
+                summary = days[day] = {
+                    "messages": 0, "fallbacks": 0, "sources": {},
+                    "user": set(), "session": set(),
+                    "latency": LogHistogram(self.precision)
+                }
+            summary["messages"] += 1
+            source = entry.get("source") or "unknown"
+            summary["sources"][source] = summary["sources"].get(source, 0) + 1
+            if self._is_fallback(entry):
+                summary["fallbacks"] += 1
+            summary["user"].add(entry["user_id"])
+            summary["session"].add(entry["session_id"])
+            duration = (entry.get("timings") or {}).get(LATENCY_METRIC)
+            if duration is not None:
+                summary["latency"].record(duration)
+        return days
+
+    def _insert_keys(self, days):
+        """Crée les clés distinctes du lot ; retourne {(jour, kind): nombre de clés nouvelles}"""
+        operations, targets = [], []
+        # Une reconstruction de jours anciens garde ses clés le temps de finir (pas de double compte)
+        min_expiry = datetime.utcnow() + timedelta(days=1)
+        for day, summary in days.items():
+            expires_at = max(datetime.strptime(day, "%Y-%m-%d") + timedelta(days=self.keys_retention_days), min_expiry)
+            for kind in ("user", "session"):
+                for value in summary[kind]:
+                    operations.append(UpdateOne(
+                        {"_id": f"{day}|{kind}|{value}"},
+                        {"$setOnInsert": {"day": day, "kind": kind, "value": value, "expires_at": expires_at}},
+                        upsert=True
+                    ))
+                    targets.append((day, kind))
+        if not operations:
+            return {}
+        try:
+            upserted = self.keys_collection.bulk_write(operations, ordered=False).upserted_ids.keys()
+        except BulkWriteError as e:
+            # Clé insérée au même moment par un autre worker : déjà comptée par lui
+            upserted = [item["index"] for item in e.details.get("upserted", [])]
+        created = {}
+        for index in upserted:
+            created[targets[index]] = created.get(targets[index], 0) + 1
+        return created
+
+    def record(self, entries):
+        """Ajoute un lot d'entrées d'historique aux agrégats de leurs jours"""
+        if self.sketches is not None:
+            self.sketches.record(entries)
+        days = self._summarize(entries)
+        if not days:
+            return
+        created = self._insert_keys(days)
+        now = datetime.utcnow()
+        operations = []
+        for day, summary in days.items():
+            increments = {
+                "messages": summary["messages"],
+                "fallbacks": summary["fallbacks"],
+                "users": created.get((day, "user"), 0),
+                "sessions": created.get((day, "session"), 0)
+            }
+            for source, count in summary["sources"].items():
+                increments[f"sources.{source}"] = count
+            update = {"$inc": increments, "$set": {"updated_at": now}, "$setOnInsert": {"precision": self.precision}}
+            histogram = summary["latency"]
+            if histogram.count:
+                increments["latency.count"] = histogram.count
+                increments["latency.sum"] = histogram.total
+                for index, count in histogram.buckets.items():
+                    increments[f"latency.buckets.{index}"] = count
+                update["$max"] = {"latency.max": histogram.max}
+            operations.append(UpdateOne({"_id": day}, update, upsert=True))
+        self.collection.bulk_write(operations, ordered=False)
+
+    def get_days(self, since, max_time_ms=None):
+        """Agrégats des jours depuis `since` (inclus), du plus ancien au plus récent"""
+        days = []
+        cursor = self.collection.find({"_id": {"$gte": day_key(since)}}).sort("_id", ASCENDING)
+        if max_time_ms:
+            cursor = cursor.max_time_ms(max_time_ms)
+        for doc in cursor:
+            doc["date"] = doc.pop("_id")
+            doc["latency"] = LogHistogram.from_document(doc.get("latency") or {}, doc.get("precision", self.precision))
+            days.append(doc)
+        return days
+
+    def _count_exact(self, kind, since, until=None, max_time_ms=None):
+        """Nombre exact de valeurs distinctes des jours [since, until[, compté côté serveur"""
+        days = {"$gte": day_key(since)}
+        if until is not None:
+            days["$lt"] = day_key(until)
+        options = {"maxTimeMS": max_time_ms} if max_time_ms else {}
+        result = list(self.keys_collection.aggregate([
+            {"$match": {"kind": kind, "day": days}},
+            {"$group": {"_id": "$value"}},
+            {"$count": "count"}
+        ], allowDiskUse=True, **options))
+        return result[0]["count"] if result else 0
+
+    def count_distinct(self, kind, since=None, until=None, role=None, exact=None, max_time_ms=None):
+        """Utilisateurs ("user") ou sessions ("session") distincts depuis `since` (toujours sans `since`).
+
+        Exact sur les clés journalières si `exact` est vrai ou, par défaut, si la plage ne
+        dépasse pas STATS_EXACT_MAX_DAYS ; sinon estimé par fusion des sketches
+        HyperLogLog (erreur type STATS_HLL_ERROR). Les comptes par rôle, et ceux qui
+        remontent au-delà de la rétention des clés, sont toujours estimés.
+        """
+        if exact is None:
+            span = ((until or datetime.utcnow()) - since).days if since else None
+            exact = span is not None and span <= Config.STATS_EXACT_MAX_DAYS
+        if since is not None and since < datetime.utcnow() - timedelta(days=self.keys_retention_days - 1):
+            # Clés des premiers jours déjà expirées : un compte « exact » serait faux
+            exact = False
+        if (exact and since is not None and role is None) or self.sketches is None:
+            return self._count_exact(kind, since or datetime.min, until, max_time_ms)
+        return self.sketches.count(kind, since, until, role_dimension(role) if role else ALL, max_time_ms)
+
+    def count_distinct_by_role(self, kind, since=None, until=None, max_time_ms=None):
+        if self.sketches is None:
+            return {}
+        return self.sketches.count_by_role(kind, since, until, max_time_ms)
+
+    def rebuild(self, chat_store, since=None, batch_size=5000):
+        """Recalcule les agrégats depuis l'historique (tout, ou les jours à partir de `since`).
+
+        Les écritures faites pendant la reconstruction sur les jours concernés peuvent
+        être comptées deux fois : à lancer hors trafic, ou sur des jours passés.
+        """
+        first_day = day_key(since) if since else ""
+        self.collection.delete_many({"_id": {"$gte": first_day}})
+        self.keys_collection.delete_many({"day": {"$gte": first_day}})
+        if self.sketches is not None:
+            # Les sketches globaux ne se vident qu'en reconstruction complète : réinsérer est sans effet
+            self.sketches.delete_days(datetime.strptime(first_day, "%Y-%m-%d") if since else None)
+
+        pipeline = []
+        if since:
+            pipeline.append({"$match": {"timestamp": {"$gte": datetime.strptime(first_day, "%Y-%m-%d")}}})
+        pipeline.append({"$project": {
+            "_id": 0, "user_id": 1, "user_role": 1, "session_id": 1, "timestamp": 1, "source": 1, "response": 1,
+            "timings": 1
+        }})
+        count, batch = 0, []
+        for entry in chat_store.aggregate_messages(pipeline, allowDiskUse=True, batchSize=batch_size):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                self.record(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.record(batch)
+            count += len(batch)
+        if self.sketches is not None:
+            self.sketches.flush()
+        return count
+
+
+def get_stats_rollup(db, fallback_responses=()):
+    return StatsRollup(
+        db[Config.STATS_DAILY_COLLECTION], db[Config.STATS_DAILY_KEYS_COLLECTION], fallback_responses,
+        sketches=get_distinct_sketches(db)
+    )
+
+
+# Périodes du tableau de bord, en jours
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def period_start(period, default_days=30):
+    """Début de la période du tableau de bord (day, week, month, year), arrondi au jour UTC"""
+    days = PERIOD_DAYS.get(period, default_days)
+    start = datetime.utcnow() - timedelta(days=days)
+    return start.replace(hour=0, minute=0, second=0, microsecond=0)
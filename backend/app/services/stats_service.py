@@ -1,34 +1,95 @@
-from datetime import datetime, timedelta
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from ..database.mongodb import get_users_collection, get_chat_history_collection, get_faqs_collection
+from .latency_recorder import LatencyRecorder, get_latency_recorder
+from .stats_rollup import get_stats_rollup, period_start
+from ..config.config import Config
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_stats_executor():
+    """Pool borné (STATS_QUERY_WORKERS) des sous-requêtes de statistiques, un par processus"""
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=Config.STATS_QUERY_WORKERS,
+                                               thread_name_prefix="stats-query")
+                _executor_pid = os.getpid()
+    return _executor
+
 
 class StatsService:
-    def __init__(self):
+    def __init__(self, deadline=None):
         self.users_collection = get_users_collection()
         self.chat_history_collection = get_chat_history_collection()
         self.faq_collection = get_faqs_collection()
+        self.rollup = get_stats_rollup(self.chat_history_collection.database)
+        self.deadline = deadline or Config.STATS_QUERY_DEADLINE_SECONDS
+        self._latency_reader = None
 
-    def get_user_stats(self, period='month'):
-        """Récupère les statistiques des utilisateurs pour une période donnée"""
-        if period == 'week':
-            since = datetime.utcnow() - timedelta(days=7)
-        elif period == 'month':
-            since = datetime.utcnow() - timedelta(days=30)
-        elif period == 'year':
-            since = datetime.utcnow() - timedelta(days=365)
-        else:
-            since = datetime.utcnow() - timedelta(days=30)
-
-        # Statistiques des utilisateurs
-        total_users = self.users_collection.count_documents({})
-        
-        # Nombre de conversations uniques
-        chat_count = len(self.chat_history_collection.distinct("session_id"))
-        
-        # Nombre de réponses FAQ
-        faq_count = self.faq_collection.count_documents({})
-
-        # Distribution des types d'utilisateurs
-        user_types = list(self.users_collection.aggregate([
+    @property
+    def latency(self):
+        # Histogrammes du worker s'il enregistre déjà des latences, sinon un lecteur créé une seule fois
+        recorder = get_latency_recorder()
+        if recorder is not None:
+            return recorder
+        if self._latency_reader is None:
+            self._latency_reader = LatencyRecorder(
+                self.chat_history_collection.database[Config.LATENCY_COLLECTION], read_only=True
+            )
+        return self._latency_reader
+
+    @staticmethod
+    def _with_deadline(query, ends):
+        """Appelle `query(max_time_ms)` avec le temps restant avant l'échéance commune"""
+        remaining = int((ends - time.monotonic()) * 1000)
+        if remaining <= 0:
+            raise TimeoutError("deadline reached before the query started")
+        return query(remaining)
+
+    def _run_parallel(self, queries):
+        """Exécute les sous-requêtes indépendantes {nom: (fonction(max_time_ms), défaut)} en parallèle.
+
+        Chaque requête Mongo reçoit en maxTimeMS le temps restant avant l'échéance
+        (self.deadline) : une requête déjà lancée ne peut pas être annulée côté client,
+        c'est le serveur qui l'arrête. Retourne (résultats, manquants) : une sous-requête
+        en erreur ou non terminée à l'échéance prend sa valeur par défaut et son nom est listé.
+        """
+        started = time.monotonic()
+        ends = started + self.deadline
+        executor = get_stats_executor()
+        futures = {name: executor.submit(self._with_deadline, query, ends) for name, (query, _) in queries.items()}
+        wait(futures.values(), timeout=self.deadline)
+        results, missing = {}, []
+        for name, future in futures.items():
+            if future.done() and future.exception() is None:
+                results[name] = future.result()
+                continue
+            if future.done():
+                print(f"Error in stats query {name}: {future.exception()}")
+            else:
+                # Retire la requête si elle attend encore un thread ; sinon maxTimeMS l'arrête
+                future.cancel()
+                print(f"Stats query {name} timed out after {time.monotonic() - started:.1f}s")
+            results[name] = queries[name][1]
+            missing.append(name)
+        return results, missing
+
+    @staticmethod
+    def _with_partial(stats, missing):
+        stats["partial"] = bool(missing)
+        if missing:
+            stats["missing"] = missing
+        return stats
+
+    def _role_distribution(self, max_time_ms):
+        return list(self.users_collection.aggregate([
             {"$group": {
                 "_id": "$role",
                 "count": {"$sum": 1}
@@ -38,154 +99,97 @@ class StatsService:
                 "value": "$count",
                 "_id": 0
             }}
-        ]))
+        ], maxTimeMS=max_time_ms))
 
-        # Activité des utilisateurs
-        activity_data = list(self.chat_history_collection.aggregate([
-            {"$match": {
-                "timestamp": {"$gte": since}
-            }},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$timestamp"},
-                    "month": {"$month": "$timestamp"},
-                    "day": {"$dayOfMonth": "$timestamp"}
-                },
-                "messages": {"$sum": 1},
-                "users": {"$addToSet": "$user_id"}
-            }},
-            {"$sort": {"_id": 1}},
-            {"$project": {
-                "date": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%d",
-                        "date": {
-                            "$dateFromParts": {
-                                "year": "$_id.year",
-                                "month": "$_id.month",
-                                "day": "$_id.day"
-                            }
-                        }
-                    }
-                },
-                "messages": 1,
-                "users": {"$size": "$users"},
-                "_id": 0
-            }}
-        ]))
+    def get_user_stats(self, period='month'):
+        """Récupère les statistiques des utilisateurs pour une période donnée"""
+        since = period_start(period)
 
-        return {
-            "total_users": total_users,
-            "chat_count": chat_count,
-            "faq_count": faq_count,
-            "user_types": user_types,
-            "activity_data": activity_data
-        }
+        results, missing = self._run_parallel({
+            # Statistiques des utilisateurs
+            "total_users": (lambda ms: self.users_collection.count_documents({}, maxTimeMS=ms), None),
+            # Nombre de conversations (sessions distinctes, sketch global)
+            "chat_count": (lambda ms: self.rollup.count_distinct("session", max_time_ms=ms), None),
+            # Nombre de réponses FAQ
+            "faq_count": (lambda ms: self.faq_collection.count_documents({}, maxTimeMS=ms), None),
+            # Distribution des types d'utilisateurs
+            "user_types": (self._role_distribution, []),
+            # Activité des utilisateurs, lue dans les agrégats journaliers
+            "activity_data": (lambda ms: [
+                {"date": day["date"], "messages": day.get("messages", 0), "users": day.get("users", 0)}
+                for day in self.rollup.get_days(since, max_time_ms=ms)
+            ], []),
+            "active_users": (lambda ms: self.rollup.count_distinct("user", since, max_time_ms=ms), None),
+            "active_users_by_role": (lambda ms: self.rollup.count_distinct_by_role("user", since, max_time_ms=ms), {})
+        })
+        return self._with_partial(results, missing)
+
+    def _daily_stats(self, since, max_time_ms):
+        # Statistiques détaillées : un agrégat par jour, temps de réponse compris
+        daily_stats = []
+        for day in self.rollup.get_days(since, max_time_ms=max_time_ms):
+            histogram = day["latency"]
+            daily_stats.append({
+                "date": day["date"],
+                "messageCount": day.get("messages", 0),
+                "userCount": day.get("users", 0),
+                "sessionCount": day.get("sessions", 0),
+                "fallbackCount": day.get("fallbacks", 0),
+                "sources": day.get("sources", {}),
+                "avgResponseTime": histogram.total / histogram.count if histogram.count else None,
+                "p95ResponseTime": histogram.percentile(95) if histogram.count else None
+            })
+        return daily_stats
 
     def get_detailed_stats(self, period='month'):
         """Récupère des statistiques détaillées pour une période donnée"""
-        if period == 'week':
-            since = datetime.utcnow() - timedelta(days=7)
-        elif period == 'month':
-            since = datetime.utcnow() - timedelta(days=30)
-        elif period == 'year':
-            since = datetime.utcnow() - timedelta(days=365)
-        else:
-            since = datetime.utcnow() - timedelta(days=30)
-
-        # Statistiques détaillées
-        daily_stats = list(self.chat_history_collection.aggregate([
-            {"$match": {
-                "timestamp": {"$gte": since}
-            }},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$timestamp"},
-                    "month": {"$month": "$timestamp"},
-                    "day": {"$dayOfMonth": "$timestamp"}
-                },
-                "messageCount": {"$sum": 1},
-                "userCount": {"$addToSet": "$user_id"},
-                "responseTimes": {"$push": "$response_time"}
-            }},
-            {"$sort": {"_id": 1}},
-            {"$project": {
-                "date": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%d",
-                        "date": {
-                            "$dateFromParts": {
-                                "year": "$_id.year",
-                                "month": "$_id.month",
-                                "day": "$_id.day"
-                            }
-                        }
-                    }
-                },
-                "messageCount": 1,
-                "userCount": {"$size": "$userCount"},
-                "avgResponseTime": {"$avg": "$responseTimes"},
-                "_id": 0
-            }}
-        ]))
+        since = period_start(period)
 
-        return {
-            "dailyStats": daily_stats
-        }
+        results, missing = self._run_parallel({
+            "dailyStats": (lambda ms: self._daily_stats(since, ms), []),
+            # Valeurs distinctes sur toute la période (les comptes journaliers ne s'additionnent pas)
+            "users": (lambda ms: self.rollup.count_distinct("user", since, max_time_ms=ms), None),
+            "sessions": (lambda ms: self.rollup.count_distinct("session", since, max_time_ms=ms), None),
+            # Latences : percentiles par jour et par chemin depuis les histogrammes
+            "latency": (lambda ms: self.latency.get_percentiles(since, max_time_ms=ms), [])
+        })
+
+        return self._with_partial({
+            "dailyStats": results["dailyStats"],
+            "totals": {"users": results["users"], "sessions": results["sessions"]},
+            "latency": results["latency"]
+        }, missing)
 
     def get_stats(self, period='month'):
         try:
             # Calculer la date de début en fonction de la période
-            if period == 'day':
-                start_date = datetime.now() - timedelta(days=1)
-            elif period == 'week':
-                start_date = datetime.now() - timedelta(weeks=1)
-            else:  # month par défaut
-                start_date = datetime.now() - timedelta(days=30)
+            start_date = period_start(period)
 
             # Récupérer les statistiques
-            total_users = self.users_collection.count_documents({})
-            chat_count = self.chat_history_collection.count_documents({
-                'timestamp': {'$gte': start_date}
+            results, missing = self._run_parallel({
+                "days": (lambda ms: self.rollup.get_days(start_date, max_time_ms=ms), []),
+                "total_users": (lambda ms: self.users_collection.count_documents({}, maxTimeMS=ms), None),
+                "faq_count": (lambda ms: self.faq_collection.count_documents({}, maxTimeMS=ms), None),
+                # Récupérer la répartition des types d'utilisateurs
+                "user_types": (lambda ms: list(self.users_collection.aggregate([
+                    {'$group': {'_id': '$role', 'count': {'$sum': 1}}}
+                ], maxTimeMS=ms)), [])
             })
-            faq_count = self.faq_collection.count_documents({})
-
-            # Récupérer la répartition des types d'utilisateurs
-            user_types = self.users_collection.aggregate([
-                {'$group': {'_id': '$role', 'count': {'$sum': 1}}}
-            ])
-            user_types = {doc['_id']: doc['count'] for doc in user_types}
+            days = results["days"]
+            chat_count = sum(day.get("messages", 0) for day in days) if "days" not in missing else None
+            user_types = {doc['_id']: doc['count'] for doc in results["user_types"]}
 
             # Récupérer les données d'activité
-            activity_data = self.chat_history_collection.aggregate([
-                {
-                    '$match': {
-                        'timestamp': {'$gte': start_date}
-                    }
-                },
-                {
-                    '$group': {
-                        '_id': {
-                            '$dateToString': {
-                                'format': '%Y-%m-%d',
-                                'date': '$timestamp'
-                            }
-                        },
-                        'count': {'$sum': 1}
-                    }
-                },
-                {'$sort': {'_id': 1}}
-            ])
-            activity_data = [{'date': doc['_id'], 'count': doc['count']} for doc in activity_data]
-
-            return {
-                'total_users': total_users,
+            activity_data = [{'date': day['date'], 'count': day.get('messages', 0)} for day in days]
+
+            return self._with_partial({
+                'total_users': results["total_users"],
                 'chat_count': chat_count,
-                'faq_count': faq_count,
+                'faq_count': results["faq_count"],
                 'user_types': user_types,
                 'activity_data': activity_data
-            }
+            }, missing)
 
         except Exception as e:
             print(f"Erreur dans get_stats: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
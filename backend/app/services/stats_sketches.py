@@ -0,0 +1,227 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+from bson.binary import Binary
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from ..config.config import Config
+from ..utils.hyperloglog import HyperLogLog, precision_for_error
+from .user_roles import get_user_roles
+
+# Dimension de tous les utilisateurs ; les rôles sont "role:<rôle>"
+ALL = "all"
+
+
+def role_dimension(role):
+    return f"role:{role}"
+
+
+class DistinctSketches:
+    """Sketches HyperLogLog des utilisateurs et sessions distincts, par jour et au total.
+
+    Un document par (jour, kind, dimension) dans stats_sketches, plus un document global
+    sans jour par (kind, dimension) ; les registres sont un Binary de 2^p octets. Les
+    sketches du worker sont tenus en mémoire puis fusionnés par maximum registre à
+    registre (mise à jour conditionnée par une version), ce qui supporte plusieurs
+    workers. Une plage de jours se compte en fusionnant ses sketches journaliers.
+    """
+
+    def __init__(self, collection, roles=None, error=None, flush_interval=None):
+        self.collection = collection
+        self.roles = roles
+        self.error = error or Config.STATS_HLL_ERROR
+        self.p = precision_for_error(self.error)
+        self.flush_interval = flush_interval or Config.STATS_SKETCH_FLUSH_INTERVAL_SECONDS
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pid = None
+        self._stop = threading.Event()
+        self.counters = {"recorded": 0, "flushes": 0, "flush_errors": 0, "conflicts": 0, "last_flush_ms": 0.0}
+        atexit.register(self.close)
+
+    def ensure_indexes(self):
+        self.collection.create_index([("kind", ASCENDING), ("dim", ASCENDING), ("day", ASCENDING)])
+
+    def _ensure_started(self):
+        # Un thread de flush par processus (workers forkés)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pending = {}
+            self._stop = threading.Event()
+            threading.Thread(target=self._run, name="stats-sketches", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self.flush()
+
+    def record(self, entries):
+        """Ajoute les utilisateurs et sessions d'un lot d'entrées aux sketches en attente"""
+        if not entries:
+            return
+        self._ensure_started()
+        # Entrées écrites sans rôle (historique reconstruit) : rôle actuel de l'utilisateur
+        unresolved = {e["user_id"] for e in entries if not e.get("user_role")}
+        roles = self.roles.get_many(unresolved) if unresolved and self.roles is not None else {}
+        with self._lock:
+            for entry in entries:
+                day = entry["timestamp"].strftime("%Y-%m-%d")
+                role = entry.get("user_role") or roles.get(entry["user_id"])
+                dims = (ALL, role_dimension(role)) if role else (ALL,)
+                for kind, value in (("user", entry["user_id"]), ("session", entry["session_id"])):
+                    for dim in dims:
+                        for scope in (day, None):
+                            sketch = self._pending.get((scope, kind, dim))
+                            if sketch is None:
+                                sketch = self._pending[(scope, kind, dim)] = HyperLogLog(self.p)
+                            sketch.add(value)
+            self.counters["recorded"] += len(entries)
+
+    @staticmethod
+    def _doc_id(day, kind, dim):
+        return f"{day or 'global'}|{kind}|{dim}"
+
+    def _merge_into(self, day, kind, dim, sketch):
+        """Fusionne un sketch dans son document ; retourne False après trop de conflits"""
+        doc_id = self._doc_id(day, kind, dim)
+        for _ in range(5):
+            doc = self.collection.find_one({"_id": doc_id}, {"p": 1, "registers": 1, "version": 1})
+            now = datetime.utcnow()
+            if doc is None:
+                fields = {"_id": doc_id, "kind": kind, "dim": dim, "p": sketch.p,
+                          "registers": Binary(sketch.to_bytes()), "version": 1, "updated_at": now}
+                if day:
+                    fields["day"] = day
+                try:
+                    self.collection.insert_one(fields)
+                    return True
+                except DuplicateKeyError:
+                    continue
+            stored = HyperLogLog(doc["p"], doc["registers"])
+            p = min(stored.p, sketch.p)
+            merged = stored.fold(p).merge(sketch.fold(p))
+            if p == stored.p and (merged.registers == stored.registers).all():
+                return True
+            result = self.collection.update_one(
+                {"_id": doc_id, "version": doc["version"]},
+                {"$set": {"p": p, "registers": Binary(merged.to_bytes()), "updated_at": now}, "$inc": {"version": 1}}
+            )
+            if result.modified_count:
+                return True
+            self.counters["conflicts"] += 1
+        return False
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        started = datetime.utcnow()
+        failed = {}
+        for (day, kind, dim), sketch in pending.items():
+            try:
+                if not self._merge_into(day, kind, dim, sketch):
+                    failed[(day, kind, dim)] = sketch
+            except Exception as e:
+                print(f"Error flushing distinct sketches: {e}")
+                failed[(day, kind, dim)] = sketch
+        with self._lock:
+            # Remis en attente pour le prochain flush (la fusion est idempotente)
+            for key, sketch in failed.items():
+                current = self._pending.get(key)
+                self._pending[key] = sketch.merge(current) if current else sketch
+            if failed:
+                self.counters["flush_errors"] += 1
+            else:
+                self.counters["flushes"] += 1
+            self.counters["last_flush_ms"] = (datetime.utcnow() - started).total_seconds() * 1000
+
+    def sketch(self, kind, since=None, until=None, dim=ALL, max_time_ms=None):
+        """Sketch fusionné des jours [since, until[, ou global sans `since`, en-cours du worker inclus"""
+        start = since.strftime("%Y-%m-%d") if since else None
+        end = until.strftime("%Y-%m-%d") if since and until else None
+        query = {"kind": kind, "dim": dim}
+        if start is None:
+            query["_id"] = self._doc_id(None, kind, dim)
+        else:
+            query["day"] = {"$gte": start, "$lt": end} if end else {"$gte": start}
+        cursor = self.collection.find(query, {"p": 1, "registers": 1})
+        if max_time_ms:
+            cursor = cursor.max_time_ms(max_time_ms)
+        sketches = [HyperLogLog(doc["p"], doc["registers"]) for doc in cursor]
+        with self._lock:
+            for (day, pending_kind, pending_dim), sketch in self._pending.items():
+                if pending_kind != kind or pending_dim != dim:
+                    continue
+                if start is None:
+                    matches = day is None
+                else:
+                    matches = day is not None and day >= start and (end is None or day < end)
+                if matches:
+                    sketches.append(HyperLogLog(sketch.p, sketch.to_bytes()))
+        p = min((s.p for s in sketches), default=self.p)
+        merged = HyperLogLog(p)
+        for sketch in sketches:
+            merged.merge(sketch.fold(p))
+        return merged
+
+    def count(self, kind, since=None, until=None, dim=ALL, max_time_ms=None):
+        return self.sketch(kind, since, until, dim, max_time_ms).count()
+
+    def count_by_role(self, kind, since=None, until=None, max_time_ms=None):
+        """{rôle: nombre distinct} pour chaque rôle ayant un sketch sur la période"""
+        query = {"kind": kind, "dim": {"$regex": "^role:"}}
+        if since is None:
+            query["day"] = {"$exists": False}
+        else:
+            query["day"] = {"$gte": since.strftime("%Y-%m-%d")}
+            if until is not None:
+                query["day"]["$lt"] = until.strftime("%Y-%m-%d")
+        options = {"maxTimeMS": max_time_ms} if max_time_ms else {}
+        dims = set(self.collection.distinct("dim", query, **options))
+        with self._lock:
+            dims.update(dim for (_, k, dim) in self._pending if k == kind and dim != ALL)
+        return {dim.split(":", 1)[1]: self.count(kind, since, until, dim, max_time_ms) for dim in sorted(dims)}
+
+    def delete_days(self, since=None):
+        """Supprime les sketches journaliers depuis `since` (tous, globaux compris, sans `since`)"""
+        if since is None:
+            self.collection.delete_many({})
+        else:
+            self.collection.delete_many({"day": {"$gte": since.strftime("%Y-%m-%d")}})
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "error": self.error,
+                "precision_bits": self.p,
+                "sketch_bytes": 1 << self.p,
+                "flush_interval_seconds": self.flush_interval,
+                "pending_sketches": len(self._pending),
+                **self.counters
+            }
+
+
+_sketches = None
+_sketches_lock = threading.Lock()
+
+
+def get_distinct_sketches(db=None):
+    """Sketches du worker (créés au premier appel avec `db`), ou None"""
+    global _sketches
+    if _sketches is None and db is not None:
+        with _sketches_lock:
+            if _sketches is None:
+                _sketches = DistinctSketches(db[Config.STATS_SKETCH_COLLECTION], get_user_roles(db.users))
+    return _sketches
@@ -0,0 +1,72 @@
+import threading
+import time
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from ..config.config import Config
+
+
+class UserRoleCache:
+    """Rôle des utilisateurs par email (identité JWT), lu dans users et gardé `ttl` secondes.
+
+    Sert à dénormaliser le rôle sur les entrées d'historique à l'écriture ; un
+    changement de rôle fait ailleurs est vu au plus tard après `ttl`.
+    """
+
+    def __init__(self, users_collection, ttl=None):
+        self.users_collection = users_collection
+        self.ttl = Config.USER_ROLE_CACHE_SECONDS if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._roles = {}
+
+    def ensure_indexes(self):
+        try:
+            self.users_collection.create_index([("email", ASCENDING)])
+        except OperationFailure as e:
+            # Index sur email déjà présent avec d'autres options (unique)
+            print(f"Users email index not created: {e}")
+
+    def get_many(self, emails):
+        """{email: rôle ou None} ; une seule requête pour les emails absents ou expirés"""
+        now = time.monotonic()
+        with self._lock:
+            cached = {e: self._roles.get(e) for e in emails}
+        missing = [e for e, item in cached.items() if item is None or item[1] < now]
+        if missing:
+            found = {doc["email"]: doc.get("role") for doc in
+                     self.users_collection.find({"email": {"$in": missing}}, {"email": 1, "role": 1})}
+            expires = now + self.ttl
+            with self._lock:
+                for email in missing:
+                    cached[email] = self._roles[email] = (found.get(email), expires)
+        return {email: item[0] for email, item in cached.items()}
+
+    def get(self, email):
+        return self.get_many([email])[email]
+
+    def set(self, email, role):
+        with self._lock:
+            self._roles[email] = (role, time.monotonic() + self.ttl)
+
+    def invalidate(self, email=None):
+        with self._lock:
+            if email is None:
+                self._roles.clear()
+            else:
+                self._roles.pop(email, None)
+
+    def __len__(self):
+        return len(self._roles)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_user_roles(users_collection=None):
+    """Cache des rôles du worker (créé au premier appel avec `users_collection`), ou None"""
+    global _cache
+    if _cache is None and users_collection is not None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = UserRoleCache(users_collection)
+    return _cache
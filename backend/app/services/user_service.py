@@ -1,6 +1,9 @@
-from ..database.mongodb import get_users_collection
+from ..database.mongodb import get_users_collection, get_chat_history_collection
 from bson import ObjectId
 from datetime import datetime
+from .chat_storage import make_chat_store
+from .role_backfill import get_role_backfill
+from .user_roles import get_user_roles
 
 class UserService:
     def __init__(self):
@@ -40,6 +43,12 @@ class UserService:
         if result.modified_count == 0:
             raise Exception("Échec de la mise à jour de l'utilisateur")
 
+        # Rôle dénormalisé sur l'historique : mis à jour en arrière-plan, par lots
+        if update_data['role'] != user.get('role'):
+            # L'historique est indexé par l'email au moment du message : ancien et nouveau
+            for email in {user.get('email'), update_data['email']} - {None}:
+                self.schedule_role_backfill(email, update_data['role'])
+
         # Récupérer l'utilisateur mis à jour
         updated_user = self.users_collection.find_one(
             {'_id': ObjectId(user_id)},
@@ -50,6 +59,12 @@ class UserService:
             updated_user['created_at'] = updated_user['created_at'].isoformat()
         return updated_user
 
+    def schedule_role_backfill(self, email, role):
+        roles = get_user_roles(self.users_collection)
+        roles.set(email, role)
+        backfill = get_role_backfill() or get_role_backfill(make_chat_store(get_chat_history_collection()))
+        backfill.schedule(email, role)
+
     def delete_user(self, user_id):
         """Supprime un utilisateur"""
         # Vérifier que l'utilisateur existe
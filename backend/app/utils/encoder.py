@@ -0,0 +1,57 @@
+import zlib
+import numpy as np
+from .text import analyze
+
+
+class HashingEncoder:
+    """Encodeur local de phrases : n-grammes de caractères hachés puis projection aléatoire.
+
+    Les mots sont analysés (accents, élisions, stemming léger), découpés en n-grammes
+    de caractères bornés par des espaces, hachés avec signe dans `n_features` cases,
+    puis projetés en `dim` dimensions par une matrice gaussienne tirée avec `seed`.
+    Aucun modèle à télécharger : deux instances de mêmes paramètres sont identiques.
+    """
+
+    def __init__(self, dim=256, n_features=8192, ngram_range=(3, 5), seed=13):
+        self.dim = dim
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.projection = (rng.standard_normal((n_features, dim)) / np.sqrt(dim)).astype(np.float32)
+
+    @property
+    def signature(self):
+        low, high = self.ngram_range
+        return f"hashing-char{low}{high}-{self.n_features}x{self.dim}-s{self.seed}"
+
+    def _features(self, text, out, weight=1.0):
+        low, high = self.ngram_range
+        for term in analyze(text):
+            # Le mot entier compte davantage que chacun de ses n-grammes
+            grams = [f"w:{term}"] * 2
+            padded = f" {term} "
+            for n in range(low, high + 1):
+                grams.extend(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+            for gram in grams:
+                h = zlib.crc32(gram.encode())
+                out[h % self.n_features] += -weight if (h // self.n_features) & 1 else weight
+
+    def encode(self, texts, batch_size=256):
+        """Matrice (len(texts), dim) float32 de vecteurs normés.
+
+        Chaque élément est un texte ou une liste de (texte, poids) combinés.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            counts = np.zeros((len(batch), self.n_features), dtype=np.float32)
+            for row, parts in enumerate(batch):
+                for text, weight in ([(parts, 1.0)] if isinstance(parts, str) else parts):
+                    self._features(text or "", counts[row], weight)
+            # Sous-linéarité des fréquences avant projection
+            np.copyto(counts, np.sign(counts) * np.log1p(np.abs(counts)))
+            vectors[start:start + len(batch)] = counts @ self.projection
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
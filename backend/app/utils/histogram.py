@@ -0,0 +1,74 @@
+import math
+
+# Plus petite latence distinguée (ms) ; en dessous tout tombe dans le bucket 0
+MIN_VALUE_MS = 0.01
+
+
+class LogHistogram:
+    """Histogramme à buckets logarithmiques (style HDR) pour des latences en ms.
+
+    Le bucket `i` couvre ]MIN * base^(i-1), MIN * base^i] avec base = 1 + 2 * precision :
+    un percentile est donc connu à `precision` près, quelle que soit l'échelle, et deux
+    histogrammes se fusionnent en additionnant les compteurs (ou par $inc côté Mongo).
+    """
+
+    def __init__(self, precision=0.01, buckets=None, count=0, total=0.0, maximum=0.0):
+        self.precision = precision
+        self.base = 1 + 2 * precision
+        self._log_base = math.log(self.base)
+        self.buckets = {int(k): v for k, v in (buckets or {}).items()}
+        self.count = count
+        self.total = total
+        self.max = maximum
+
+    def bucket_index(self, value):
+        if value <= MIN_VALUE_MS:
+            return 0
+        return math.ceil(math.log(value / MIN_VALUE_MS) / self._log_base)
+
+    def bucket_value(self, index):
+        """Valeur représentative du bucket (milieu géométrique)"""
+        if index <= 0:
+            return MIN_VALUE_MS
+        return MIN_VALUE_MS * self.base ** (index - 0.5)
+
+    def record(self, value, count=1):
+        index = self.bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def summary(self, percentiles=(50, 95, 99)):
+        result = {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max
+        }
+        for q in percentiles:
+            result[f"p{q}"] = round(self.percentile(q), 2)
+        return result
+
+    @classmethod
+    def from_document(cls, doc, precision=0.01):
+        """Histogramme relu depuis un document Mongo ({buckets, count, sum, max})"""
+        return cls(precision, doc.get("buckets"), doc.get("count", 0), doc.get("sum", 0.0), doc.get("max", 0.0))
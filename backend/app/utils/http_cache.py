@@ -0,0 +1,53 @@
+from datetime import timezone
+from functools import wraps
+from flask import request, make_response
+
+
+def _not_modified(etag, last_modified):
+    if etag is not None and request.if_none_match:
+        return request.if_none_match.contains(etag)
+    # If-Modified-Since n'est pris en compte qu'en l'absence de If-None-Match
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, etag, last_modified, cache_control):
+    if etag is not None:
+        response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def conditional_get(validators=None, cache_control=None):
+    """GET conditionnel (ETag fort, Last-Modified) et Cache-Control pour une vue Flask.
+
+    `validators()` retourne (etag, last_modified) sans interroger Mongo (version en
+    cache d'une collection) : un client à jour reçoit un 304 avant l'exécution de la vue.
+    Sans `validators` (ou s'il retourne (None, None)), l'ETag est l'empreinte du corps
+    de la réponse (304 sans corps, mais la vue est exécutée). `cache_control` est une chaîne ou une fonction la retournant.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            policy = cache_control() if callable(cache_control) else cache_control
+            etag, last_modified = validators() if validators else (None, None)
+            if last_modified is not None and last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+            if (etag or last_modified) and _not_modified(etag, last_modified):
+                return _set_validators(make_response("", 304), etag, last_modified, policy)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if etag is None and last_modified is None:
+                response.add_etag()
+                _set_validators(response, None, None, policy)
+                return response.make_conditional(request)
+            return _set_validators(response, etag, last_modified, policy)
+        return wrapper
+    return decorator
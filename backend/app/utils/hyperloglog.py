@@ -0,0 +1,90 @@
+import hashlib
+import math
+import numpy as np
+
+
+def precision_for_error(error):
+    """Plus petite précision p (2^p registres) dont l'erreur type 1.04 / sqrt(2^p) est <= `error`"""
+    return min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog : nombre approximatif de valeurs distinctes en 2^p octets.
+
+    Chaque registre garde le rang maximal observé ; deux sketches de même précision se
+    fusionnent par maximum registre à registre (union des ensembles), et réinsérer une
+    valeur ne change rien. L'erreur type est 1.04 / sqrt(2^p) ; les petits effectifs
+    sont estimés par comptage linéaire des registres vides.
+    """
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.m = 1 << p
+        if registers is None:
+            self.registers = np.zeros(self.m, dtype=np.uint8)
+        else:
+            self.registers = np.frombuffer(bytes(registers), dtype=np.uint8).copy()
+            if len(self.registers) != self.m:
+                raise ValueError("HyperLogLog registers do not match precision")
+
+    @classmethod
+    def from_error(cls, error):
+        return cls(precision_for_error(error))
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def fold(self, p):
+        """Même sketch réduit à une précision p plus faible (les bits d'index retirés passent dans le rang)"""
+        if p > self.p:
+            raise ValueError("Cannot increase HyperLogLog precision")
+        if p == self.p:
+            return HyperLogLog(p, self.to_bytes())
+        shift = self.p - p
+        dropped = np.arange(self.m) & ((1 << shift) - 1)
+        # Rang du premier bit à 1 parmi les bits retirés, sinon ancien rang décalé
+        leading = shift - np.floor(np.log2(np.maximum(dropped, 1))).astype(np.int32)
+        ranks = np.where(dropped > 0, leading, self.registers.astype(np.int32) + shift)
+        ranks[self.registers == 0] = 0
+        folded = HyperLogLog(p)
+        np.maximum.at(folded.registers, np.arange(self.m) >> shift, ranks.astype(np.uint8))
+        return folded
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, p):
+        return cls(p, data)
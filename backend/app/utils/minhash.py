@@ -0,0 +1,93 @@
+import zlib
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(tokens, n=2):
+    """Ensemble des mots et des n-grammes de mots consécutifs (2..n)"""
+    result = set(tokens)
+    for size in range(2, n + 1):
+        result.update(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+    return result
+
+
+class MinHasher:
+    """Signatures MinHash : `num_perm` permutations (a·x + b) mod p des empreintes crc32.
+
+    La proportion de composantes égales entre deux signatures estime la similarité de
+    Jaccard des ensembles d'origine, avec une erreur type de l'ordre de 1/sqrt(num_perm).
+    """
+
+    def __init__(self, num_perm=128, seed=1):
+        self.num_perm = num_perm
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, items):
+        """Vecteur uint32 (num_perm,) ; un ensemble vide donne la signature maximale"""
+        if not items:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(item.encode()) for item in items), dtype=np.uint64, count=len(items))
+        # (len(items), num_perm) puis minimum par permutation
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def jaccard(left, right):
+        return float(np.count_nonzero(left == right)) / len(left)
+
+
+def lsh_params(threshold, num_perm):
+    """(bandes, lignes) dont le seuil (1/b)^(1/r) est le plus proche de `threshold`"""
+    candidates = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(candidates, key=lambda p: abs((1 / p[0]) ** (1 / p[1]) - threshold))
+
+
+class MinHashLSH:
+    """Index LSH par bandes : deux signatures sont candidates si une bande entière coïncide.
+
+    Insertion, suppression et requête coûtent O(bandes) ; les candidats doivent encore
+    être vérifiés avec l'estimation de Jaccard.
+    """
+
+    def __init__(self, threshold=0.7, num_perm=128):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._tables = [{} for _ in range(self.bands)]
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _band_keys(self, signature):
+        data = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [data[band * width:(band + 1) * width] for band in range(self.bands)]
+
+    def insert(self, key, signature):
+        self.remove(key)
+        bands = self._band_keys(signature)
+        self._keys[key] = bands
+        for table, band in zip(self._tables, bands):
+            table.setdefault(band, set()).add(key)
+
+    def remove(self, key):
+        bands = self._keys.pop(key, None)
+        if bands is None:
+            return
+        for table, band in zip(self._tables, bands):
+            bucket = table.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[band]
+
+    def query(self, signature):
+        candidates = set()
+        for table, band in zip(self._tables, self._band_keys(signature)):
+            candidates.update(table.get(band, ()))
+        return candidates
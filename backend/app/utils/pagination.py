@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(value, object_id):
+    """Curseur opaque pour la position (valeur de tri, _id) ; la valeur est une date ou un nombre"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        position = {"t": int(value.timestamp() * 1000)}
+    else:
+        position = {"v": value}
+    payload = json.dumps(dict(position, i=str(object_id)), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Retourne (valeur, ObjectId) ; lève ValueError si le curseur est invalide"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if "t" in payload:
+            value = datetime.fromtimestamp(payload["t"] / 1000, tz=timezone.utc).replace(tzinfo=None)
+        elif isinstance(payload["v"], (int, float)) and not isinstance(payload["v"], bool):
+            value = payload["v"]
+        else:
+            raise ValueError("Invalid cursor value")
+        return value, ObjectId(payload["i"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_condition(position, direction, field="timestamp"):
+    """Filtre Mongo des documents strictement avant (-1) ou après (1) `position` dans l'ordre (field, _id)"""
+    value, object_id = position
+    op = "$lt" if direction < 0 else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: object_id}}
+    ]}
+
+
+def clamp_page_size(limit, default, maximum):
+    if limit is None or limit <= 0:
+        return default
+    return min(limit, maximum)
@@ -0,0 +1,69 @@
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fold_accents(text):
+    """Supprime les diacritiques (é -> e, ç -> c)"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_message(text):
+    """Forme canonique d'un message : minuscules, sans accents, espaces compactés"""
+    if not text:
+        return ""
+    return _WHITESPACE_RE.sub(" ", fold_accents(text.lower())).strip()
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+FRENCH_STOPWORDS = frozenset("""
+a au aux avec ce ces cette c d de des du elle en est et etre il ils j je l la le les leur
+leurs lui m ma mais me mes moi mon n ne nos notre nous on ou par pas pour qu que qui s sa
+se ses son sur t ta te tes toi ton tu un une vos votre vous y quel quelle quels
+quelles comment quand dois puis peut peux
+""".split())
+
+
+def tokenize(text, stopwords=FRENCH_STOPWORDS):
+    """Découpe un texte normalisé en mots, sans les mots vides"""
+    return [t for t in _TOKEN_RE.findall(normalize_message(text)) if t not in stopwords]
+
+
+_ELISION_RE = re.compile(r"\b(?:l|d|j|m|n|s|t|c|qu|jusqu|lorsqu|puisqu|quoiqu)['’]")
+
+# Suffixes retirés par le stemmer léger, du plus long au plus court
+_STEM_SUFFIXES = (
+    "issements", "issement", "ements", "ement", "ations", "ation", "euses", "euse",
+    "ives", "ions", "ive", "ifs", "ion", "eux", "ees", "ee", "es", "er", "if", "e", "s", "x"
+)
+
+
+def strip_elisions(text):
+    """l'inscription -> inscription, qu'il -> il (texte déjà normalisé)"""
+    return _ELISION_RE.sub("", text)
+
+
+def words(text):
+    """Mots normalisés (minuscules, sans accents ni élisions), mots vides compris"""
+    return _TOKEN_RE.findall(strip_elisions(normalize_message(text)))
+
+
+def light_stem(word):
+    """Stemmer français léger : retire un seul suffixe flexionnel en gardant au moins 3 lettres"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("aux") and len(word) > 4:
+        return word[:-3] + "al"
+    for suffix in _STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def analyze(text, stopwords=FRENCH_STOPWORDS):
+    """Analyse française pour la recherche : accents, élisions, mots vides, stemming léger"""
+    normalized = strip_elisions(normalize_message(text))
+    return [light_stem(t) for t in _TOKEN_RE.findall(normalized) if t not in stopwords]
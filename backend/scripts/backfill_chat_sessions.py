@@ -0,0 +1,43 @@
+"""Construit la collection chat_sessions à partir de l'historique existant.
+
+Exemple :
+    python scripts/backfill_chat_sessions.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient
+from app.config.config import Config
+from app.services.chat_storage import MessageChatStore, BucketChatStore
+from app.services.session_summary import ChatSessionSummaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME)
+    parser.add_argument("--model", choices=["message", "bucket"], default=Config.CHAT_STORAGE_MODEL,
+                        help="modèle de stockage de l'historique source")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[args.db]
+        if args.model == "bucket":
+            store = BucketChatStore(db[Config.CHAT_BUCKET_COLLECTION])
+        else:
+            store = MessageChatStore(db.chat_history)
+        summaries = ChatSessionSummaries(db[Config.CHAT_SESSIONS_COLLECTION])
+
+        started = time.perf_counter()
+        count = summaries.backfill(store)
+        print(f"{count} sessions dans {summaries.collection.name} ({time.perf_counter() - started:.1f}s)")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Dénormalise le rôle des utilisateurs (user_role) sur l'historique de chat existant.
+
+Les entrées écrites avant l'ajout du rôle, ou dont le rôle a changé, sont mises à
+jour par lots pour chaque utilisateur de la collection users.
+
+Exemple :
+    python scripts/backfill_user_roles.py
+    python scripts/backfill_user_roles.py --model bucket --batch-size 500
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient
+from app.config.config import Config
+from app.services.chat_storage import MessageChatStore, BucketChatStore
+from app.services.role_backfill import UserRoleBackfill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME)
+    parser.add_argument("--model", choices=["message", "bucket"], default=Config.CHAT_STORAGE_MODEL,
+                        help="modèle de stockage de l'historique")
+    parser.add_argument("--batch-size", type=int, default=Config.USER_ROLE_BACKFILL_BATCH_SIZE)
+    parser.add_argument("--pause-ms", type=float, default=Config.USER_ROLE_BACKFILL_PAUSE_MS)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[args.db]
+        if args.model == "bucket":
+            store = BucketChatStore(db[Config.CHAT_BUCKET_COLLECTION])
+        else:
+            store = MessageChatStore(db.chat_history)
+        store.ensure_indexes()
+        backfill = UserRoleBackfill(store, args.batch_size, args.pause_ms, recheck_delay=0)
+
+        started = time.perf_counter()
+        users = updated = 0
+        for user in db.users.find({"role": {"$exists": True}}, {"email": 1, "role": 1}):
+            if not user.get("email"):
+                continue
+            updated += backfill.run(user["email"], user["role"])
+            users += 1
+        print(f"{users} utilisateurs, {updated} documents mis à jour dans {store.collection.name} "
+              f"({time.perf_counter() - started:.1f}s)")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compare les modèles de stockage de l'historique (message vs bucket).
+
+Affiche le nombre de documents, la taille des données et des index, puis la
+latence des requêtes de ChatService (historique utilisateur, sessions, session).
+À lancer après scripts/migrate_chat_buckets.py.
+
+Exemple :
+    python scripts/bench_chat_storage.py --users 20 --iterations 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient
+from app.config.config import Config
+from app.services.chat_storage import MessageChatStore, BucketChatStore
+
+
+def collection_stats(db, name):
+    stats = db.command("collStats", name)
+    return {
+        "documents": stats.get("count", 0),
+        "data_mb": stats.get("size", 0) / 1024 / 1024,
+        "index_mb": stats.get("totalIndexSize", 0) / 1024 / 1024
+    }
+
+
+def time_query(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME)
+    parser.add_argument("--users", type=int, default=20, help="nombre d'utilisateurs échantillonnés")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    db = client[args.db]
+    stores = {
+        "message": MessageChatStore(db.chat_history),
+        "bucket": BucketChatStore(db[Config.CHAT_BUCKET_COLLECTION])
+    }
+
+    print(f"{'modèle':<10}{'documents':>12}{'données Mo':>14}{'index Mo':>12}")
+    for name, store in stores.items():
+        s = collection_stats(db, store.collection.name)
+        print(f"{name:<10}{s['documents']:>12}{s['data_mb']:>14.2f}{s['index_mb']:>12.2f}")
+
+    sample = list(db.chat_history.aggregate([
+        {"$sample": {"size": args.users}},
+        {"$project": {"user_id": 1, "session_id": 1}}
+    ]))
+    if not sample:
+        print("Aucun message dans chat_history, rien à mesurer")
+        return
+
+    queries = {
+        "user_history": lambda store, doc: store.get_user_history(doc["user_id"], 50),
+        "user_sessions": lambda store, doc: store.get_user_sessions(doc["user_id"]),
+        "session_history": lambda store, doc: store.get_session_history(doc["session_id"], doc["user_id"], 50)
+    }
+
+    print()
+    print(f"{'requête':<18}{'modèle':<10}{'p50 ms':>10}{'p95 ms':>10}")
+    for query_name, query in queries.items():
+        for name, store in stores.items():
+            p50s, p95s = [], []
+            for doc in sample:
+                p50, p95 = time_query(lambda: query(store, doc), args.iterations)
+                p50s.append(p50)
+                p95s.append(p95)
+            print(f"{query_name:<18}{name:<10}{statistics.median(p50s):>10.2f}{statistics.median(p95s):>10.2f}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Compare le débit de POST /api/chat entre l'application Flask et l'application FastAPI.
+
+Exemple :
+    python scripts/bench_chat_throughput.py \
+        --target flask=http://localhost:5000 --target async=http://localhost:8000 \
+        --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import jwt
+from dotenv import load_dotenv
+
+
+def make_token(email, secret):
+    """Jeton d'accès compatible flask_jwt_extended"""
+    now = datetime.utcnow()
+    claims = {
+        "sub": email,
+        "type": "access",
+        "fresh": False,
+        "jti": str(uuid.uuid4()),
+        "iat": now,
+        "nbf": now,
+        "exp": now + timedelta(hours=1)
+    }
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_target(name, base_url, total, concurrency, messages, token):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60, headers=headers) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                payload = {"message": messages[i % len(messages)], "session_id": f"bench-{i % concurrency}"}
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/chat", json=payload)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "target": name,
+        "requests": total,
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": total / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True,
+                        help="nom=url de base, répétable (ex. flask=http://localhost:5000)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--user", default="bench@fsts.ma")
+    parser.add_argument("--secret", default=None, help="JWT_SECRET_KEY des applications testées")
+    args = parser.parse_args()
+
+    load_dotenv()
+    secret = args.secret or os.getenv("JWT_SECRET_KEY", "default-secret-key-change-me")
+
+    messages = [
+        "bonjour",
+        "date des examens ?",
+        "comment s'inscrire en LST informatique",
+        "qui est le responsable de la filière génie logiciel",
+        "merci"
+    ]
+    token = make_token(args.user, secret)
+
+    results = []
+    for target in args.target:
+        name, _, url = target.partition("=")
+        print(f"Benchmark {name} ({url}) : {args.requests} requêtes, concurrence {args.concurrency}...")
+        results.append(asyncio.run(run_target(name, url, args.requests, args.concurrency, messages, token)))
+
+    print()
+    print(f"{'cible':<10}{'req/s':>10}{'moy ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erreurs':>10}")
+    for r in results:
+        print(f"{r['target']:<10}{r['rps']:>10.1f}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
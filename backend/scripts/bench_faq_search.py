@@ -0,0 +1,124 @@
+"""Compare la recherche FAQ BM25 en mémoire et l'index $text de Mongo.
+
+Les requêtes sont dérivées des questions de faq_data.json (question exacte, sans
+accents, mots-clés seuls, faute de frappe, dernier mot tronqué) ; la bonne réponse
+est la FAQ d'origine. Affiche latence (p50/p95) et pertinence (recall@1, recall@5, MRR).
+
+Exemple :
+    python scripts/bench_faq_search.py --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.faq_search import BM25Index
+from app.utils.text import FRENCH_STOPWORDS, fold_accents
+
+FAQ_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "faq_data.json")
+
+
+def typo(word, rng):
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def make_queries(faqs, rng):
+    """[(libellé, requête, id attendu)]"""
+    queries = []
+    for faq in faqs:
+        question = faq["question"]
+        words = question.rstrip("?").split()
+        keywords = [w for w in words if fold_accents(w.lower()) not in FRENCH_STOPWORDS]
+        longest = max(keywords or words, key=len)
+        queries += [
+            ("exacte", question, faq["_id"]),
+            ("sans accents", fold_accents(question.lower()), faq["_id"]),
+            ("mots-clés", " ".join(keywords), faq["_id"]),
+            ("faute", " ".join(typo(w, rng) if w == longest else w for w in keywords), faq["_id"]),
+            ("préfixe", " ".join(keywords[:-1] + [keywords[-1][:4]]) if keywords else question, faq["_id"]),
+        ]
+    return queries
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def evaluate(name, search, queries, repeat):
+    latencies, reciprocal_ranks, by_kind = [], [], {}
+    for kind, query, expected in queries:
+        ranked = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ranked = search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        rank = ranked.index(expected) + 1 if expected in ranked else None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        hits = by_kind.setdefault(kind, [0, 0])
+        hits[0] += rank == 1
+        hits[1] += 1
+
+    latencies.sort()
+    total = len(queries)
+    print(f"\n== {name} ==")
+    print(f"latence p50 {percentile(latencies, 50):.3f} ms, p95 {percentile(latencies, 95):.3f} ms")
+    print(f"recall@1 {sum(r == 1.0 for r in reciprocal_ranks) / total:.2f}, "
+          f"recall@5 {sum(r >= 0.2 for r in reciprocal_ranks) / total:.2f}, "
+          f"MRR {sum(reciprocal_ranks) / total:.3f}")
+    for kind, (hits, count) in by_kind.items():
+        print(f"  {kind:<13} recall@1 {hits / count:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file", default=FAQ_FILE)
+    parser.add_argument("--mongo-uri", help="active la comparaison avec $text (collection temporaire)")
+    parser.add_argument("--db", default="faq_search_bench")
+    parser.add_argument("--repeat", type=int, default=20, help="exécutions par requête pour la latence")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open(args.faq_file, encoding="utf-8") as f:
+        faqs = json.load(f)
+    for position, faq in enumerate(faqs):
+        faq["_id"] = str(position)
+    queries = make_queries(faqs, random.Random(args.seed))
+    print(f"{len(faqs)} FAQ, {len(queries)} requêtes")
+
+    index = BM25Index()
+    index.rebuild(faqs)
+    evaluate("BM25 en mémoire", lambda q: [faq["_id"] for faq, _ in index.search(q, 5)], queries, args.repeat)
+
+    if args.mongo_uri:
+        from pymongo import MongoClient, TEXT
+        client = MongoClient(args.mongo_uri)
+        collection = client[args.db]["faqs"]
+        try:
+            collection.drop()
+            collection.insert_many([dict(faq) for faq in faqs])
+            collection.create_index([("question", TEXT)])
+
+            def text_search(query):
+                cursor = (collection
+                    .find({"$text": {"$search": query}}, {"score": {"$meta": "textScore"}})
+                    .sort([("score", {"$meta": "textScore"})])
+                    .limit(5))
+                return [doc["_id"] for doc in cursor]
+
+            evaluate("Mongo $text", text_search, queries, args.repeat)
+        finally:
+            client.drop_database(args.db)
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Mesure l'évolution de la latence de prédiction Rasa au fil des tours.
+
+Mode "shared" : tous les messages sur le même sender (ancien comportement, tracker
+"default" qui grossit sans fin). Mode "session" : un sender par conversation de
+--session-turns tours, comme le backend désormais. La latence doit rester stable
+d'une fenêtre à l'autre en mode "session" (et avec le tracker store borné).
+
+Exemple :
+    python scripts/bench_rasa_tracker.py --turns 5000 --mode shared --mode session
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+import requests
+
+MESSAGES = [
+    "Bonjour",
+    "Quand commencent les examens ?",
+    "Quelles sont les filières disponibles ?",
+    "Comment faire une demande d'attestation ?",
+    "Merci",
+    "Qui est le chef du département informatique ?",
+    "Comment s'inscrire ?",
+    "Au revoir"
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def tracker_events(session, base_url, sender):
+    try:
+        response = session.get(f"{base_url}/conversations/{sender}/tracker", timeout=30)
+        response.raise_for_status()
+        return len(response.json().get("events") or [])
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+def run(base_url, mode, turns, session_turns, window):
+    session = requests.Session()
+    run_id = uuid.uuid4().hex[:8]
+    sender = f"bench-{run_id}-shared"
+    windows, current, errors = [], [], 0
+
+    for i in range(turns):
+        if mode == "session" and i % session_turns == 0:
+            sender = f"bench-{run_id}-{i // session_turns}"
+        payload = {"sender": sender, "message": MESSAGES[i % len(MESSAGES)]}
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{base_url}/webhooks/rest/webhook", json=payload, timeout=60)
+            if response.status_code != 200:
+                errors += 1
+        except requests.exceptions.RequestException:
+            errors += 1
+        current.append((time.perf_counter() - start) * 1000)
+        if len(current) == window:
+            windows.append(sorted(current))
+            current = []
+
+    print(f"\n== mode {mode} : {turns} tours, {errors} erreurs ==")
+    print(f"{'tours':>12} {'p50 ms':>9} {'p95 ms':>9} {'moy ms':>9}")
+    for index, values in enumerate(windows):
+        print(f"{index * window:>5}-{(index + 1) * window:<6} {percentile(values, 50):>9.1f} "
+              f"{percentile(values, 95):>9.1f} {statistics.mean(values):>9.1f}")
+    if len(windows) > 1:
+        drift = percentile(windows[-1], 50) / max(percentile(windows[0], 50), 0.001)
+        print(f"p50 dernière fenêtre / première fenêtre : x{drift:.2f}")
+    events = tracker_events(session, base_url, sender)
+    if events is not None:
+        print(f"événements dans le tracker de {sender} : {events}")
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rasa-url", default=os.getenv("RASA_API_URL", "http://localhost:5005"))
+    parser.add_argument("--mode", action="append", choices=["shared", "session"],
+                        help="répétable ; par défaut les deux")
+    parser.add_argument("--turns", type=int, default=3000)
+    parser.add_argument("--session-turns", type=int, default=20, help="tours par conversation en mode session")
+    parser.add_argument("--window", type=int, default=250, help="tours par ligne du rapport")
+    args = parser.parse_args()
+
+    for mode in args.mode or ["shared", "session"]:
+        run(args.rasa_url.rstrip("/"), mode, args.turns, args.session_turns, args.window)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Rapport des FAQ quasi dupliquées (MinHash + LSH) sur toute la collection.
+
+Lit les FAQ dans Mongo (ou dans un fichier JSON avec --faq-file), construit l'index
+et affiche les paires et groupes au-dessus du seuil de Jaccard. Avec --scale N, le
+catalogue est multiplié par N variantes légèrement modifiées pour mesurer le temps
+de construction et de rapport sur une grande collection.
+
+Exemple :
+    python scripts/faq_duplicates_report.py --threshold 0.6
+    python scripts/faq_duplicates_report.py --faq-file faq_data.json --scale 200
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config.config import Config
+from app.services.faq_duplicates import FAQDuplicateIndex
+
+
+def load_faqs(args):
+    if args.faq_file:
+        with open(args.faq_file, encoding="utf-8") as f:
+            faqs = json.load(f)
+        for position, faq in enumerate(faqs):
+            faq["_id"] = str(position)
+        return faqs
+    from pymongo import MongoClient
+    client = MongoClient(args.mongo_uri)
+    try:
+        return list(client[args.db]["faqs"].find({}, {"question": 1, "answer": 1, "category": 1}))
+    finally:
+        client.close()
+
+
+def scale(faqs, factor, rng):
+    """Variantes synthétiques : mots mélangés entre FAQ pour grossir le catalogue"""
+    vocabulary = [w for faq in faqs for w in faq["question"].split()]
+    scaled = list(faqs)
+    for copy in range(1, factor):
+        for faq in faqs:
+            scaled.append({
+                "_id": f"{faq['_id']}-{copy}",
+                "question": " ".join(rng.sample(vocabulary, min(len(vocabulary), 10))),
+                "answer": " ".join(rng.sample(vocabulary, min(len(vocabulary), 30))),
+                "category": faq.get("category")
+            })
+    return scaled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file")
+    parser.add_argument("--mongo-uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME)
+    parser.add_argument("--threshold", type=float, default=Config.FAQ_DUPLICATE_THRESHOLD)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="affiche le rapport complet en JSON")
+    args = parser.parse_args()
+
+    faqs = load_faqs(args)
+    if args.scale > 1:
+        faqs = scale(faqs, args.scale, random.Random(42))
+
+    index = FAQDuplicateIndex(threshold=args.threshold)
+    started = time.perf_counter()
+    index.rebuild(faqs)
+    built = time.perf_counter()
+    report = index.report()
+    finished = time.perf_counter()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+        return
+    print(f"{report['faqs']} FAQ, seuil {report['threshold']}, bandes/lignes "
+          f"{index._lsh['question'].bands}x{index._lsh['question'].rows}")
+    print(f"index {1000 * (built - started):.0f} ms, rapport {1000 * (finished - built):.0f} ms")
+    print(f"{len(report['pairs'])} paires, {len(report['clusters'])} groupes")
+    for cluster in report["clusters"][:20]:
+        print("\n- " + "\n- ".join(f"[{faq['_id']}] {faq['question']}" for faq in cluster))
+
+
+if __name__ == "__main__":
+    main()
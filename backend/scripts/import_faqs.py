@@ -1,65 +1,62 @@
-from pymongo import MongoClient
-from datetime import datetime
-import os
+"""Importe des FAQ depuis un fichier JSON (tableau), NDJSON ou CSV.
+
+Le fichier est lu en flux et écrit par lots de bulk_write upsert, rattachés aux FAQ
+existantes par `faq_key` (champ faq_key, key ou id, sinon empreinte de la question).
+Les lignes inchangées sont ignorées ; rien n'est supprimé avant la fin de l'import,
+les lecteurs ne voient donc jamais la collection vide. Avec --prune, les FAQ absentes
+du fichier sont supprimées une fois l'import terminé sans erreur.
+
+Exemple :
+    python scripts/import_faqs.py faq_data.json
+    python scripts/import_faqs.py export.csv --prune
+"""
+import argparse
 import json
+import os
+import sys
+
+from pymongo import MongoClient
 
-def import_faqs():
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.config.config import Config
+from app.services.collection_versions import get_collection_versions
+from app.services.faq_categories import get_faq_category_counts
+from app.services.faq_import import FORMATS, FAQImporter, detect_format
+
+FAQ_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "faq_data.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=FAQ_FILE, help="fichier à importer (- pour l'entrée standard)")
+    parser.add_argument("--format", choices=FORMATS, help="par défaut d'après l'extension")
+    parser.add_argument("--batch-size", type=int, default=Config.FAQ_IMPORT_BATCH_SIZE)
+    parser.add_argument("--prune", action="store_true", help="supprime les FAQ absentes du fichier")
+    parser.add_argument("--mongo-uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    client = MongoClient(args.mongo_uri)
     try:
-        # Connexion à MongoDB
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['fsts_chatbot']
-        faq_collection = db['faqs']
-        
-        # Données des FAQs
-        faqs = [
-            {
-                "question": "Quand commencent les examens du semestre actuel?",
-                "answer": "Les examens du semestre actuel commenceront le 15 juin 2025. Veuillez consulter le calendrier académique sur le site de la FSTS pour les informations spécifiques à votre filière.",
-                "category": "exams",
-                "created_at": datetime.utcnow()
-            },
-            {
-                "question": "Comment puis-je m'inscrire à la filière LST Informatique?",
-                "answer": "Pour vous inscrire à la LST Informatique, vous devez d'abord compléter votre inscription administrative en ligne, puis déposer un dossier de candidature pendant la période annoncée (généralement en juillet). Une sélection est effectuée sur dossier et entretien.",
-                "category": "procedures",
-                "created_at": datetime.utcnow()
-            },
-            {
-                "question": "Qui est le responsable de la filière MST Génie Logiciel?",
-                "answer": "Le responsable de la filière MST Génie Logiciel est Dr. Mohammed Benali. Vous pouvez le contacter par email à m.benali@fsts.ac.ma ou le rencontrer pendant ses heures de permanence le mardi de 14h à 16h au Bureau B204.",
-                "category": "professors",
-                "created_at": datetime.utcnow()
-            },
-            {
-                "question": "Quelles sont les débouchés après une LST en Biologie?",
-                "answer": "Les débouchés après une LST en Biologie incluent: poursuivre en Master ou MST dans des domaines spécialisés, travailler dans des laboratoires d'analyses, l'industrie pharmaceutique, la recherche, l'enseignement, ou dans des organismes de protection de l'environnement.",
-                "category": "orientation",
-                "created_at": datetime.utcnow()
-            },
-            {
-                "question": "Comment déposer mon mémoire de fin d'études?",
-                "answer": "Pour déposer votre mémoire de fin d'études, vous devez soumettre 3 exemplaires imprimés au secrétariat de votre département, ainsi qu'une version électronique (PDF) par email, au moins 2 semaines avant la date de soutenance prévue.",
-                "category": "procedures",
-                "created_at": datetime.utcnow()
-            }
-        ]
-        
-        # Suppression des FAQs existantes
-        faq_collection.delete_many({})
-        print("Anciennes FAQs supprimées")
-        
-        # Insertion des nouvelles FAQs
-        result = faq_collection.insert_many(faqs)
-        print(f"{len(result.inserted_ids)} FAQs importées avec succès")
-        
-        # Vérification
-        count = faq_collection.count_documents({})
-        print(f"Nombre total de FAQs dans la base de données: {count}")
-        
-    except Exception as e:
-        print(f"Erreur lors de l'importation des FAQs: {str(e)}")
+        db = client[args.db]
+        importer = FAQImporter(db["faqs"], batch_size=args.batch_size)
+        if args.path == "-":
+            report = importer.import_stream(sys.stdin.buffer, fmt, args.prune)
+        else:
+            with open(args.path, "rb") as f:
+                report = importer.import_stream(f, fmt, args.prune)
+
+        if report["inserted"] or report["updated"] or report["deleted"]:
+            get_faq_category_counts(db).rebuild(db["faqs"])
+            # Nouvelle version : les caches FAQ des workers se rechargent
+            get_collection_versions(db).bump("faqs")
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"Nombre total de FAQs dans la base de données: {db['faqs'].count_documents({})}")
+        return 1 if report["invalid"] else 0
     finally:
         client.close()
 
+
 if __name__ == "__main__":
-    import_faqs() 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Convertit l'historique un-document-par-message (chat_history) en buckets par session.
+
+Exemple :
+    python scripts/migrate_chat_buckets.py --batch-size 1000 --drop-target
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient, ASCENDING
+from app.config.config import Config
+from app.services.chat_storage import BucketChatStore
+
+
+def build_buckets(session_key, turns, bucket_size):
+    """Découpe les tours d'une session en buckets de `bucket_size`"""
+    session_id, user_id = session_key
+    for start in range(0, len(turns), bucket_size):
+        chunk = turns[start:start + bucket_size]
+        yield {
+            "session_id": session_id,
+            "user_id": user_id,
+            "turns": chunk,
+            "message_count": len(chunk),
+            "first_timestamp": chunk[0]["timestamp"],
+            "last_timestamp": chunk[-1]["timestamp"],
+            "last_message": chunk[-1].get("message")
+        }
+
+
+def migrate(db, source_name, target_name, batch_size, bucket_size, drop_target, delete_source):
+    source = db[source_name]
+    target = db[target_name]
+    store = BucketChatStore(target, bucket_size)
+
+    if drop_target:
+        target.drop()
+    store.ensure_indexes()
+    # Parcours trié par session sans tri en mémoire
+    source.create_index([("session_id", ASCENDING), ("user_id", ASCENDING), ("timestamp", ASCENDING)])
+
+    cursor = (source
+        .find({})
+        .sort([("session_id", ASCENDING), ("user_id", ASCENDING), ("timestamp", ASCENDING)])
+        .batch_size(batch_size))
+
+    pending = []
+    migrated_ids = []
+    stats = {"messages": 0, "sessions": 0, "buckets": 0}
+    current_key, turns = None, []
+    started = time.perf_counter()
+
+    def flush_pending():
+        if pending:
+            target.insert_many(pending, ordered=False)
+            stats["buckets"] += len(pending)
+            pending.clear()
+        if delete_source and migrated_ids:
+            source.delete_many({"_id": {"$in": migrated_ids}})
+            migrated_ids.clear()
+
+    def close_session():
+        if turns:
+            pending.extend(build_buckets(current_key, turns, bucket_size))
+            stats["sessions"] += 1
+
+    for doc in cursor:
+        key = (doc.get("session_id"), doc.get("user_id"))
+        if key != current_key:
+            close_session()
+            current_key, turns = key, []
+            if len(pending) >= batch_size:
+                flush_pending()
+        # L'_id du message est conservé comme _id du tour
+        turns.append({k: v for k, v in doc.items() if k not in ("session_id", "user_id")})
+        migrated_ids.append(doc["_id"])
+        stats["messages"] += 1
+        if stats["messages"] % batch_size == 0:
+            print(f"{stats['messages']} messages lus, {stats['buckets'] + len(pending)} buckets")
+
+    close_session()
+    flush_pending()
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME)
+    parser.add_argument("--source", default="chat_history")
+    parser.add_argument("--target", default=Config.CHAT_BUCKET_COLLECTION)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--bucket-size", type=int, default=Config.CHAT_BUCKET_SIZE)
+    parser.add_argument("--drop-target", action="store_true", help="vide la collection cible avant migration")
+    parser.add_argument("--delete-source", action="store_true",
+                        help="supprime les messages migrés de la collection source, lot par lot")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        stats = migrate(client[args.db], args.source, args.target, args.batch_size,
+                        args.bucket_size, args.drop_target, args.delete_source)
+        print(f"Migration terminée : {stats}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Reconstruit les agrégats journaliers (stats_daily) et les sketches de valeurs
+distinctes (stats_sketches) à partir de l'historique.
+
+Sans option, tous les jours sont recalculés ; avec --since, seulement les jours à
+partir de cette date (rattrapage après une panne ou un import d'historique).
+
+Exemple :
+    python scripts/rebuild_stats_daily.py
+    python scripts/rebuild_stats_daily.py --since 2025-01-01
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient
+from app.config.config import Config
+from app.services.chat_service import FALLBACK_RESPONSE
+from app.services.chat_storage import MessageChatStore, BucketChatStore
+from app.services.stats_rollup import get_stats_rollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default=Config.MONGO_DB_NAME)
+    parser.add_argument("--model", choices=["message", "bucket"], default=Config.CHAT_STORAGE_MODEL,
+                        help="modèle de stockage de l'historique source")
+    parser.add_argument("--since", type=lambda value: datetime.strptime(value, "%Y-%m-%d"),
+                        help="premier jour recalculé (AAAA-MM-JJ)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    try:
+        db = client[args.db]
+        if args.model == "bucket":
+            store = BucketChatStore(db[Config.CHAT_BUCKET_COLLECTION])
+        else:
+            store = MessageChatStore(db.chat_history)
+        rollup = get_stats_rollup(db, (FALLBACK_RESPONSE,))
+        rollup.ensure_indexes()
+
+        started = time.perf_counter()
+        count = rollup.rebuild(store, args.since, args.batch_size)
+        days = rollup.collection.count_documents({})
+        print(f"{count} messages agrégés, {days} jours dans {rollup.collection.name} "
+              f"({time.perf_counter() - started:.1f}s)")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,8 @@ import {
 } from "recharts";
 import { motion } from "framer-motion";
 import { adminService } from "../utils/api";
-import { Users, MessageSquare, Timer, CheckCircle, Calendar } from "lucide-react";
+import { Users, MessageSquare, Timer, CheckCircle, Calendar, RefreshCw } from "lucide-react";
+import { Button } from "@/components/ui/button";
 import {
   Select,
   SelectContent,
@@ -88,12 +89,13 @@ const AdminDashboard = () => {
   const [selectedPeriod, setSelectedPeriod] = useState("month");
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [refreshing, setRefreshing] = useState(false);
 
-  const fetchAllData = async () => {
+  const fetchAllData = async (refresh: boolean = false) => {
     try {
       const [statsData, detailedData] = await Promise.all([
-        adminService.getStats(selectedPeriod) as Promise<StatsData>,
-        adminService.getDetailedStats(selectedPeriod) as Promise<DetailedStatsData>
+        adminService.getStats(selectedPeriod, refresh) as Promise<StatsData>,
+        adminService.getDetailedStats(selectedPeriod, refresh) as Promise<DetailedStatsData>
       ]);
       
       // Mise à jour des cartes
@@ -145,9 +147,15 @@ const AdminDashboard = () => {
       setError(error.response?.data?.message || error.message || "Erreur lors du chargement des données");
     } finally {
       setLoading(false);
+      setRefreshing(false);
     }
   };
 
+  const handleRefresh = () => {
+    setRefreshing(true);
+    fetchAllData(true);
+  };
+
   useEffect(() => {
     fetchAllData();
   }, [selectedPeriod]);
@@ -185,6 +193,9 @@ const AdminDashboard = () => {
               <SelectItem value="year">Cette année</SelectItem>
             </SelectContent>
           </Select>
+          <Button variant="outline" size="icon" onClick={handleRefresh} disabled={refreshing} title="Recalculer les statistiques">
+            <RefreshCw className={`h-4 w-4 ${refreshing ? "animate-spin" : ""}`} />
+          </Button>
         </div>
       </div>
 
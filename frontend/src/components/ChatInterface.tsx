@@ -6,11 +6,12 @@ import ChatMessage from "./ChatMessage";
 import { ThemeToggle } from "./ThemeToggle";
 import {
   ChatMessage as ChatMessageType,
+  RelatedFaq,
   generateMessageId,
 } from "../utils/chatUtils";
 import { ScrollArea } from "@/components/ui/scroll-area";
 import { useToast } from "@/hooks/use-toast";
-import { chatService } from "../utils/api";
+import { chatService, faqService } from "../utils/api";
 
 const WelcomeMessage: ChatMessageType = {
   id: "welcome",
@@ -25,8 +26,16 @@ const ChatInterface = () => {
   const [isTyping, setIsTyping] = useState(false);
   const [sessions, setSessions] = useState<{ id: string; lastMessage: string; lastTimestamp: string; messageCount: number }[]>([]);
   const [currentSession, setCurrentSession] = useState<string | null>(null);
+  // Curseur de la page précédente de la session (null : début atteint)
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
+  // Questions les plus consultées, proposées sur une conversation vide
+  const [popularFaqs, setPopularFaqs] = useState<RelatedFaq[]>([]);
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const messagesContainerRef = useRef<HTMLDivElement>(null);
+  // Hauteur avant insertion de messages plus anciens, pour garder la position de lecture
+  const prependHeightRef = useRef<number | null>(null);
   const inputRef = useRef<HTMLInputElement>(null);
   const { toast } = useToast();
 
@@ -46,36 +55,57 @@ const ChatInterface = () => {
       }
     };
     fetchSessions();
+    faqService.getPopularFaqs(4)
+      .then((response) => setPopularFaqs(response.data?.faqs || []))
+      .catch(() => setPopularFaqs([]));
   }, []);
 
+  const toChatMessages = (history: any[]): ChatMessageType[] =>
+    history.flatMap((entry: any) => [
+      {
+        id: generateMessageId(),
+        text: entry.message,
+        sender: "user" as const,
+        timestamp: new Date(entry.timestamp)
+      },
+      {
+        id: generateMessageId(),
+        text: entry.response,
+        sender: "bot" as const,
+        timestamp: new Date(entry.timestamp)
+      }
+    ]);
+
   const loadSession = async (sessionId: string) => {
     try {
-      const history = await chatService.getSessionMessages(sessionId);
-      if (Array.isArray(history)) {
-        const parsed = history.flatMap((entry: any) => [
-          {
-            id: generateMessageId(),
-            text: entry.message,
-            sender: "user" as const,
-            timestamp: new Date(entry.timestamp)
-          },
-          {
-            id: generateMessageId(),
-            text: entry.response,
-            sender: "bot" as const,
-            timestamp: new Date(entry.timestamp)
-          }
-        ]);
-        setMessages([WelcomeMessage, ...parsed]);
-        setCurrentSession(sessionId);
-      } else {
-        setMessages([WelcomeMessage]);
-        setCurrentSession(sessionId);
-      }
+      // Page la plus récente seulement ; les précédentes se chargent au défilement
+      const page = await chatService.getSessionMessages(sessionId);
+      setMessages([WelcomeMessage, ...toChatMessages(page.messages)]);
+      setOlderCursor(page.before);
     } catch (e) {
       console.error("Erreur chargement historique", e);
       setMessages([WelcomeMessage]);
-      setCurrentSession(sessionId);
+      setOlderCursor(null);
+    }
+    setCurrentSession(sessionId);
+  };
+
+  const loadOlderMessages = async () => {
+    if (!currentSession || !olderCursor || isLoadingOlder) return;
+    setIsLoadingOlder(true);
+    try {
+      const page = await chatService.getSessionMessages(currentSession, olderCursor);
+      prependHeightRef.current = messagesContainerRef.current?.scrollHeight ?? null;
+      setMessages(prev => [prev[0], ...toChatMessages(page.messages), ...prev.slice(1)]);
+      setOlderCursor(page.before);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
+
+  const handleMessagesScroll = (e: React.UIEvent<HTMLDivElement>) => {
+    if (e.currentTarget.scrollTop < 80) {
+      loadOlderMessages();
     }
   };
 
@@ -83,20 +113,27 @@ const ChatInterface = () => {
     const newSessionId = `session-${Date.now()}`;
     setCurrentSession(newSessionId);
     setMessages([WelcomeMessage]);
+    setOlderCursor(null);
     setSessions(prev => [{ id: newSessionId, lastMessage: "", lastTimestamp: new Date().toISOString(), messageCount: 0 }, ...prev]);
   };
 
   useEffect(() => {
+    const container = messagesContainerRef.current;
+    if (prependHeightRef.current !== null && container) {
+      // Messages plus anciens insérés en tête : on reste sur le même message
+      container.scrollTop += container.scrollHeight - prependHeightRef.current;
+      prependHeightRef.current = null;
+      return;
+    }
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
-  const handleSendMessage = async (e: React.FormEvent) => {
-    e.preventDefault();
-    if (!inputText.trim() || !currentSession) return;
+  const sendText = async (text: string) => {
+    if (!text.trim() || !currentSession) return;
 
     const userMessage: ChatMessageType = {
       id: generateMessageId(),
-      text: inputText,
+      text,
       sender: "user",
       timestamp: new Date()
     };
@@ -106,12 +143,13 @@ const ChatInterface = () => {
     setIsTyping(true);
 
     try {
-      const response = await chatService.sendMessage(inputText, currentSession);
+      const response = await chatService.sendMessage(text, currentSession);
       const botResponse: ChatMessageType = {
         id: generateMessageId(),
         text: response.response,
         sender: "bot",
-        timestamp: new Date()
+        timestamp: new Date(),
+        related: response.related_faqs
       };
 
       setMessages(prev => [...prev, botResponse]);
@@ -127,6 +165,18 @@ const ChatInterface = () => {
     }
   };
 
+  const handleSendMessage = (e: React.FormEvent) => {
+    e.preventDefault();
+    sendText(inputText);
+  };
+
+  // Question FAQ choisie (populaire ou liée) : comptée comme clic, puis posée au chatbot
+  const handleSelectFaq = (faq: RelatedFaq) => {
+    if (isTyping) return;
+    faqService.recordFaqEvent(faq._id, "click");
+    sendText(faq.question);
+  };
+
   return (
     <div className="flex h-screen bg-background text-foreground">
       {/* Sidebar */}
@@ -169,14 +219,40 @@ const ChatInterface = () => {
       {/* Chat Area */}
       <div className="flex-1 flex flex-col bg-background">
   {/* Zone des messages */}
-  <div className="flex-1 overflow-y-auto px-6 py-6 space-y-4">
+  <div
+    ref={messagesContainerRef}
+    onScroll={handleMessagesScroll}
+    className="flex-1 overflow-y-auto px-6 py-6 space-y-4"
+  >
+    {isLoadingOlder && (
+      <div className="text-center text-xs text-muted-foreground">Chargement des messages précédents...</div>
+    )}
     {messages.map((message) => (
       <ChatMessage 
         key={message.id + message.timestamp.toISOString()} 
         message={message} 
+        onSelectFaq={handleSelectFaq}
       />
     ))}
 
+    {messages.length === 1 && popularFaqs.length > 0 && (
+      <div className="max-w-3xl mx-auto px-4">
+        <div className="text-xs text-muted-foreground mb-2">Questions fréquentes</div>
+        <div className="flex flex-wrap gap-2">
+          {popularFaqs.map((faq) => (
+            <button
+              key={faq._id}
+              type="button"
+              onClick={() => handleSelectFaq(faq)}
+              className="text-xs rounded-full border border-border px-3 py-1 hover:bg-muted"
+            >
+              {faq.question}
+            </button>
+          ))}
+        </div>
+      </div>
+    )}
+
     {isTyping && (
       <div className="flex items-center gap-2 px-4 text-muted-foreground">
         <div className="w-2 h-2 rounded-full bg-primary animate-bounce" style={{ animationDelay: "0ms" }}></div>
@@ -7,10 +7,12 @@ interface ChatMessageProps {
     text: string;
     sender: 'user' | 'bot';
     timestamp: Date;
+    related?: { _id: string; question: string }[];
   };
+  onSelectFaq?: (faq: { _id: string; question: string }) => void;
 }
 
-const ChatMessage: React.FC<ChatMessageProps> = ({ message }) => {
+const ChatMessage: React.FC<ChatMessageProps> = ({ message, onSelectFaq }) => {
   const isBot = message.sender === 'bot';
 
   return (
@@ -34,6 +36,20 @@ const ChatMessage: React.FC<ChatMessageProps> = ({ message }) => {
       <div className={`text-sm ${isBot ? 'text-gray-700 dark:text-gray-300' : 'text-gray-900 dark:text-gray-100'}`}>
         {message.text}
       </div>
+      {isBot && onSelectFaq && message.related && message.related.length > 0 && (
+        <div className="mt-3 flex flex-wrap gap-2">
+          {message.related.map((faq) => (
+            <button
+              key={faq._id}
+              type="button"
+              onClick={() => onSelectFaq(faq)}
+              className="text-xs rounded-full border border-border px-3 py-1 text-gray-700 dark:text-gray-300 hover:bg-gray-200 dark:hover:bg-zinc-700"
+            >
+              {faq.question}
+            </button>
+          ))}
+        </div>
+      )}
     </div>
   </div>
 </div>
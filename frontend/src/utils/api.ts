@@ -206,29 +206,38 @@ export const chatService = {
     }
   },
 
-  async getSessionMessages(sessionId: string) {
+  // Une page de la session : la plus récente sans `before`, puis les plus anciennes
+  // en repassant le curseur retourné (null quand le début de la session est atteint)
+  async getSessionMessages(sessionId: string, before?: string) {
     try {
-      const response = await api.get(`/chat/history/${sessionId}`);
-      const messages = Array.isArray(response.data) ? response.data : [];
-      return messages.map((msg: any) => ({
-        id: msg._id,
-        message: msg.message,
-        response: msg.response,
-        timestamp: msg.timestamp,
-        sessionId: msg.session_id
-      }));
+      const response = await api.get(`/chat/history/${sessionId}`, { params: { before } });
+      const page = response.data || {};
+      const items = Array.isArray(page) ? page : (page.items || []);
+      return {
+        messages: items.map((msg: any) => ({
+          id: msg._id,
+          message: msg.message,
+          response: msg.response,
+          timestamp: msg.timestamp,
+          sessionId: msg.session_id
+        })),
+        before: (page.has_more && page.cursors?.before) || null
+      };
     } catch (error) {
       console.error('Error getting session messages:', error);
-      if (IS_DEV) {
-        return [{
-          id: `msg-${Date.now()}`,
-          message: "Message simulé",
-          response: "Réponse simulée",
-          timestamp: new Date().toISOString(),
-          sessionId: sessionId
-        }];
+      if (IS_DEV && !before) {
+        return {
+          messages: [{
+            id: `msg-${Date.now()}`,
+            message: "Message simulé",
+            response: "Réponse simulée",
+            timestamp: new Date().toISOString(),
+            sessionId: sessionId
+          }],
+          before: null
+        };
       }
-      return [];
+      return { messages: [], before: null };
     }
   }
 };
@@ -249,12 +258,17 @@ export const faqService = {
       answer, 
       category 
     }),
-  deleteFaq: (id: string) => api.delete(`/api/admin/faq/${id}`)
+  deleteFaq: (id: string) => api.delete(`/api/admin/faq/${id}`),
+  getPopularFaqs: (limit: number = 10) => api.get('/api/faq/popular', { params: { limit } }),
+  // Balise d'utilisation : FAQ ouverte (view) ou résultat de recherche choisi (click)
+  recordFaqEvent: (id: string, event: 'view' | 'click') =>
+    api.post(`/api/faq/${encodeURIComponent(id)}/${event}`).catch(() => undefined)
 };
 
 // Service d'administration
 export const adminService = {
-  async getStats(period: string = 'month') {
+  // refresh : recalcule au lieu de servir les statistiques en cache côté serveur
+  async getStats(period: string = 'month', refresh: boolean = false) {
     try {
       const token = localStorage.getItem('fsts_token');
       const userStr = localStorage.getItem('fsts_user');
@@ -268,7 +282,7 @@ export const adminService = {
         throw new Error('Admin access required');
       }
 
-      const response = await api.get(`/admin/stats?period=${period}`);
+      const response = await api.get('/admin/stats', { params: refresh ? { period, refresh: true } : { period } });
       return response.data;
     } catch (error: any) {
       console.error('Error getting admin stats:', error);
@@ -276,9 +290,9 @@ export const adminService = {
     }
   },
 
-  async getDetailedStats(period: string = 'month') {
+  async getDetailedStats(period: string = 'month', refresh: boolean = false) {
     try {
-      const response = await api.get(`/admin/stats/detailed?period=${period}`);
+      const response = await api.get('/admin/stats/detailed', { params: refresh ? { period, refresh: true } : { period } });
       return response.data;
     } catch (error: any) {
       console.error('Error getting detailed stats:', error);
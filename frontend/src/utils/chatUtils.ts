@@ -1,11 +1,18 @@
 
 import { chatService } from './api';
 
+export interface RelatedFaq {
+  _id: string;
+  question: string;
+}
+
 export interface ChatMessage {
   id: string;
   text: string;
   sender: 'user' | 'bot';
   timestamp: Date;
+  // Questions liées proposées sous une réponse FAQ
+  related?: RelatedFaq[];
 }
 
 // Generate unique ID for messages
@@ -0,0 +1,45 @@
+"""Tracker store Redis à mémoire bornée.
+
+Les conversations inactives expirent via `record_exp` (TTL Redis) et seuls les
+`max_events` derniers événements d'un tracker sont conservés, coupés sur un début
+de tour utilisateur et précédés des valeurs de slots courantes : le coût d'une
+prédiction ne dépend plus de la longueur de la conversation.
+"""
+from typing import Any, Optional, Text
+
+from rasa.core.tracker_store import RedisTrackerStore
+from rasa.shared.core.domain import Domain
+from rasa.shared.core.events import SlotSet, UserUttered
+from rasa.shared.core.trackers import DialogueStateTracker
+
+
+class BoundedRedisTrackerStore(RedisTrackerStore):
+    def __init__(self, domain: Domain, max_events: int = 200, **kwargs: Any) -> None:
+        super().__init__(domain, **kwargs)
+        self.max_events = int(max_events)
+
+    def _truncate(self, tracker: DialogueStateTracker) -> DialogueStateTracker:
+        events = list(tracker.events)
+        if len(events) <= self.max_events:
+            return tracker
+        kept = events[-self.max_events:]
+        # Le tracker tronqué commence par un message utilisateur
+        for index, event in enumerate(kept):
+            if isinstance(event, UserUttered):
+                kept = kept[index:]
+                break
+        # Les valeurs de slots courantes survivent à la troncature
+        slots = [SlotSet(name, value) for name, value in tracker.current_slot_values().items() if value is not None]
+        return DialogueStateTracker.from_events(
+            tracker.sender_id,
+            slots + kept,
+            slots=self.domain.slots,
+            max_event_history=tracker._max_event_history,
+        )
+
+    async def save(self, tracker: DialogueStateTracker, timeout: Optional[float] = None) -> None:
+        await super().save(self._truncate(tracker), timeout)
+
+    async def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        tracker = await super().retrieve(sender_id)
+        return self._truncate(tracker) if tracker is not None else None
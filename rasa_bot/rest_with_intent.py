@@ -0,0 +1,62 @@
+"""Canal REST qui renvoie l'intent reconnu avec les réponses du bot.
+
+Même requête que /webhooks/rest/webhook ; la réponse de /webhooks/rest_intent/webhook
+est {"messages": [...], "intent": {"name": ..., "confidence": ...}}, lue dans le
+dernier message du tracker. Le backend n'a plus besoin d'un /model/parse séparé
+pour décider si la réponse peut être mise en cache.
+"""
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Text
+
+from sanic import Blueprint, response
+from sanic.request import Request
+from sanic.response import HTTPResponse
+
+from rasa.core.channels.channel import CollectingOutputChannel, UserMessage
+from rasa.core.channels.rest import RestInput
+
+
+class RestWithIntentInput(RestInput):
+    @classmethod
+    def name(cls) -> Text:
+        return "rest_intent"
+
+    async def _latest_intent(self, request: Request, sender_id: Text) -> Dict[Text, Any]:
+        tracker = await request.app.ctx.agent.tracker_store.retrieve(sender_id)
+        intent = (tracker.latest_message.intent if tracker and tracker.latest_message else None) or {}
+        return {"name": intent.get("name"), "confidence": intent.get("confidence") or 0.0}
+
+    def blueprint(self, on_new_message: Callable[[UserMessage], Awaitable[Any]]) -> Blueprint:
+        custom_webhook = Blueprint(
+            "custom_webhook_{}".format(type(self).__name__),
+            inspect.getmodule(self).__name__,
+        )
+
+        @custom_webhook.route("/", methods=["GET"])
+        async def health(request: Request) -> HTTPResponse:
+            return response.json({"status": "ok"})
+
+        @custom_webhook.route("/webhook", methods=["POST"])
+        async def receive(request: Request) -> HTTPResponse:
+            sender_id = await self._extract_sender(request)
+            text = self._extract_message(request)
+            collector = CollectingOutputChannel()
+            try:
+                await on_new_message(
+                    UserMessage(
+                        text,
+                        collector,
+                        sender_id,
+                        input_channel=self._extract_input_channel(request),
+                        metadata=self.get_metadata(request),
+                    )
+                )
+            except asyncio.CancelledError:
+                return response.json({"messages": [], "intent": {"name": None, "confidence": 0.0}})
+            return response.json({
+                "messages": collector.messages,
+                "intent": await self._latest_intent(request, sender_id),
+            })
+
+        return custom_webhook